@@ -1,6 +1,14 @@
-from ontobio.golr.golr_associations import search_associations
+import json
+import logging
+from collections import OrderedDict
+
+from ontobio.golr.golr_query import GolrAssociationQuery, M, solr_quotify
 from ontobio.vocabulary.relations import HomologyTypes
 
+log = logging.getLogger(__name__)
+
+FACET_LIMIT = 100
+
 HOMOLOG_TYPES = [
     HomologyTypes.Ortholog.value,
     HomologyTypes.LeastDivergedOrtholog.value,
@@ -165,92 +173,61 @@ CATEGORY_NAME_MAP = {
 EXCLUDE_LIST = ['ortholog-homolog']
 
 
-def get_association_counts(bioentity_id, bioentity_type=None, distinct_counts=False):
+def get_association_counts(bioentity_id, bioentity_type=None, distinct_counts=False, approximate=False):
     """
     For a given CURIE, get the number of associations by each category.
+
+    The counts of the associations where bioentity_id is the subject, the
+    object and (for genes) the ortholog of the subject are all computed in
+    a single Golr request, with JSON facets over the union of these
+    associations. Distinct counts are exact, or HyperLogLog estimates if
+    approximate is set.
     """
     count_map = {}
     source_count = {}
-    # get counts where bioentity_id is the subject
-
-    if distinct_counts:
-        subject_associations = search_associations(
-            fq={'subject_closure': bioentity_id},
-            facet_pivot_fields=['{!stats=piv1}association_type', 'object_taxon'],
-            stats=True,
-            rows=0,
-            facet_fields=['is_defined_by'],
-            facet_limit='100',
-            stats_field=['{!tag=piv1 calcdistinct=true distinctValues=false}object']
-        )
-    else:
-        subject_associations = search_associations(
-            fq={'subject_closure': bioentity_id},
-            facet_pivot_fields=['{!stats=piv1}association_type', 'object_taxon'],
-            stats=True,
-            rows=0,
-            facet_fields=['is_defined_by'],
-            facet_limit='100',
-            stats_field=['{!tag=piv1 countDistinct=false}object']
-        )
-    source_count = subject_associations['facet_counts']['is_defined_by']
-    subject_facet_pivot = subject_associations['facet_pivot']['association_type,object_taxon']
-    parse_facet_pivot(subject_facet_pivot, bioentity_type, count_map, distinct_counts=distinct_counts)
-
-    # get counts where bioentity_id is the object
-    if distinct_counts:
-        object_associations = search_associations(
-            fq={'object_closure': bioentity_id},
-            facet_pivot_fields=['{!stats=piv1}association_type', 'subject_taxon'],
-            stats=True,
-            rows=0,
-            facet_fields=['is_defined_by'],
-            facet_limit='100',
-            stats_field=['{!tag=piv1 calcdistinct=true distinctValues=false}subject']
-        )
-    else:
-        object_associations = search_associations(
-            fq={'object_closure': bioentity_id},
-            facet_pivot_fields=['{!stats=piv1}association_type', 'subject_taxon'],
-            stats=True,
-            rows=0,
-            facet_fields=['is_defined_by'],
-            facet_limit='100',
-            stats_field=['{!tag=piv1 countDistinct=false}subject']
-        )
-
-    for src, count in object_associations['facet_counts']['is_defined_by'].items():
-        if src in source_count:
-            source_count[src] += count
-        else:
-            source_count[src] = count
-
-    object_facet_pivot = object_associations['facet_pivot']['association_type,subject_taxon']
-    parse_facet_pivot(object_facet_pivot, bioentity_type, count_map, distinct_counts=distinct_counts)
 
+    # name, closure field of bioentity_id, taxon field and counted field of each facet
+    facet_fields = [
+        ('subject', M.SUBJECT_CLOSURE, M.OBJECT_TAXON, M.OBJECT),
+        ('object', M.OBJECT_CLOSURE, M.SUBJECT_TAXON, M.SUBJECT)
+    ]
     if bioentity_type == 'gene':
         # get counts for ortholog-x associations
+        facet_fields.append(('ortholog', 'subject_ortholog_closure', M.OBJECT_TAXON, M.OBJECT))
+
+    json_facet = OrderedDict()
+    for name, closure_field, taxon_field, counted_field in facet_fields:
+        stats = {}
+        if distinct_counts:
+            stats['distinct'] = '{}({})'.format('hll' if approximate else 'unique', counted_field)
+        taxon = _terms_facet(taxon_field, stats)
+        facet = {'association_type': _terms_facet('association_type', dict(stats, taxon=taxon))}
+        if name != 'ortholog':
+            facet['is_defined_by'] = _terms_facet('is_defined_by')
+        json_facet[name] = {
+            'type': 'query',
+            'q': '{}:{}'.format(closure_field, solr_quotify(bioentity_id)),
+            'facet': facet
+        }
+
+    query = GolrAssociationQuery(rows=0, facet=False, select_fields=[M.ID])
+    params = query.solr_params()
+    params['fq'] = params['fq'] + [' OR '.join(facet['q'] for facet in json_facet.values())]
+    params['json.facet'] = json.dumps(json_facet)
+    params.pop('sort', None)
+    facets = query.solr.search(**params).raw_response.get('facets', {})
+
+    for name, closure_field, taxon_field, counted_field in facet_fields[:2]:
+        facet = facets.get(name, {})
+        for bucket in facet.get('is_defined_by', {}).get('buckets', []):
+            source_count[bucket['val']] = source_count.get(bucket['val'], 0) + bucket['count']
+        facet_pivot = _facet_pivot(facet, counted_field)
+        parse_facet_pivot(facet_pivot, bioentity_type, count_map, distinct_counts=distinct_counts)
+
+    if bioentity_type == 'gene':
         bioentity_type = type_prefix = 'ortholog'
         ortholog_count_map = {}
-        if distinct_counts:
-            ortholog_associations = search_associations(
-                fq={'subject_ortholog_closure': bioentity_id},
-                facet_pivot_fields=['{!stats=piv1}association_type', 'object_taxon'],
-                stats=True,
-                rows=0,
-                facet_fields=[],
-                stats_field=['{!tag=piv1 calcdistinct=true distinctValues=false}object']
-            )
-        else:
-            ortholog_associations = search_associations(
-                fq={'subject_ortholog_closure': bioentity_id},
-                facet_pivot_fields=['{!stats=piv1}association_type', 'object_taxon'],
-                stats=True,
-                rows=0,
-                facet_fields=[],
-                stats_field=['{!tag=piv1 countDistinct=false}object']
-            )
-        ortholog_facet_pivot = ortholog_associations['facet_pivot']['association_type,object_taxon']
+        ortholog_facet_pivot = _facet_pivot(facets.get('ortholog', {}), M.OBJECT)
         parse_facet_pivot(ortholog_facet_pivot, bioentity_type, ortholog_count_map, type_prefix, distinct_counts=distinct_counts)
         final_count_map = {**count_map, **ortholog_count_map}
     else:
@@ -265,6 +242,30 @@ def get_association_counts(bioentity_id, bioentity_type=None, distinct_counts=Fa
     return final_count_map
 
 
+def _terms_facet(field, facet=None):
+    return {'type': 'terms', 'field': field, 'limit': FACET_LIMIT, 'facet': dict(facet or {})}
+
+
+def _facet_pivot(facet, key):
+    """
+    JSON facet buckets of association types and taxa, in the format of
+    the association_type,taxon pivot facet with stats
+    """
+    def pivot(bucket):
+        return {
+            'value': bucket['val'],
+            'count': bucket['count'],
+            'stats': {'stats_fields': {key: {'countDistinct': bucket.get('distinct')}}}
+        }
+
+    facet_pivot = []
+    for bucket in facet.get('association_type', {}).get('buckets', []):
+        category_pivot = pivot(bucket)
+        category_pivot['pivot'] = [pivot(taxon) for taxon in bucket.get('taxon', {}).get('buckets', [])]
+        facet_pivot.append(category_pivot)
+    return facet_pivot
+
+
 def parse_facet_pivot(facet_pivot, bioentity_type, count_map, type_prefix=None, distinct_counts=False):
 
     if count_map is None:
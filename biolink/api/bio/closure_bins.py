@@ -1,33 +1,119 @@
+"""
+Closure bins of phenotype associations
 
-closure_map = {
-    'UBERON:0001434PHENOTYPE': 'Skeletal system',
-    'UBERON:0002101PHENOTYPE': 'Limbs',
-    'UBERON:0001016PHENOTYPE': 'Nervous system',
-    'UBERON:0007811PHENOTYPE': 'Head or neck',
-    'MP:0005376': 'Metabolism/homeostasis',
-    'UBERON:0004535PHENOTYPE': 'Cardiovascular system',
-    'UBERON:0002416PHENOTYPE': 'Integument',
-    'UBERON:0004122PHENOTYPE': 'Genitourinary system',
-    'UBERON:0000970PHENOTYPE': 'Eye',
-    'UBERON:0001015PHENOTYPE': 'Musculature',
-    'MPATH:218PHENOTYPE': 'Neoplasm',
-    'UBERON:0001007PHENOTYPE': 'Digestive system',
-    'UBERON:0002405PHENOTYPE': 'Immune system',
-    'UBERON:0002390PHENOTYPE': 'Blood and blood-forming tissues',
-    'UBERON:0000949PHENOTYPE': 'Endocrine',
-    'UBERON:0001004PHENOTYPE': 'Respiratory system',
-    'UBERON:0001690PHENOTYPE': 'Ear',
-    'UBERON:0002384PHENOTYPE': 'Connective tissue',
-    'UBERON:0000323PHENOTYPE': 'Prenatal development or birth',
-    'GO:0040007PHENOTYPE': 'Growth',
-    'HP:0025142': 'Symptom',
-    'UBERON:0002224PHENOTYPE': 'Thoracic cavity',
-    'UBERON:0000310PHENOTYPE': 'Breast',
-    'HP:0001608': 'Voice',
-    'CL:0000000PHENOTYPE': 'Cellular'
-}
-
-def create_closure_bin(fcmap={}):
+The phenotypes associated to an entity are counted under a few high level
+terms (the bins), e.g. Skeletal system or Eye. Rather than faceting on
+every object_closure term, the counts of the bin terms only are requested
+from Golr, with a JSON facet query per term.
+
+The bin terms of each ontology are set in the closure_bins section of
+conf/config.yaml, closure_map below being the default
+"""
+import json
+from collections import OrderedDict
+
+from ontobio.golr.golr_query import M
+
+from biolink.settings import get_biolink_config
+
+# default bins, by ontology
+default_closure_bins = OrderedDict([
+    ('upheno', OrderedDict([
+        ('UBERON:0001434PHENOTYPE', 'Skeletal system'),
+        ('UBERON:0002101PHENOTYPE', 'Limbs'),
+        ('UBERON:0001016PHENOTYPE', 'Nervous system'),
+        ('UBERON:0007811PHENOTYPE', 'Head or neck'),
+        ('UBERON:0004535PHENOTYPE', 'Cardiovascular system'),
+        ('UBERON:0002416PHENOTYPE', 'Integument'),
+        ('UBERON:0004122PHENOTYPE', 'Genitourinary system'),
+        ('UBERON:0000970PHENOTYPE', 'Eye'),
+        ('UBERON:0001015PHENOTYPE', 'Musculature'),
+        ('MPATH:218PHENOTYPE', 'Neoplasm'),
+        ('UBERON:0001007PHENOTYPE', 'Digestive system'),
+        ('UBERON:0002405PHENOTYPE', 'Immune system'),
+        ('UBERON:0002390PHENOTYPE', 'Blood and blood-forming tissues'),
+        ('UBERON:0000949PHENOTYPE', 'Endocrine'),
+        ('UBERON:0001004PHENOTYPE', 'Respiratory system'),
+        ('UBERON:0001690PHENOTYPE', 'Ear'),
+        ('UBERON:0002384PHENOTYPE', 'Connective tissue'),
+        ('UBERON:0000323PHENOTYPE', 'Prenatal development or birth'),
+        ('GO:0040007PHENOTYPE', 'Growth'),
+        ('UBERON:0002224PHENOTYPE', 'Thoracic cavity'),
+        ('UBERON:0000310PHENOTYPE', 'Breast'),
+        ('CL:0000000PHENOTYPE', 'Cellular'),
+    ])),
+    ('mp', OrderedDict([
+        ('MP:0005376', 'Metabolism/homeostasis'),
+    ])),
+    ('hp', OrderedDict([
+        ('HP:0025142', 'Symptom'),
+        ('HP:0001608', 'Voice'),
+    ])),
+])
+
+closure_map = OrderedDict(
+    (curie, label) for bins in default_closure_bins.values() for curie, label in bins.items()
+)
+
+
+def get_closure_map():
+    """
+    Label of each bin term, over the ontologies of the closure_bins config
+    """
+    closure_bins = get_biolink_config().get('closure_bins')
+    if closure_bins is None:
+        return closure_map
+    return OrderedDict(
+        (curie, label) for bins in closure_bins.values() for curie, label in (bins or {}).items()
+    )
+
+
+def closure_bin_facets(bin_map):
+    """
+    JSON facet request of the number of associations under each bin term
+    """
+    return OrderedDict(
+        ('bin{}'.format(i), {'type': 'query', 'q': '{}:{}'.format(M.OBJECT_CLOSURE, json.dumps(curie))})
+        for i, curie in enumerate(bin_map)
+    )
+
+
+def closure_bin_params(facet):
+    """
+    Extra search_associations arguments of a query with closure bins: the
+    bin terms are counted with JSON facet queries, and the object_closure
+    facet field (thousands of terms) is not fetched; the other facet
+    fields keep the facet_limit of the query
+    """
+    if not facet:
+        return {}
+    return {
+        'facet_field_limits': {M.OBJECT_CLOSURE: 0},
+        'json_facet': closure_bin_facets(get_closure_map()),
+    }
+
+
+def add_closure_bins(results):
+    """
+    Replace the JSON facets of a closure_bin_params query with the
+    closure_bin and object_closure facet counts
+    """
+    facets = results.pop('facets', None) or {}
+    fcs = results.get('facet_counts')
+    if fcs:
+        bin_map = get_closure_map()
+        fcmap = {}
+        for i, curie in enumerate(bin_map):
+            count = facets.get('bin{}'.format(i), {}).get('count', 0)
+            if count > 0:
+                fcmap[curie] = count
+        closure_bin, slim_facet = create_closure_bin(fcmap, bin_map)
+        fcs['closure_bin'] = closure_bin
+        fcs[M.OBJECT_CLOSURE] = slim_facet
+    return results
+
+
+def create_closure_bin(fcmap={}, bin_map=None):
     """
     Given a facet count dict from golr_query (i.e. map of class ID to count)
     return a new dict that maps original IDs to high level text descriptors.
@@ -37,14 +123,16 @@ def create_closure_bin(fcmap={}):
 
     Return: Tuple of two dictionaries, a label-count map and id-count map
     """
+    if bin_map is None:
+        bin_map = get_closure_map()
     lmap = {}
     idmap = {}
-    for curie, label in closure_map.items():
+    for curie, label in bin_map.items():
         lmap[label] = 0
         idmap[curie] = 0
     for k,v in fcmap.items():
-        if k in closure_map:
-            label = closure_map[k]
+        if k in bin_map:
+            label = bin_map[k]
 
             # we expect duplicates due to merging
             # of different ontologies. We take the higher value
@@ -1,20 +1,28 @@
 import logging
 
-from flask import request
-from flask_restplus import Resource, inputs, marshal
+import json
+from collections import OrderedDict
+
+from flask import request, abort, Response, stream_with_context
+from flask_restplus import Resource, inputs
+from biolink.marshalling import marshal
 from biolink.datamodel.serializers import node, named_object, bio_object,\
-    association_results, association, disease_object, d2p_association_results
+    association_results, association, disease_object, d2p_association_results,\
+    bio_object_batch_input, bio_object_batch_result
 from biolink.api.restplus import api
-from ontobio.golr.golr_associations import search_associations, select_distinct_subjects
-from scigraph.scigraph_util import SciGraph
+from biolink.api import projection, pagination
+from biolink.api.pagination import search_associations
+from ontobio.golr.golr_associations import select_distinct_subjects
 from biowikidata.wd_sparql import condition_to_drug
 from ontobio.vocabulary.relations import HomologyTypes
-from ..closure_bins import create_closure_bin
-from ..association_counts import get_association_counts
+from ..closure_bins import closure_bin_params, add_closure_bins
+from biolink.count_store import get_association_counts
 from biolink import USER_AGENT
 
-from biolink.settings import get_biolink_config, get_identifier_converter
-from biolink.error_handlers import NoResultFoundException, UnhandledException, UnrecognizedBioentityTypeException
+from biolink.settings import get_identifier_converter, get_scigraph
+from biolink.concurrency import fan_out, concurrent_map
+from biolink.cache import CachedResource
+from biolink.error_handlers import CustomException, NoResultFoundException, UnhandledException, UnrecognizedBioentityTypeException
 
 from ontobio.golr.golr_query import run_solr_text_on, ESOLR, ESOLRDoc, replace
 from ontobio.config import get_config
@@ -39,6 +47,8 @@ core_parser.add_argument('fetch_objects', type=inputs.boolean, default=False, he
 core_parser.add_argument('use_compact_associations', type=inputs.boolean, default=False, help='If true, returns results in compact associations format')
 core_parser.add_argument('slim', action='append', help='Map objects up (slim) to a higher level category. Value can be ontology class ID or subset ID')
 core_parser.add_argument('evidence', help='Object id, e.g. ECO:0000501 (for IEA; Includes inferred by default) or a specific publication or other supporting object, e.g. ZFIN:ZDB-PUB-060503-2')
+projection.add_argument(core_parser)
+pagination.add_argument(core_parser)
 
 INVOLVED_IN = 'involved_in'
 INVOLVED_IN_REGULATION_OF = 'involved_in_regulation_of'
@@ -76,14 +86,16 @@ gene_disease_parser.add_argument(
     'association_type', type=str, choices=('causal', 'non_causal', 'both'),
     default='both', help='Additional filters: causal, non_causal, both')
 
-scigraph = SciGraph(get_biolink_config()['scigraph_data']['url'])
+scigraph = get_scigraph('scigraph_data')
+
+MAX_BATCH_SIZE = 1000
 
 homol_rel = HomologyTypes.Homolog.value
 
 identifier_converter = get_identifier_converter()
 
 @api.doc(params={'id': 'id, e.g. NCBIGene:84570'})
-class GenericObject(Resource):
+class GenericObject(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(bio_object)
@@ -95,13 +107,77 @@ class GenericObject(Resource):
         obj = scigraph.bioobject(id)
         return obj
 
+class GenericObjectBatch(Resource):
+
+    @api.expect(bio_object_batch_input)
+    @api.response(200, 'Success', [bio_object_batch_result])
+    def post(self):
+        """
+        Returns basic info on a list of objects of any type
+
+        Duplicate ids and ids sharing a clique leader are looked up once, and
+        lookups run concurrently. Results are streamed back as a JSON list
+        in the order of the input ids; ids that cannot be resolved get an
+        error entry instead of failing the whole batch
+        """
+        data = request.json or {}
+        ids = data.get('ids') or []
+        node_type = data.get('type')
+        if node_type is not None and node_type not in categories:
+            raise UnrecognizedBioentityTypeException("{} is not a valid Bioentity type".format(node_type))
+        if len(ids) > MAX_BATCH_SIZE:
+            abort(400, 'At most {} ids can be requested at once'.format(MAX_BATCH_SIZE))
+        model = disease_object if node_type == TYPE_DISEASE else bio_object
+
+        # resolve all clique leaders first, so that equivalent ids share one lookup
+        unique_ids = list(OrderedDict.fromkeys(ids))
+        leaders = OrderedDict()
+        errors = {}
+        for curie, (leader, error) in zip(unique_ids, concurrent_map(scigraph.get_clique_leader, unique_ids)):
+            if error is None:
+                leaders[curie] = leader
+            else:
+                errors[curie] = error
+        unique_leaders = list(OrderedDict((leader.id, leader) for leader in leaders.values()).values())
+
+        def generate():
+            details = concurrent_map(lambda leader: scigraph.add_bioobject_details(leader, node_type), unique_leaders)
+            resolved = {}
+            yield '['
+            for i, curie in enumerate(ids):
+                if curie in leaders:
+                    leader_id = leaders[curie].id
+                    # leaders are resolved in order of first appearance
+                    while leader_id not in resolved:
+                        leader, error = next(details)
+                        resolved[unique_leaders[len(resolved)].id] = error if error is not None else leader
+                    result = resolved[leader_id]
+                else:
+                    result = errors[curie]
+                if isinstance(result, Exception):
+                    item = {'id': curie, 'bio_object': None, 'error': batch_error(curie, result)}
+                else:
+                    item = {'id': curie, 'bio_object': marshal(result, model), 'error': None}
+                yield (',' if i > 0 else '') + json.dumps(item)
+            yield ']'
+
+        return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def batch_error(curie, error):
+    if isinstance(error, CustomException):
+        return {'message': error.message, 'code': error.status_code}
+    log.error("Batch lookup of {} failed: {}".format(curie, error))
+    return {'message': 'An exception occurred: {}'.format(error), 'code': 500}
+
 @api.param('id', 'id, e.g. NCBIGene:84570')
 @api.param('type', 'bioentity type', enum=categories)
-class GenericObjectByType(Resource):
+class GenericObjectByType(CachedResource):
 
     parser = core_parser.copy()
     parser.add_argument('get_association_counts', help='Get association counts', type=inputs.boolean, default=False)
     parser.add_argument('distinct_counts', help='Get distinct counts for associations (to be used in conjunction with \'get_association_counts\' parameter)', type=inputs.boolean, default=False)
+    parser.add_argument('approximate_counts', help='Estimate the distinct counts with HyperLogLog, faster for entities with many associations (to be used in conjunction with \'distinct_counts\' parameter)', type=inputs.boolean, default=False)
 
     @api.expect(parser)
     def get(self, id, type):
@@ -114,20 +190,38 @@ class GenericObjectByType(Resource):
         if type not in categories:
             raise UnrecognizedBioentityTypeException("{} is not a valid Bioentity type".format(type))
 
+        # Once the clique leader is known, its neighbors and the
+        # association counts can be fetched concurrently
+        bio_entity = scigraph.get_clique_leader(id)
+        calls = [lambda: scigraph.add_bioobject_details(bio_entity, type)]
+        if args['get_association_counts']:
+            # *_ortholog_closure requires clique leader, so use
+            # bio_entity.id instead of incoming id
+            calls.append(lambda: get_association_counts(
+                scigraph, bio_entity.id, type, distinct_counts=args['distinct_counts'],
+                approximate=args['approximate_counts']))
+        results = fan_out(calls)
+
+        bio_entity, error = results[0]
+        if error is not None:
+            raise error
+
         if type == TYPE_DISEASE:
-            bio_entity = scigraph.bioobject(id, type)
             ret_val = marshal(bio_entity, disease_object), 200
         else:
-            bio_entity = scigraph.bioobject(id, type)
             ret_val = marshal(bio_entity, bio_object), 200
         if args['get_association_counts']:
-            # *_ortholog_closure requires clique leader, so use
-            # bio_entity.id instead of incoming id
-            ret_val[0]['association_counts'] = get_association_counts(bio_entity.id, type, distinct_counts=args['distinct_counts'])
+            association_counts, error = results[1]
+            if error is not None:
+                log.error("Could not get association counts for {}: {}".format(id, error))
+                # not cached, the counts may be back on the next request
+                ret_val = ret_val + ({'Cache-Control': 'no-store'},)
+            else:
+                ret_val[0]['association_counts'] = association_counts
         return ret_val
 
 
-class GenericAssociations(Resource):
+class GenericAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -144,7 +238,7 @@ class GenericAssociations(Resource):
         )
 
 @api.doc(params={'id': 'id, e.g. NCBIGene:3630. Equivalent IDs can be used with same results'})
-class GeneInteractions(Resource):
+class GeneInteractions(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -164,7 +258,7 @@ class GeneInteractions(Resource):
         )
 
 @api.doc(params={'id': 'id, e.g. NCBIGene:3630. Equivalent IDs can be used with same results'})
-class GeneHomologAssociations(Resource):
+class GeneHomologAssociations(CachedResource):
 
     @api.expect(homolog_parser)
     @api.marshal_with(association_results)
@@ -190,7 +284,7 @@ class GeneHomologAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of gene, e.g. NCBIGene:4750. Equivalent IDs can be used with same results'})
-class GenePhenotypeAssociations(Resource):
+class GenePhenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -206,19 +300,16 @@ class GenePhenotypeAssociations(Resource):
             facet_limit=100000,
             sort="source_count desc",
             user_agent=USER_AGENT,
+            **closure_bin_params(args['facet']),
             **args
         )
 
-        fcs = results.get('facet_counts')
-        if fcs:
-            closure_bin, slim_facet = create_closure_bin(fcs.get('object_closure'))
-            fcs['closure_bin'] = closure_bin
-            fcs['object_closure'] = slim_facet
+        add_closure_bins(results)
 
         return results
 
 @api.doc(params={'id': 'CURIE identifier of gene, e.g. NCBIGene:4750. Equivalent IDs can be used with same results'})
-class GeneDiseaseAssociations(Resource):
+class GeneDiseaseAssociations(CachedResource):
 
     @api.expect(gene_disease_parser)
     @api.marshal_with(association_results)
@@ -242,7 +333,7 @@ class GeneDiseaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of gene, e.g. NCBIGene:50846. Equivalent IDs can be used with same results'})
-class GenePathwayAssociations(Resource):
+class GenePathwayAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -260,7 +351,7 @@ class GenePathwayAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of gene, e.g. NCBIGene:4750. Equivalent IDs can be used with same results'})
-class GeneExpressionAssociations(Resource):
+class GeneExpressionAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -278,7 +369,7 @@ class GeneExpressionAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of gene, e.g. NCBIGene:13434'})
-class GeneAnatomyAssociations(Resource):
+class GeneAnatomyAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -296,7 +387,7 @@ class GeneAnatomyAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of gene, e.g. ZFIN:ZDB-GENE-980526-166'})
-class GeneGenotypeAssociations(Resource):
+class GeneGenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -315,7 +406,7 @@ class GeneGenotypeAssociations(Resource):
         )
 
 @api.doc(params={'id': 'id, e.g. NCBIGene:6469. Equivalent IDs can be used with same results'})
-class GeneFunctionAssociations(Resource):
+class GeneFunctionAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -364,7 +455,7 @@ class GeneFunctionAssociations(Resource):
         return assocs
 
 @api.doc(params={'id': 'CURIE identifier of gene, e.g. NCBIGene:4750'})
-class GenePublicationAssociations(Resource):
+class GenePublicationAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -383,7 +474,7 @@ class GenePublicationAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of gene, e.g. NCBIGene:17988'})
-class GeneModelAssociations(Resource):
+class GeneModelAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -403,7 +494,7 @@ class GeneModelAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of gene, e.g. NCBIGene:4750'})
-class GeneOrthologPhenotypeAssociations(Resource):
+class GeneOrthologPhenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -431,7 +522,7 @@ class GeneOrthologPhenotypeAssociations(Resource):
 
 
 @api.doc(params={'id': 'CURIE identifier of gene, e.g. NCBIGene:4750'})
-class GeneOrthologDiseaseAssociations(Resource):
+class GeneOrthologDiseaseAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -458,7 +549,7 @@ class GeneOrthologDiseaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of gene, e.g. HGNC:10896'})
-class GeneVariantAssociations(Resource):
+class GeneVariantAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -478,7 +569,7 @@ class GeneVariantAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of gene, e.g. HGNC:613, HGNC:11025'})
-class GeneCaseAssociations(Resource):
+class GeneCaseAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -496,7 +587,7 @@ class GeneCaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of disease, e.g. OMIM:605543, Orphanet:1934, DOID:678. Equivalent IDs can be used with same results'})
-class DiseasePhenotypeAssociations(Resource):
+class DiseasePhenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(d2p_association_results)
@@ -511,17 +602,14 @@ class DiseasePhenotypeAssociations(Resource):
             subject=id,
             facet_limit=100000,
             user_agent=USER_AGENT,
+            **closure_bin_params(args['facet']),
             **args
         )
-        fcs = results.get('facet_counts')
-        if fcs:
-            closure_bin, slim_facet = create_closure_bin(fcs.get('object_closure'))
-            fcs['closure_bin'] = closure_bin
-            fcs['object_closure'] = slim_facet
+        add_closure_bins(results)
         return results
 
 @api.doc(params={'id': 'CURIE identifier of disease, e.g. OMIM:605543, DOID:678. Equivalent IDs can be used with same results'})
-class DiseaseGeneAssociations(Resource):
+class DiseaseGeneAssociations(CachedResource):
 
     @api.expect(gene_disease_parser)
     @api.marshal_with(association_results)
@@ -548,7 +636,7 @@ class DiseaseGeneAssociations(Resource):
 
 
 @api.doc(params={'id': 'CURIE identifier of disease, e.g. DOID:2841 (asthma). Equivalent IDs not yet supported'})
-class DiseaseSubstanceAssociations(Resource):
+class DiseaseSubstanceAssociations(CachedResource):
 
     @api.expect(core_parser)
     #TODO: @api.marshal_list_with(association)
@@ -562,7 +650,7 @@ class DiseaseSubstanceAssociations(Resource):
         return condition_to_drug(id)
 
 @api.doc(params={'id': 'CURIE identifier of disease, e.g. OMIM:605543, DOID:678. Equivalent IDs can be used with same results'})
-class DiseaseModelAssociations(Resource):
+class DiseaseModelAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -597,7 +685,7 @@ class DiseaseModelAssociations(Resource):
 @api.doc(params={'id': 'CURIE identifier of disease, e.g. OMIM:605543, DOID:678. Equivalent IDs can be used with same results'})
 @api.doc(params={'taxon': 'CURIE of organism taxonomy class to constrain models, e.g NCBITaxon:10090 (M. musculus).\n\n Higher level taxa may be used'})
 @api.deprecated
-class DiseaseModelTaxonAssociations(Resource):
+class DiseaseModelTaxonAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -620,7 +708,7 @@ class DiseaseModelTaxonAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of disease, e.g. Orphanet:399158, DOID:0080008. Equivalent IDs can be used with same results'})
-class DiseaseGenotypeAssociations(Resource):
+class DiseaseGenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -640,7 +728,7 @@ class DiseaseGenotypeAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of disease, e.g. OMIM:605543, DOID:678. Equivalent IDs can be used with same results'})
-class DiseasePublicationAssociations(Resource):
+class DiseasePublicationAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -659,7 +747,7 @@ class DiseasePublicationAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of disease, e.g. DOID:4450. Equivalent IDs can be used with same results'})
-class DiseasePathwayAssociations(Resource):
+class DiseasePathwayAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -677,7 +765,7 @@ class DiseasePathwayAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of disease, e.g. OMIM:605543, DOID:678. Equivalent IDs can be used with same results'})
-class DiseaseVariantAssociations(Resource):
+class DiseaseVariantAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -697,7 +785,7 @@ class DiseaseVariantAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of disease, e.g. MONDO:0007103, MONDO:0010918. Equivalent IDs can be used with same results'})
-class DiseaseCaseAssociations(Resource):
+class DiseaseCaseAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -716,7 +804,7 @@ class DiseaseCaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of phenotype, e.g. MP:0008521. Equivalent IDs can be used with same results'})
-class PhenotypeAnatomyAssociations(Resource):
+class PhenotypeAnatomyAssociations(CachedResource):
     # Note: This depends on https://github.com/biolink/biolink-api/issues/122
     @api.expect(core_parser)
     @api.marshal_list_with(named_object)
@@ -733,7 +821,7 @@ class PhenotypeAnatomyAssociations(Resource):
         return objs
 
 @api.doc(params={'id': 'CURIE identifier of phenotype, e.g. HP:0007359. Equivalent IDs can be used with same results'})
-class PhenotypeDiseaseAssociations(Resource):
+class PhenotypeDiseaseAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(d2p_association_results)
@@ -757,7 +845,7 @@ class PhenotypeDiseaseAssociations(Resource):
 
 
 @api.doc(params={'id': 'Pheno class CURIE identifier, e.g  WBPhenotype:0000180 (axon morphology variant), MP:0001569 (abnormal circulating bilirubin level), '})
-class PhenotypeGeneAssociations(Resource):
+class PhenotypeGeneAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -782,7 +870,7 @@ class PhenotypeGeneAssociations(Resource):
 @api.doc(params={'id': 'Pheno class CURIE identifier, e.g  MP:0001569 (abnormal circulating bilirubin level)'})
 @api.doc(params={'taxid': 'Species or high level taxon grouping, e.g  NCBITaxon:10090 (Mus musculus)'})
 @api.deprecated
-class PhenotypeGeneByTaxonAssociations(Resource):
+class PhenotypeGeneByTaxonAssociations(CachedResource):
 
     @api.expect(core_parser)
     #@api.marshal_list_with(association)
@@ -802,7 +890,7 @@ class PhenotypeGeneByTaxonAssociations(Resource):
         )
 
 @api.doc(params={'id': 'Pheno class CURIE identifier, e.g  WBPhenotype:0000180 (axon morphology variant), MP:0001569 (abnormal circulating bilirubin level)'})
-class PhenotypeGenotypeAssociations(Resource):
+class PhenotypeGenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -822,7 +910,7 @@ class PhenotypeGenotypeAssociations(Resource):
         )
 
 @api.doc(params={'id': 'Pheno class CURIE identifier, e.g  WBPhenotype:0000180 (axon morphology variant), MP:0001569 (abnormal circulating bilirubin level)'})
-class PhenotypePublicationAssociations(Resource):
+class PhenotypePublicationAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -841,7 +929,7 @@ class PhenotypePublicationAssociations(Resource):
         )
 
 @api.doc(params={'id': 'Pheno class CURIE identifier, e.g  MP:0001569 (abnormal circulating bilirubin level)'})
-class PhenotypePathwayAssociations(Resource):
+class PhenotypePathwayAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -860,7 +948,7 @@ class PhenotypePathwayAssociations(Resource):
         )
 
 @api.doc(params={'id': 'Pheno class CURIE identifier, e.g  WBPhenotype:0000180 (axon morphology variant), MP:0001569 (abnormal circulating bilirubin level)'})
-class PhenotypeVariantAssociations(Resource):
+class PhenotypeVariantAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -880,7 +968,7 @@ class PhenotypeVariantAssociations(Resource):
         )
 
 @api.doc(params={'id': 'Pheno class CURIE identifier, e.g  HP:0011951 (Aspiration pneumonia), HP:0002450 (Abnormal motor neuron morphology)'})
-class PhenotypeCaseAssociations(Resource):
+class PhenotypeCaseAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -900,7 +988,7 @@ class PhenotypeCaseAssociations(Resource):
 
 @api.deprecated
 @api.doc(params={'id': 'CURIE identifier of a GO term, e.g. GO:0044598'})
-class GotermGeneAssociations(Resource):
+class GotermGeneAssociations(CachedResource):
 
     parser = core_parser.copy()
     parser.add_argument(
@@ -946,7 +1034,7 @@ class GotermGeneAssociations(Resource):
 
 
 @api.doc(params={'id': 'CURIE identifier of a GO term, e.g. GO:0044598'})
-class FunctionGeneAssociations(Resource):
+class FunctionGeneAssociations(CachedResource):
 
     parser = core_parser_with_filters.copy()
     parser.add_argument(
@@ -1003,7 +1091,7 @@ class FunctionGeneAssociations(Resource):
 
 
 @api.doc(params={'id': 'CURIE identifier of a function term (e.g. GO:0044598)'})
-class FunctionAssociations(Resource):
+class FunctionAssociations(CachedResource):
 
     @api.expect(basic_parser)
     def get(self, id):
@@ -1042,7 +1130,7 @@ class FunctionAssociations(Resource):
 
 
 @api.doc(params={'id': 'CURIE identifier of a GO term, e.g. GO:0044598'})
-class FunctionTaxonAssociations(Resource):
+class FunctionTaxonAssociations(CachedResource):
 
     @api.expect(basic_parser)
     def get(self, id):
@@ -1080,7 +1168,7 @@ class FunctionTaxonAssociations(Resource):
 
 
 @api.doc(params={'id': 'CURIE identifier of a GO term, e.g. GO:0044598'})
-class FunctionPublicationAssociations(Resource):
+class FunctionPublicationAssociations(CachedResource):
 
     @api.expect(basic_parser)
     def get(self, id):
@@ -1124,7 +1212,7 @@ class FunctionPublicationAssociations(Resource):
 
 
 @api.doc(params={'id': 'CURIE any pathway element. E.g. REACT:R-HSA-5387390'})
-class PathwayGeneAssociations(Resource):
+class PathwayGeneAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1144,7 +1232,7 @@ class PathwayGeneAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE any pathway element. E.g. REACT:R-HSA-5387390'})
-class PathwayDiseaseAssociations(Resource):
+class PathwayDiseaseAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1163,7 +1251,7 @@ class PathwayDiseaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE any pathway element. E.g. REACT:R-HSA-5387390'})
-class PathwayPhenotypeAssociations(Resource):
+class PathwayPhenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1181,7 +1269,7 @@ class PathwayPhenotypeAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of anatomical entity, e.g. GO:0005634 (nucleus), UBERON:0002037 (cerebellum), CL:0000540 (neuron). Equivalent IDs can be used with same results'})
-class AnatomyGeneAssociations(Resource):
+class AnatomyGeneAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1203,7 +1291,7 @@ class AnatomyGeneAssociations(Resource):
 @api.doc(params={'id': 'CURIE identifier of anatomical entity, e.g. GO:0005634 (nucleus), UBERON:0002037 (cerebellum), CL:0000540 (neuron). Equivalent IDs can be used with same results'})
 @api.doc(params={'taxid': 'Species or high level taxon grouping, e.g  NCBITaxon:10090 (Mus musculus)'})
 @api.deprecated
-class AnatomyGeneByTaxonAssociations(Resource):
+class AnatomyGeneByTaxonAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     #@api.marshal_list_with(association)
@@ -1226,7 +1314,7 @@ class AnatomyGeneByTaxonAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of substance, e.g. CHEBI:40036'})
-class SubstanceRoleAssociations(Resource):
+class SubstanceRoleAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_list_with(association)
@@ -1239,7 +1327,7 @@ class SubstanceRoleAssociations(Resource):
         return scigraph.substance_to_role_associations(id)
 
 @api.doc(params={'id': 'CURIE identifier of substance, e.g. CHEBI:40036'})
-class SubstanceParticipantInAssociations(Resource):
+class SubstanceParticipantInAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_list_with(association)
@@ -1262,7 +1350,7 @@ class SubstanceParticipantInAssociations(Resource):
 
 
 @api.doc(params={'id': 'CURIE identifier of substance, e.g. CHEBI:40036'})
-class SubstanceTreatsAssociations(Resource):
+class SubstanceTreatsAssociations(CachedResource):
 
     @api.expect(core_parser)
     #TODO: @api.marshal_list_with(association)
@@ -1276,7 +1364,7 @@ class SubstanceTreatsAssociations(Resource):
         return condition_to_drug(id)
 
 @api.doc(params={'id': 'CURIE identifier of genotype, e.g. ZFIN:ZDB-FISH-150901-6607'})
-class GenotypeGenotypeAssociations(Resource):
+class GenotypeGenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1296,7 +1384,7 @@ class GenotypeGenotypeAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of genotype, e.g. MONARCH:FBgeno422705'})
-class GenotypeVariantAssociations(Resource):
+class GenotypeVariantAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1315,7 +1403,7 @@ class GenotypeVariantAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of genotype, e.g. ZFIN:ZDB-FISH-150901-4286'})
-class GenotypePhenotypeAssociations(Resource):
+class GenotypePhenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1330,19 +1418,16 @@ class GenotypePhenotypeAssociations(Resource):
             subject=id,
             facet_limit=100000,
             user_agent=USER_AGENT,
+            **closure_bin_params(args['facet']),
             **args
         )
 
-        fcs = results.get('facet_counts')
-        if fcs:
-            closure_bin, slim_facet = create_closure_bin(fcs.get('object_closure'))
-            fcs['closure_bin'] = closure_bin
-            fcs['object_closure'] = slim_facet
+        add_closure_bins(results)
 
         return results
 
 @api.doc(params={'id': 'CURIE identifier of genotype, e.g. dbSNPIndividual:11441 (if non-human will return models)'})
-class GenotypeDiseaseAssociations(Resource):
+class GenotypeDiseaseAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1360,7 +1445,7 @@ class GenotypeDiseaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of genotype, e.g. ZFIN:ZDB-FISH-150901-6607'})
-class GenotypeGeneAssociations(Resource):
+class GenotypeGeneAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1378,7 +1463,7 @@ class GenotypeGeneAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of genotype, e.g. ZFIN:ZDB-FISH-150901-6607'})
-class GenotypeModelAssociations(Resource):
+class GenotypeModelAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1398,7 +1483,7 @@ class GenotypeModelAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of genotype, e.g. ZFIN:ZDB-FISH-150901-6607'})
-class GenotypePublicationAssociations(Resource):
+class GenotypePublicationAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1417,7 +1502,7 @@ class GenotypePublicationAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of genotype, e.g. dbSNPIndividual:10440, dbSNPIndividual:22633'})
-class GenotypeCaseAssociations(Resource):
+class GenotypeCaseAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -1436,7 +1521,7 @@ class GenotypeCaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of variant, e.g. ZFIN:ZDB-ALT-010427-8'})
-class VariantGenotypeAssociations(Resource):
+class VariantGenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1454,7 +1539,7 @@ class VariantGenotypeAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of variant, e.g. ClinVarVariant:14925'})
-class VariantDiseaseAssociations(Resource):
+class VariantDiseaseAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1472,7 +1557,7 @@ class VariantDiseaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of variant, e.g. ZFIN:ZDB-ALT-010427-8, ClinVarVariant:39783'})
-class VariantPhenotypeAssociations(Resource):
+class VariantPhenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1487,19 +1572,16 @@ class VariantPhenotypeAssociations(Resource):
             subject=id,
             facet_limit=100000,
             user_agent=USER_AGENT,
+            **closure_bin_params(args['facet']),
             **args
         )
 
-        fcs = results.get('facet_counts')
-        if fcs:
-            closure_bin, slim_facet = create_closure_bin(fcs.get('object_closure'))
-            fcs['closure_bin'] = closure_bin
-            fcs['object_closure'] = slim_facet
+        add_closure_bins(results)
 
         return results
 
 @api.doc(params={'id': 'CURIE identifier of variant, e.g. ZFIN:ZDB-ALT-010427-8, ClinVarVariant:39783'})
-class VariantGeneAssociations(Resource):
+class VariantGeneAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1517,7 +1599,7 @@ class VariantGeneAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of variant, e.g. ZFIN:ZDB-ALT-010427-8, ClinVarVariant:39783'})
-class VariantPublicationAssociations(Resource):
+class VariantPublicationAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1536,7 +1618,7 @@ class VariantPublicationAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of variant, e.g. OMIM:607623.0012, dbSNP:rs5030868'})
-class VariantModelAssociations(Resource):
+class VariantModelAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -1555,7 +1637,7 @@ class VariantModelAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier of variant, e.g. OMIM:309550.0004, dbSNP:rs5030868'})
-class VariantCaseAssociations(Resource):
+class VariantCaseAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -1574,7 +1656,7 @@ class VariantCaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a model, e.g. MGI:5573196'})
-class ModelDiseaseAssociations(Resource):
+class ModelDiseaseAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1592,7 +1674,7 @@ class ModelDiseaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a model, e.g. MMRRC:042787'})
-class ModelGeneAssociations(Resource):
+class ModelGeneAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1611,7 +1693,7 @@ class ModelGeneAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a model, e.g. Coriell:NA16660'})
-class ModelGenotypeAssociations(Resource):
+class ModelGenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1630,7 +1712,7 @@ class ModelGenotypeAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a model, e.g. MGI:5644542'})
-class ModelPublicationAssociations(Resource):
+class ModelPublicationAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1649,7 +1731,7 @@ class ModelPublicationAssociations(Resource):
         )
 
 @api.doc(params={'id': 'id'})
-class ModelPhenotypeAssociations(Resource):
+class ModelPhenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1664,19 +1746,16 @@ class ModelPhenotypeAssociations(Resource):
             subject=id,
             facet_limit=100000,
             user_agent=USER_AGENT,
+            **closure_bin_params(args['facet']),
             **args
         )
 
-        fcs = results.get('facet_counts')
-        if fcs:
-            closure_bin, slim_facet = create_closure_bin(fcs.get('object_closure'))
-            fcs['closure_bin'] = closure_bin
-            fcs['object_closure'] = slim_facet
+        add_closure_bins(results)
 
         return results
 
 @api.doc(params={'id': 'CURIE identifier for a model, e.g. MMRRC:042787'})
-class ModelVariantAssociations(Resource):
+class ModelVariantAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1695,7 +1774,7 @@ class ModelVariantAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a model, e.g. Coriell:GM22295, Coriell:HG02187'})
-class ModelCaseAssociations(Resource):
+class ModelCaseAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -1713,7 +1792,7 @@ class ModelCaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a publication, e.g. PMID:11751940'})
-class PublicationVariantAssociations(Resource):
+class PublicationVariantAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1732,7 +1811,7 @@ class PublicationVariantAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a publication, e.g. PMID:11751940'})
-class PublicationPhenotypeAssociations(Resource):
+class PublicationPhenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1750,7 +1829,7 @@ class PublicationPhenotypeAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a publication, e.g. PMID:11751940'})
-class PublicationModelAssociations(Resource):
+class PublicationModelAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1769,7 +1848,7 @@ class PublicationModelAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a publication, e.g. PMID:11751940'})
-class PublicationGenotypeAssociations(Resource):
+class PublicationGenotypeAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1788,7 +1867,7 @@ class PublicationGenotypeAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a publication, e.g. PMID:11751940'})
-class PublicationGeneAssociations(Resource):
+class PublicationGeneAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1807,7 +1886,7 @@ class PublicationGeneAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a publication, e.g. PMID:11751940'})
-class PublicationDiseaseAssociations(Resource):
+class PublicationDiseaseAssociations(CachedResource):
 
     @api.expect(core_parser_with_filters)
     @api.marshal_with(association_results)
@@ -1825,7 +1904,7 @@ class PublicationDiseaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a case'})
-class CaseModelAssociations(Resource):
+class CaseModelAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -1844,7 +1923,7 @@ class CaseModelAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a case'})
-class CaseDiseaseAssociations(Resource):
+class CaseDiseaseAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -1862,7 +1941,7 @@ class CaseDiseaseAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a case'})
-class CaseVariantAssociations(Resource):
+class CaseVariantAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -1880,7 +1959,7 @@ class CaseVariantAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a case'})
-class CaseGenotypeAssociations(Resource):
+class CaseGenotypeAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -1898,7 +1977,7 @@ class CaseGenotypeAssociations(Resource):
         )
 
 @api.doc(params={'id': 'CURIE identifier for a case'})
-class CasePhenotypeAssociations(Resource):
+class CasePhenotypeAssociations(CachedResource):
 
     @api.expect(core_parser)
     @api.marshal_with(association_results)
@@ -2,15 +2,14 @@ import logging
 
 from flask import request
 from flask_restplus import Resource
-from biolink.ontology.ontology_manager import get_ontology
 from biolink.datamodel.serializers import compact_association_set, association_results
 from ontobio.golr.golr_associations import search_associations, GolrFields
 from ontobio.ontol_factory import OntologyFactory
 from ontobio.config import get_config
-from ontobio.assoc_factory import AssociationSetFactory
 
 from biolink.api.restplus import api
 from biolink import USER_AGENT
+from biolink.association_sets import get_association_set
 
 log = logging.getLogger(__name__)
 
@@ -36,7 +35,6 @@ class OverRepresentation(Resource):
         args = parser.parse_args()
 
         M=GolrFields()
-        ont = None
         ocat = args.get('object_category')
         ontid = args.get('ontology')
         if ontid is None:
@@ -46,14 +44,11 @@ class OverRepresentation(Resource):
                 # TODO: other phenotype ontologies
                 ontid = 'hp'
 
-        print("Loading: {}".format(ontid))
-        ont = get_ontology(ontid)
         taxid = args.get('taxon')
         max_p_value = float(args.max_p_value)
         
         subjects = args.get('subject')
         background = args.get('background')
-        afactory = AssociationSetFactory()
-        aset = afactory.create(ontology=ont, subject_category='gene', object_category=ocat, taxon=taxid)
+        aset = get_association_set(ontid, 'gene', ocat, taxid)
         enr = aset.enrichment_test(subjects=subjects, background=background, threshold=max_p_value, labels=True)
         return {'results': enr }
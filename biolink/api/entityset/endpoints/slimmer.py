@@ -6,9 +6,8 @@ from biolink.datamodel.serializers import association
 from ontobio.golr.golr_associations import map2slim
 from ontobio.config import Config, get_config
 from biolink.api.restplus import api
-from scigraph.scigraph_util import SciGraph
 from biolink import USER_AGENT
-from biolink.settings import get_biolink_config, get_identifier_converter
+from biolink.settings import get_identifier_converter
 
 from biothings_client import get_client
 
@@ -50,16 +49,13 @@ class EntitySetFunctionSlimmer(Resource):
         # Note that GO currently uses UniProt as primary ID for some sources: https://github.com/biolink/biolink-api/issues/66
         # https://github.com/monarch-initiative/dipper/issues/461
 
-        sg_dev = SciGraph(get_biolink_config()['scigraph_data']['url'])
-
         subjects = [x.replace('WormBase:', 'WB:') if 'WormBase:' in x else x for x in subjects]
+        genes = [s for s in subjects if 'HGNC:' in s or 'NCBIGene:' in s or 'ENSEMBL:' in s]
+        proteins = identifier_converter.convert_genes_to_proteins(genes)
         slimmer_subjects = []
         for s in subjects:
-            if 'HGNC:' in s or 'NCBIGene:' in s or 'ENSEMBL:' in s:
-                prots = identifier_converter.convert_gene_to_protein(s)
-                if len(prots) == 0:
-                    prots = [s]
-                slimmer_subjects += prots
+            if s in proteins:
+                slimmer_subjects += proteins[s] or [s]
             else:
                 slimmer_subjects.append(s)
 
@@ -72,20 +68,22 @@ class EntitySetFunctionSlimmer(Resource):
         )
 
         # To the fullest extent possible return HGNC ids
-        checked = {}
+        human_proteins = [
+            association['subject']['id']
+            for result in results for association in result['assocs']
+            if association['subject']['taxon']['id'] == 'NCBITaxon:9606'
+            and association['subject']['id'].startswith('UniProtKB:')
+        ]
+        hgnc_ids = {}
+        for proteinId, genes in identifier_converter.convert_proteins_to_genes(human_proteins).items():
+            for gene in genes:
+                if gene is not None and gene.startswith('HGNC'):
+                    hgnc_ids[proteinId] = gene
         for result in results:
             for association in result['assocs']:
-                taxon = association['subject']['taxon']['id']
                 proteinId = association['subject']['id']
-                if taxon == 'NCBITaxon:9606' and proteinId.startswith('UniProtKB:'):
-                    if proteinId not in checked:
-                        genes = identifier_converter.convert_protein_to_gene(proteinId)
-                        for gene in genes:
-                            if gene.startswith('HGNC'):
-                                association['subject']['id'] = gene
-                                checked[proteinId] = gene
-                    else:
-                        association['subject']['id'] = checked[proteinId]
+                if proteinId in hgnc_ids:
+                    association['subject']['id'] = hgnc_ids[proteinId]
 
         return results
 
@@ -4,15 +4,14 @@ from flask import request
 from flask_restplus import Resource, inputs
 from biolink.datamodel.serializers import bbop_graph, bio_object
 from biolink.error_handlers import NoResultFoundException, UnhandledException
-from scigraph.scigraph_util import SciGraph
 from scigraph.model.BBOPGraph import BBOPGraph
 from biolink.api.restplus import api
-from biolink.settings import get_biolink_config
+from biolink.settings import get_scigraph
 
 log = logging.getLogger(__name__)
 
-sg_data = SciGraph(get_biolink_config()['scigraph_data']['url'])
-sg_ont = SciGraph(get_biolink_config()['scigraph_ontology']['url'])
+sg_data = get_scigraph('scigraph_data')
+sg_ont = get_scigraph('scigraph_ontology')
 
 @api.doc(params={'id': 'CURIE e.g. HP:0000465'})
 class NodeResource(Resource):
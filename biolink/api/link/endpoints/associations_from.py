@@ -4,7 +4,9 @@ from flask import request
 from flask_restplus import Resource, inputs
 from biolink.datamodel.serializers import association, association_results
 from biolink.api.restplus import api
-from ontobio.golr.golr_associations import get_association, search_associations
+from biolink.api import projection, pagination
+from biolink.api.pagination import search_associations
+from ontobio.golr.golr_associations import get_association
 
 from biolink import USER_AGENT
 
@@ -17,6 +19,8 @@ core_parser.add_argument('evidence', help='Object id, e.g. ECO:0000501 (for IEA;
 core_parser.add_argument('unselect_evidence', type=inputs.boolean, default=False, help='If true, excludes evidence objects in response')
 core_parser.add_argument('exclude_automatic_assertions', type=inputs.boolean, default=False, help='If true, excludes associations that involve IEAs (ECO:0000501)')
 core_parser.add_argument('use_compact_associations', type=inputs.boolean, default=False, help='If true, returns results in compact associations format')
+projection.add_argument(core_parser)
+pagination.add_argument(core_parser)
 
 @api.doc(params={'subject': 'Return associations emanating from this node, e.g. NCBIGene:84570, ZFIN:ZDB-GENE-050417-357 (If ID is from an ontology then results would include inferred associations, by default)'})
 class AssociationsFrom(Resource):
@@ -2,13 +2,14 @@ import logging
 
 from flask import request
 from flask import abort
-from flask_restplus import Resource
+from flask_restplus import Resource, inputs
 from biolink.api.restplus import api
 from ontobio.golr.golr_associations import bulk_fetch
 from ontobio.golr.golr_associations import search_associations
 from ontobio.golr.golr_associations import MAX_ROWS
 from biolink.datamodel.serializers import compact_association_set
 from ontobio.vocabulary.relations import HomologyTypes
+from biolink.export import stream_compact_associations, stream_response, FORMAT_JSON, STREAM_FORMATS
 from biolink import USER_AGENT
 
 # https://flask-limiter.readthedocs.io/en/stable/
@@ -29,9 +30,24 @@ limiter = Limiter(
 
 log = logging.getLogger(__name__)
 
-parser = api.parser()
+stream_parser = api.parser()
+stream_parser.add_argument('format', choices=[FORMAT_JSON] + STREAM_FORMATS, default=FORMAT_JSON, help='json returns a single document; ndjson and tsv stream rows as they are read from the index')
+stream_parser.add_argument('gzip', type=inputs.boolean, default=False, help='gzip compress ndjson and tsv responses')
+
+parser = stream_parser.copy()
 parser.add_argument('slim', action='append', help='Map objects up (slim) to a higher level category. Value can be ontology class ID or subset ID')
 
+
+def fetch(args, name_parts, **kwargs):
+    """
+    bulk_fetch, or a streamed response if an ndjson or tsv format is requested
+    """
+    if args['format'] in STREAM_FORMATS:
+        filename = '_'.join([part.replace(':', '_') for part in name_parts if part is not None])
+        associations = stream_compact_associations(user_agent=USER_AGENT, **kwargs)
+        return stream_response(associations, args['format'], compress=args['gzip'], filename=filename)
+    return bulk_fetch(user_agent=USER_AGENT, **kwargs)
+
 #@limiter.limit("1 per minute")
 @api.doc(params={'object_category': 'Category of entity at link Object (target), e.g. phenotype, disease'})
 @api.doc(params={'taxon': 'taxon of gene, must be of form NCBITaxon:9606'})
@@ -45,13 +61,14 @@ class MartGeneAssociationsResource(Resource):
 
         NOTE: this route has a limiter on it, you may be restricted in the number of downloads per hour. Use carefully.
         """
-        assocs = bulk_fetch(
+        args = parser.parse_args()
+        return fetch(
+            args,
+            ['gene', object_category, taxon],
             subject_category='gene',
             object_category=object_category,
-            taxon=taxon,
-            user_agent=USER_AGENT
+            taxon=taxon
         )
-        return assocs
 
 #@limiter.limit("1 per minute")
 @api.doc(params={'object_category': 'Category of entity at link Subject (target), e.g. phenotype, disease'})
@@ -71,13 +88,14 @@ class MartCaseAssociationsResource(Resource):
         if taxon == "NCBITaxon:9606":
             taxon = None
 
-        assocs = bulk_fetch(
+        args = parser.parse_args()
+        return fetch(
+            args,
+            ['case', object_category, taxon],
             subject_category='case',
             object_category=object_category,
-            taxon=taxon,
-            user_agent=USER_AGENT
+            taxon=taxon
         )
-        return assocs
 
 #@limiter.limit("1 per minute")
 @api.doc(params={'object_category': 'Category of entity at link Object (target), e.g. phenotype, disease'})
@@ -97,46 +115,51 @@ class MartDiseaseAssociationsResource(Resource):
         if taxon == "NCBITaxon:9606":
             taxon = None
 
-        assocs = bulk_fetch(
+        args = parser.parse_args()
+        return fetch(
+            args,
+            ['disease', object_category, taxon],
             subject_category='disease',
             object_category=object_category,
-            taxon=taxon,
-            user_agent=USER_AGENT
+            taxon=taxon
         )
-        return assocs
 
 @api.doc(params={'taxon1': 'subject taxon, e.g. NCBITaxon:9606'})
 @api.doc(params={'taxon2': 'object taxon, e.g. NCBITaxon:9606'})
 class MartParalogAssociationsResource(Resource):
 
+    @api.expect(stream_parser)
     def get(self, taxon1, taxon2):
         """
         Bulk download of paralogs
         """
-        assocs = bulk_fetch(
+        args = stream_parser.parse_args()
+        return fetch(
+            args,
+            ['paralogs', taxon1, taxon2],
             subject_category='gene',
             object_category='gene',
             relation=paralog_rel,
             taxon=taxon1,
-            object_taxon=taxon2,
-            user_agent=USER_AGENT
+            object_taxon=taxon2
         )
-        return assocs
 
 @api.doc(params={'taxon1': 'subject taxon, e.g. NCBITaxon:9606'})
 @api.doc(params={'taxon2': 'object taxon, e.g. NCBITaxon:10090'})
 class MartOrthologAssociationsResource(Resource):
 
+    @api.expect(stream_parser)
     def get(self, taxon1, taxon2):
         """
         Bulk download of orthologs
         """
-        assocs = bulk_fetch(
+        args = stream_parser.parse_args()
+        return fetch(
+            args,
+            ['orthologs', taxon1, taxon2],
             subject_category='gene',
             object_category='gene',
             relation=ortholog_rel,
             taxon=taxon1,
-            object_taxon=taxon2,
-            user_agent=USER_AGENT
-        )
-        return assocs
\ No newline at end of file
+            object_taxon=taxon2
+        )
\ No newline at end of file
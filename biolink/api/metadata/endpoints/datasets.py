@@ -1,10 +1,9 @@
 from biolink.api.restplus import api
 from flask_restplus import Resource
-from biolink.settings import get_biolink_config
-from scigraph.scigraph_util import SciGraph
+from biolink.settings import get_scigraph
 
 
-scigraph = SciGraph(get_biolink_config()['scigraph_data']['url'])
+scigraph = get_scigraph('scigraph_data')
 
 
 class MetadataForDatasets(Resource):
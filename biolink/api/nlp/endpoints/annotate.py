@@ -4,8 +4,7 @@ from flask_restplus import Resource, inputs
 from biolink.datamodel.serializers import association, entity_annotation_result
 from biolink.api.restplus import api
 from biolink.error_handlers import RouteNotImplementedException
-from biolink.settings import get_biolink_config
-from scigraph.scigraph_util import SciGraph
+from biolink.settings import get_scigraph
 import pysolr
 
 log = logging.getLogger(__name__)
@@ -20,7 +19,7 @@ parser.add_argument('include_abbreviation', type=inputs.boolean, default=False,
 parser.add_argument('include_acronym', type=inputs.boolean, default=False, help='Should acronyms be included')
 parser.add_argument('include_numbers', type=inputs.boolean, default=False, help='Should numbers be included')
 
-scigraph = SciGraph(get_biolink_config()['scigraph_data']['url'])
+scigraph = get_scigraph('scigraph_data')
 
 def parse_args_for_annotator(parser):
     """
@@ -12,7 +12,7 @@ from ontobio.sparql.sparql_ontol_utils import run_sparql_on, EOntology, transfor
 from ontobio.golr.golr_query import GolrSearchQuery, run_solr_on, ESOLR, ESOLRDoc, replace
 
 from ontobio.ontol_factory import OntologyFactory
-from biolink.ontology.ontology_manager import get_ontology
+from biolink.ontology.ontology_manager import get_closure_index, traverse_nodes, get_subontology
 from ontobio.io.ontol_renderers import OboJsonGraphRenderer
 
 import json
@@ -23,6 +23,8 @@ IS_A = "isa"
 IS_A_PART_OF = "isa_partof"
 REGULATES = "regulates"
 
+ISA_PARTOF_RELATIONS = ['subClassOf', 'BFO:0000050']
+
 related_params = api.parser()
 related_params.add_argument('relationship_type', choices=[IS_A, IS_A_PART_OF, REGULATES], default=IS_A_PART_OF, help="relationship type ('{}', '{}' or '{}')".format(IS_A, IS_A_PART_OF, REGULATES))
 
@@ -112,15 +114,13 @@ class OntologyTermSubgraph(Resource):
             qnodes += args.cnode
 
         # COMMENT: based on the CURIE of the id, we should be able to find out the ontology automatically
-        ont = get_ontology("go")
         relations = args.relation
         print("Traversing: {} using {}".format(qnodes,relations))
-        nodes = ont.traverse_nodes(qnodes,
-                                   up=args.include_ancestors,
-                                   down=args.include_descendants,
-                                   relations=relations)
+        nodes = traverse_nodes("go", qnodes, relations,
+                               up=args.include_ancestors,
+                               down=args.include_descendants)
 
-        subont = ont.subontology(nodes, relations=relations)
+        subont = get_subontology("go", nodes, relations=relations)
         # TODO: meta is included regardless of whether include_meta is True or False
         ojr = OboJsonGraphRenderer(include_meta=args.include_meta)
         json_obj = ojr.to_json(subont, include_meta=args.include_meta)
@@ -204,24 +204,26 @@ class OntologyTermsSharedAncestor(Resource):
         Returns the ancestor ontology terms shared by two ontology terms
         """
 
+        # GO isa_partof closure, from the local closure index if GO is in memory
+        index = get_closure_index("go", ISA_PARTOF_RELATIONS, build=False)
+        if index is not None and subject in index and object in index:
+            shared = index.shared_ancestors(subject, object)
+            sharedLabels = [index.label(id) for id in shared]
+            return { "goids" : shared, "gonames: " : sharedLabels }
+
         fields = "isa_partof_closure,isa_partof_closure_label"
 
         subres = run_solr_on(ESOLR.GOLR, ESOLRDoc.ONTOLOGY, subject, fields)
         objres = run_solr_on(ESOLR.GOLR, ESOLRDoc.ONTOLOGY, object, fields)
-        
-        print("SUBJECT: ", subres)
-        print("OBJECT: ", objres)
 
+        objclosure = set(objres['isa_partof_closure'])
         shared = []
         sharedLabels = []
-        for i in range(0, len(subres['isa_partof_closure'])):
-            sub = subres['isa_partof_closure'][i]
-            found = False
-            if sub in objres['isa_partof_closure']:
-                found = True
-            if found:
+        # sorted by id, the order of the closure index
+        for sub, label in sorted(zip(subres['isa_partof_closure'], subres['isa_partof_closure_label'])):
+            if sub in objclosure:
                 shared.append(sub)
-                sharedLabels.append(subres['isa_partof_closure_label'][i])
+                sharedLabels.append(label)
         return { "goids" : shared, "gonames: " : sharedLabels }
 
 
@@ -3,7 +3,7 @@ import logging
 from flask import request
 from flask_restplus import Resource, inputs
 from biolink.api.restplus import api
-from biolink.ontology.ontology_manager import get_ontology
+from biolink.ontology.ontology_manager import traverse_nodes, get_subontology
 from ontobio.io.ontol_renderers import OboJsonGraphRenderer
 from ontobio.config import get_config
 import networkx as nx
@@ -33,15 +33,13 @@ class ExtractOntologySubgraphResource(Resource):
         if args.cnode is not None:
             qnodes += args.cnode
 
-        ont = get_ontology(ontology)
         relations = args.relation
         log.info("Traversing: {} using {}".format(qnodes,relations))
-        nodes = ont.traverse_nodes(qnodes,
-                                   up=args.include_ancestors,
-                                   down=args.include_descendants,
-                                   relations=relations)
+        nodes = traverse_nodes(ontology, qnodes, relations,
+                               up=args.include_ancestors,
+                               down=args.include_descendants)
 
-        subont = ont.subontology(nodes, relations=relations)
+        subont = get_subontology(ontology, nodes, relations=relations)
         ojr = OboJsonGraphRenderer()
         json_obj = ojr.to_json(subont, include_meta=args.include_meta)
 
@@ -57,15 +55,13 @@ class ExtractOntologySubgraphResource(Resource):
         if args.cnode is not None:
             qnodes += args.cnode
 
-        ont = get_ontology(ontology)
         relations = args.relation
         log.info("Traversing: {} using {}".format(qnodes,relations))
-        nodes = ont.traverse_nodes(qnodes,
-                                   up=args.include_ancestors,
-                                   down=args.include_descendants,
-                                   relations=relations)
+        nodes = traverse_nodes(ontology, qnodes, relations,
+                               up=args.include_ancestors,
+                               down=args.include_descendants)
 
-        subont = ont.subontology(nodes, relations=relations)
+        subont = get_subontology(ontology, nodes, relations=relations)
         ojr = OboJsonGraphRenderer()
         json_obj = ojr.to_json(subont, include_meta=args.include_meta)
 
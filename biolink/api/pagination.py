@@ -0,0 +1,84 @@
+"""
+Cursor pagination of association results
+
+With start/rows, Solr sorts and skips all the associations before start,
+so deep pages get slower as start grows. The `cursor` argument of the
+association routes pages with a Solr cursorMark instead: the first page
+is requested with cursor=*, and each page has a next_cursor to request
+the following one (None after the last page). Each page then costs about
+the same, whatever its depth.
+
+The sort of the query gets the association id as a tie breaker, as Solr
+requires a stable sort for cursors. start keeps working without a cursor.
+"""
+from flask_restplus import abort
+from ontobio.golr.golr_associations import search_associations as golr_search_associations
+from ontobio.golr.golr_query import GolrAssociationQuery, M
+
+ARGUMENT = 'cursor'
+
+FIRST_CURSOR = '*'
+
+TIE_BREAKER = '{} asc'.format(M.ID)
+
+HELP = 'Cursor of the page to return, * for the first page, then the next_cursor of the previous page; ' \
+       'cannot be combined with start'
+
+
+class CursorAssociationQuery(GolrAssociationQuery):
+    """
+    GolrAssociationQuery of the page of a cursor, adding next_cursor to
+    its results
+    """
+
+    def __init__(self, cursor=FIRST_CURSOR, **kwargs):
+        super().__init__(**kwargs)
+        self.cursor = cursor
+
+    def solr_params(self):
+        params = super().solr_params()
+        params.pop('start', None)
+        params['cursorMark'] = self.cursor
+        params['sort'] = sort_with_tie_breaker(params.get('sort'))
+        return params
+
+    def exec(self, **kwargs):
+        include_raw = self.include_raw
+        self.include_raw = True
+        payload = super().exec(**kwargs)
+        results = payload['raw'] if include_raw else payload.pop('raw')
+        next_cursor = results.nextCursorMark
+        # Solr returns the same mark once all results are read
+        if next_cursor == self.cursor or len(results.docs) < self.rows:
+            next_cursor = None
+        payload['next_cursor'] = next_cursor
+        return payload
+
+
+def sort_with_tie_breaker(sort):
+    if not sort:
+        return TIE_BREAKER
+    if any(clause.split()[0] == M.ID for clause in sort.split(',') if clause.strip()):
+        return sort
+    return '{},{}'.format(sort, TIE_BREAKER)
+
+
+def search_associations(cursor=None, **kwargs):
+    """
+    Drop-in replacement of ontobio search_associations, paging with the
+    cursor argument if given
+    """
+    if cursor is None:
+        return golr_search_associations(**kwargs)
+    if kwargs.get('start'):
+        abort(400, 'cursor cannot be combined with start')
+    if kwargs.get('rows', 10) < 0:
+        abort(400, 'cursor needs a number of rows')
+    return CursorAssociationQuery(cursor=cursor, **kwargs).exec()
+
+
+def add_argument(parser):
+    """
+    Add the cursor argument to a reqparse parser
+    """
+    parser.add_argument(ARGUMENT, help=HELP)
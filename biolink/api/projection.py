@@ -0,0 +1,128 @@
+"""
+Projection of association results on a list of fields
+
+The `fields` argument of the association routes, e.g.
+fields=subject.id,object.id,object.label, is turned into the Golr
+select fields (fl) needed for these association fields, so that other
+fields (in particular the JSON encoded evidence graphs) are neither
+fetched, parsed nor marshalled; the response only has the requested
+association fields.
+
+The id, subject, object and relation ids are always fetched, ontobio
+needs them to build an association.
+"""
+from collections import OrderedDict
+
+from flask import request, has_request_context
+from ontobio.golr.golr_query import M
+
+ARGUMENT = 'fields'
+
+ALWAYS_SELECTED = [M.ID, M.SUBJECT, M.OBJECT, M.RELATION]
+
+
+def _object_fields(field, label, taxon, taxon_label):
+    return OrderedDict([
+        (field, [field, label, taxon, taxon_label]),
+        (field + '.id', [field]),
+        (field + '.iri', [field]),
+        (field + '.category', [field]),
+        (field + '.label', [label]),
+        (field + '.taxon', [taxon, taxon_label]),
+    ])
+
+
+# Golr fields of each association field
+ASSOCIATION_FIELDS = OrderedDict([
+    ('id', [M.ID]),
+    ('type', [M.ASSOCIATION_TYPE]),
+    ('relation', [M.RELATION, M.RELATION_LABEL]),
+    ('relation.id', [M.RELATION]),
+    ('relation.label', [M.RELATION_LABEL]),
+    ('negated', [M.RELATION]),
+    ('qualifiers', [M.RELATION]),
+    ('slim', []),
+    ('evidence_types', [M.EVIDENCE, M.EVIDENCE_CLOSURE_MAP]),
+    ('evidence_graph', [M.EVIDENCE_GRAPH]),
+    ('provided_by', [M.IS_DEFINED_BY]),
+    ('publications', [M.SOURCE]),
+    ('frequency', [M.FREQUENCY, M.FREQUENCY_LABEL]),
+    ('onset', [M.ONSET, M.ONSET_LABEL]),
+])
+ASSOCIATION_FIELDS.update(_object_fields(M.SUBJECT, M.SUBJECT_LABEL, M.SUBJECT_TAXON, M.SUBJECT_TAXON_LABEL))
+ASSOCIATION_FIELDS.update(_object_fields(M.OBJECT, M.OBJECT_LABEL, M.OBJECT_TAXON, M.OBJECT_TAXON_LABEL))
+
+HELP = 'Comma separated association fields to return, e.g. subject.id,object.id,object.label; ' \
+       'only the Golr fields they need are fetched. One of {}'.format(', '.join(ASSOCIATION_FIELDS))
+
+
+def parse_fields(value):
+    """
+    List of the association fields of a fields argument
+
+    :raises ValueError: for unknown fields
+    """
+    paths = [path.strip() for path in value.split(',') if path.strip() != '']
+    unknown = [path for path in paths if path not in ASSOCIATION_FIELDS]
+    if len(unknown) > 0:
+        raise ValueError('Unknown association fields: {}'.format(', '.join(unknown)))
+    if len(paths) == 0:
+        raise ValueError('No association fields')
+    return paths
+
+
+def select_fields(value):
+    """
+    Golr select fields of a fields argument, a reqparse type
+    """
+    selected = list(ALWAYS_SELECTED)
+    for path in parse_fields(value):
+        selected += [field for field in ASSOCIATION_FIELDS[path] if field not in selected]
+    return selected
+
+
+def association_mask(paths, model_fields):
+    """
+    Mask of the model, keeping the association fields of paths and the
+    other fields of the model
+    """
+    nested = OrderedDict()
+    for path in paths:
+        field, _, subfield = path.partition('.')
+        if subfield == '':
+            nested[field] = None
+        elif field not in nested:
+            nested[field] = [subfield]
+        elif nested[field] is not None:
+            nested[field].append(subfield)
+    associations = ','.join(
+        field if subfields is None else '{}{{{}}}'.format(field, ','.join(subfields))
+        for field, subfields in nested.items()
+    )
+    return ','.join([key for key in model_fields if key != 'associations'] +
+                    ['associations{{{}}}'.format(associations)])
+
+
+def request_mask(fields):
+    """
+    Mask for the fields argument of the current request, if the model
+    has associations
+    """
+    if not has_request_context() or ARGUMENT not in request.args:
+        return None
+    model_fields = getattr(fields, 'resolved', fields)
+    if 'associations' not in model_fields:
+        return None
+    try:
+        paths = parse_fields(request.args[ARGUMENT])
+    except ValueError:
+        return None
+    return association_mask(paths, model_fields)
+
+
+def add_argument(parser):
+    """
+    Add the fields argument to a reqparse parser; it is parsed into the
+    select_fields of the association query
+    """
+    parser.add_argument(ARGUMENT, dest='select_fields', type=select_fields, help=HELP)
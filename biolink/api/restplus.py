@@ -1,17 +1,56 @@
 import logging
 import traceback
+from functools import partial
+from http import HTTPStatus
 
 from flask_restplus import Api
+from flask_restplus.utils import merge
 from biolink import settings
+from biolink.tracing import traced_marshalling
+from biolink import encoding
+from biolink.marshalling import marshal_with
+from biolink.api import projection
 from sqlalchemy.orm.exc import NoResultFound
 
 log = logging.getLogger(__name__)
 
-api = Api(version='0.1.1', title='BioLink API',
+class TracedApi(Api):
+    """
+    Api whose marshal_with decorators use precompiled models (see
+    biolink.marshalling), apply the fields argument of association routes
+    (see biolink.api.projection), stream large JSON responses (see
+    biolink.encoding.stream_json) and record the marshalling time of each
+    response in the request trace, see biolink.tracing
+    """
+
+    def marshal_with(self, fields, as_list=False, code=HTTPStatus.OK, description=None, **kwargs):
+        decorator = marshal_with(fields, ordered=self.ordered, request_mask=projection.request_mask,
+                                 stream=partial(encoding.stream_json, self.representations), **kwargs)
+
+        def wrapper(func):
+            # same documentation as Namespace.marshal_with
+            doc = {
+                'responses': {
+                    code: (description, [fields]) if as_list else (description, fields)
+                },
+                '__mask__': kwargs.get('mask', True),
+            }
+            func.__apidoc__ = merge(getattr(func, '__apidoc__', {}), doc)
+            return traced_marshalling(func, decorator)
+        return wrapper
+
+    def marshal_list_with(self, fields, **kwargs):
+        return self.marshal_with(fields, as_list=True, **kwargs)
+
+
+api = TracedApi(version='0.1.1', title='BioLink API',
           license='BSD3',
           contact='cjmungall@lbl.gov',
           description='API integration layer for linked biological objects.\n\n __Source:__ https://github.com/biolink/biolink-api/')
 
+# JSON through orjson, MessagePack and CBOR by Accept header
+encoding.init_api(api)
+
 
 @api.errorhandler
 def default_error_handler(e):
@@ -0,0 +1,111 @@
+import logging
+
+from flask_restplus import Resource
+from biolink.api.restplus import api
+from biolink import settings
+from biolink.cache import get_response_cache
+from biolink.tracing import get_timing_stats
+from biolink.clique_cache import clique_caches
+from biolink.xref_store import get_xref_store
+from biolink.count_store import get_count_store
+from biolink.association_sets import get_association_set_cache
+from biolink.singleflight import get_singleflight
+from biolink.circuit_breaker import breakers, degraded
+
+log = logging.getLogger(__name__)
+
+
+class ScigraphPoolStatus(Resource):
+
+    def get(self):
+        """
+        Connection pool counters for each SciGraph instance used by this worker
+        """
+        return {name: scigraph.pool_stats() for name, scigraph in settings.scigraph_instances.items()}
+
+
+class ResponseCacheStatus(Resource):
+
+    def get(self):
+        """
+        Response cache hit ratios per resource for this worker
+        """
+        return get_response_cache().get_stats()
+
+
+class RequestTimingStatus(Resource):
+
+    def get(self):
+        """
+        Request duration percentiles per route and backend call duration
+        percentiles per backend for this worker
+        """
+        return get_timing_stats().get_stats()
+
+
+class CliqueCacheStatus(Resource):
+
+    def get(self):
+        """
+        Clique leader cache counters per SciGraph instance for this worker
+        """
+        return {url: cache.get_stats() for url, cache in clique_caches.items()}
+
+
+class XrefStoreStatus(Resource):
+
+    def get(self):
+        """
+        Gene/protein xref store hits and misses for this worker, and stored
+        mappings per source
+        """
+        store = get_xref_store()
+        if store is None:
+            return {'enabled': False}
+        return dict(store.get_stats(), enabled=True)
+
+
+class CountStoreStatus(Resource):
+
+    def get(self):
+        """
+        Association count store hits and misses for this worker, and stored
+        counts per release
+        """
+        store = get_count_store()
+        if store is None:
+            return {'enabled': False}
+        return dict(store.get_stats(), enabled=True)
+
+
+class AssociationSetStatus(Resource):
+
+    def get(self):
+        """
+        Association sets of the over-representation analysis held by this
+        worker, with their size, and hits, loads and builds
+        """
+        return get_association_set_cache().get_stats()
+
+
+class SingleFlightStatus(Resource):
+
+    def get(self):
+        """
+        Backend requests issued and coalesced with an identical in-flight
+        request, per backend, for this worker
+        """
+        return get_singleflight().get_stats()
+
+
+class HealthStatus(Resource):
+
+    def get(self):
+        """
+        Circuit breaker state of each backend used by this worker; status
+        is degraded while any breaker is open or half open
+        """
+        return {
+            'status': 'degraded' if degraded() else 'ok',
+            'backends': {name: breaker.get_status() for name, breaker in list(breakers.items())}
+        }
@@ -8,15 +8,22 @@ from flask import Flask, Blueprint, request
 from flask import render_template
 from flask_cors import CORS, cross_origin
 from biolink import settings
-from biolink.ontology.ontology_manager import get_ontology
+from biolink.ontology.ontology_manager import preload_ontology
 
 from biolink.api.restplus import api
 
 from biolink.database import db
+from biolink import tracing
+from biolink.singleflight import coalesce_backends
+from biolink.circuit_breaker import guard_backends
 
 app = Flask(__name__)
 app.url_map.strict_slashes = False
 CORS(app)
+# breakers inside the coalescing, so that a shared request counts once
+guard_backends()
+coalesce_backends()
+tracing.init_app(app)
 log_file_path = path.join(path.dirname(path.abspath(__file__)), '../logging.conf')
 logging.config.fileConfig(log_file_path)
 log = logging.getLogger(__name__)
@@ -62,7 +69,7 @@ def preload_ontologies():
         handle = ontology['handle']
         if ontology['pre_load']:
             log.info("Loading {}".format(ontology['id']))
-            get_ontology(handle)
+            preload_ontology(handle)
 
 @app.route("/")
 def hello():
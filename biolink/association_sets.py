@@ -0,0 +1,371 @@
+"""
+Cached association sets of the over-representation analysis
+
+Building the ontobio AssociationSet of a taxon means fetching all its
+gene associations from Golr and computing the ancestors of every
+annotated term, which takes minutes for GO or HP. Sets are built once per
+(ontology, object category, taxon) and SciGraph release (see
+biolink.clique_cache), then kept in a compact form: subjects and terms
+are numbered, and the inferred terms of each subject are a CSR array of
+term numbers, with the number of subjects of each term precomputed for
+enrichment tests against the whole set.
+
+Sets are kept in memory up to max_bytes (least recently used sets are
+evicted first) for at most ttl seconds, and written to files under path
+so that other workers and restarts can load them instead of building
+them. Concurrent requests of a set being built wait for it.
+
+Settings are in the association_sets section of conf/config.yaml
+"""
+import json
+import logging
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import Counter, OrderedDict
+
+from scipy.stats import fisher_exact
+
+from biolink.ontology.snapshot import AdjacencyArrays, to_csr
+from biolink.settings import get_biolink_config, get_data_path
+
+log = logging.getLogger(__name__)
+
+MAGIC = b'BLASSET1'
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL = 7 * 86400
+# relative to the data directory, see settings.get_data_path
+DEFAULT_PATH = 'association-sets'
+
+association_set_cache = None
+
+
+def get_association_sets_config():
+    return get_biolink_config().get('association_sets', {})
+
+
+class CompactAssociationSet(object):
+    """
+    Subject to inferred term associations of an AssociationSet, with
+    integer-numbered subjects and terms
+    """
+
+    def __init__(self, subjects, subject_labels, terms, term_labels, rows, meta=None):
+        """
+        Arguments
+        ---------
+        subjects, subject_labels
+            subject ids and labels ('' for none), position = subject number
+        terms, term_labels
+            term ids and labels ('' for none), position = term number
+        rows
+            AdjacencyArrays of the sorted inferred term numbers of each subject
+        meta
+            dict describing the set (ontology, categories, taxon, release)
+        """
+        self.subjects = subjects
+        self.subject_labels = subject_labels
+        self.terms = terms
+        self.term_labels = term_labels
+        self.rows = rows
+        self.meta = meta or {}
+        self.subject_index = {id: i for i, id in enumerate(subjects)}
+        self.term_index = {id: i for i, id in enumerate(terms)}
+        self.term_counts = array('I', [0] * len(terms))
+        for j in rows.indices:
+            self.term_counts[j] += 1
+
+    @staticmethod
+    def from_association_set(aset, meta=None):
+        """
+        Compact form of an ontobio AssociationSet
+        """
+        subjects = sorted(aset.subject_to_inferred_map)
+        terms = sorted(set(term for inferred in aset.subject_to_inferred_map.values() for term in inferred))
+        term_index = {id: i for i, id in enumerate(terms)}
+        rows = [sorted(term_index[term] for term in aset.subject_to_inferred_map[subject]) for subject in subjects]
+        label_map = aset.subject_label_map or {}
+        return CompactAssociationSet(
+            subjects,
+            [label_map.get(subject) or '' for subject in subjects],
+            terms,
+            [aset.ontology.label(term) or '' if aset.ontology is not None else '' for term in terms],
+            AdjacencyArrays(*to_csr(rows)),
+            meta=meta
+        )
+
+    def __len__(self):
+        return len(self.subjects)
+
+    def nbytes(self):
+        """
+        Approximate memory used by the set
+        """
+        strings = self.subjects + self.subject_labels + self.terms + self.term_labels
+        return (sum(sys.getsizeof(s) for s in strings) +
+                len(self.rows.indptr) * self.rows.indptr.itemsize +
+                len(self.rows.indices) * self.rows.indices.itemsize +
+                len(self.term_counts) * self.term_counts.itemsize +
+                # index dicts
+                100 * (len(self.subjects) + len(self.terms)))
+
+    def inferred_types(self, subject):
+        i = self.subject_index.get(subject)
+        if i is None:
+            return set()
+        return set(self.terms[j] for j in self.rows[i])
+
+    def label(self, term):
+        j = self.term_index.get(term)
+        if j is None:
+            return None
+        return self.term_labels[j] or None
+
+    def enrichment_test(self, subjects=None, background=None, hypotheses=None, threshold=0.05, labels=False,
+                        direction='greater'):
+        """
+        Same as ontobio AssociationSet.enrichment_test: Fisher exact test
+        of each term of the subjects against the background (all the
+        subjects of the set by default), with a Bonferroni correction
+        """
+        subjects = set(subjects or [])
+        sample = [self.subject_index[s] for s in subjects if s in self.subject_index]
+        sample_size = len(subjects)
+
+        sample_count = Counter()
+        for i in sample:
+            sample_count.update(self.rows[i])
+        if hypotheses is not None:
+            numbers = set(self.term_index[c] for c in hypotheses if c in self.term_index)
+            sample_count = Counter({j: n for j, n in sample_count.items() if j in numbers})
+
+        if background is None:
+            bg_size = len(self.subjects) + sum(1 for s in subjects if s not in self.subject_index)
+            bg_count = self.term_counts
+        else:
+            # the background includes the subjects
+            background = set(background) | subjects
+            bg_size = len(background)
+            bg_count = Counter()
+            for s in background:
+                i = self.subject_index.get(s)
+                if i is not None:
+                    bg_count.update(j for j in self.rows[i] if j in sample_count)
+
+        tested = [j for j in sample_count if bg_count[j] > 1]
+        num_hypotheses = len(tested)
+        results = []
+        for j in tested:
+            a = sample_count[j]
+            b = sample_size - a
+            c = bg_count[j] - a
+            d = (bg_size - bg_count[j]) - b
+            _, p_uncorrected = fisher_exact([[a, b], [c, d]], direction)
+            p = min(p_uncorrected * num_hypotheses, 1.0)
+            if p < threshold:
+                result = {'c': self.terms[j], 'p': p, 'p_uncorrected': p_uncorrected}
+                if labels:
+                    result['n'] = self.term_labels[j] or None
+                results.append(result)
+        return sorted(results, key=lambda result: (result['p'], result['c']))
+
+    def save(self, path):
+        """
+        Write the set to a file: magic, header length, JSON header with
+        the ids and labels, then the CSR arrays. The file is written next
+        to path and renamed into place
+        """
+        indptr = array('Q', self.rows.indptr)
+        indices = array('I', self.rows.indices)
+        header = json.dumps({
+            'meta': self.meta,
+            'byteorder': sys.byteorder,
+            'subjects': self.subjects,
+            'subject_labels': self.subject_labels,
+            'terms': self.terms,
+            'term_labels': self.term_labels,
+            'indptr': len(indptr),
+            'indices': len(indices),
+        }).encode('utf-8')
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            indptr.tofile(f)
+            indices.tofile(f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError('{} is not an association set'.format(path))
+            header_len, = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(header_len).decode('utf-8'))
+            if header['byteorder'] != sys.byteorder:
+                raise ValueError('{} was written on a {} endian host'.format(path, header['byteorder']))
+            indptr = array('Q')
+            indptr.fromfile(f, header['indptr'])
+            indices = array('I')
+            indices.fromfile(f, header['indices'])
+        return CompactAssociationSet(header['subjects'], header['subject_labels'], header['terms'],
+                                     header['term_labels'], AdjacencyArrays(indptr, indices), meta=header['meta'])
+
+
+class AssociationSetCache(object):
+    """
+    CompactAssociationSets by key and release, in memory up to max_bytes
+    and in files under path (None to keep them in memory only)
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, path=None, enabled=True):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.path = get_data_path(path) if path else None
+        self.enabled = enabled
+        self.sets = OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        # key: [lock, number of requests holding or waiting for it]
+        self.build_locks = {}
+        self.stats = {'hits': 0, 'loads': 0, 'builds': 0, 'evictions': 0}
+
+    def get(self, key, release, build):
+        """
+        Set of key for the release, loaded or built with build() (which
+        returns a CompactAssociationSet) if it is not cached
+        """
+        if not self.enabled:
+            return build()
+        aset = self._lookup(key, release)
+        if aset is not None:
+            return aset
+        # builds take minutes, longer than the singleflight timeout, so
+        # concurrent requests of a key wait on a lock of their own, dropped
+        # once no request waits for it
+        with self.lock:
+            build_lock = self.build_locks.setdefault(key, [threading.Lock(), 0])
+            build_lock[1] += 1
+        try:
+            with build_lock[0]:
+                aset = self._lookup(key, release)
+                if aset is not None:
+                    return aset
+                return self._load_or_build(key, release, build)
+        finally:
+            with self.lock:
+                build_lock[1] -= 1
+                if not build_lock[1]:
+                    del self.build_locks[key]
+
+    def _lookup(self, key, release):
+        with self.lock:
+            entry = self.sets.get(key)
+            if entry is None or entry[0] != release or entry[1] <= time.time():
+                return None
+            self.sets.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[2]
+
+    def _load_or_build(self, key, release, build):
+        path = self.file_path(key, release)
+        aset = None
+        if path is not None and os.path.exists(path) and os.path.getmtime(path) + self.ttl > time.time():
+            try:
+                aset = CompactAssociationSet.load(path)
+                expires = os.path.getmtime(path) + self.ttl
+                self._count('loads')
+            except (OSError, ValueError) as e:
+                log.warning("Cannot load association set {}: {}".format(path, e))
+        if aset is None:
+            started = time.time()
+            aset = build()
+            expires = time.time() + self.ttl
+            self._count('builds')
+            log.info("Built association set {} ({} subjects) in {:.1f}s".format(
+                key, len(aset), time.time() - started))
+            if path is not None:
+                try:
+                    aset.save(path)
+                except OSError as e:
+                    log.warning("Cannot write association set {}: {}".format(path, e))
+        self._put(key, (release, expires, aset, aset.nbytes()))
+        return aset
+
+    def _put(self, key, entry):
+        with self.lock:
+            if key in self.sets:
+                self.nbytes -= self.sets.pop(key)[3]
+            self.sets[key] = entry
+            self.nbytes += entry[3]
+            # the set just added is kept even if it is larger than max_bytes
+            while self.nbytes > self.max_bytes and len(self.sets) > 1:
+                _, evicted = self.sets.popitem(last=False)
+                self.nbytes -= evicted[3]
+                self.stats['evictions'] += 1
+
+    def _count(self, counter):
+        with self.lock:
+            self.stats[counter] += 1
+
+    def file_path(self, key, release):
+        if not self.path:
+            return None
+        name = re.sub(r'[^A-Za-z0-9_.-]+', '_', '-'.join(str(part) for part in key + (release,)))
+        return os.path.join(self.path, name + '.aset')
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, enabled=self.enabled, nbytes=self.nbytes, max_bytes=self.max_bytes, sets={
+                '/'.join(str(part) for part in key): {'release': release, 'subjects': len(aset), 'nbytes': nbytes}
+                for key, (release, expires, aset, nbytes) in self.sets.items()
+            })
+
+
+def get_association_set_cache():
+    global association_set_cache
+    if association_set_cache is None:
+        cfg = get_association_sets_config()
+        association_set_cache = AssociationSetCache(
+            max_bytes=cfg.get('max_bytes', DEFAULT_MAX_BYTES),
+            ttl=cfg.get('ttl', DEFAULT_TTL),
+            path=cfg.get('path', DEFAULT_PATH),
+            enabled=cfg.get('enabled', True)
+        )
+    return association_set_cache
+
+
+def get_release():
+    from biolink.clique_cache import get_clique_cache
+    from biolink.settings import get_scigraph
+    return get_clique_cache(get_scigraph('scigraph_data')).get_version()
+
+
+def get_association_set(ontology_id, subject_category, object_category, taxon):
+    """
+    CompactAssociationSet of the subject_category to object_category
+    associations of a taxon, for the current release. The ontology is only
+    loaded when the set has to be built
+    """
+    def build():
+        from ontobio.assoc_factory import AssociationSetFactory
+        from biolink.ontology.ontology_manager import get_ontology
+        log.info("Loading {} to build association set {}".format(ontology_id, key))
+        aset = AssociationSetFactory().create(ontology=get_ontology(ontology_id), subject_category=subject_category,
+                                              object_category=object_category, taxon=taxon)
+        return CompactAssociationSet.from_association_set(aset, meta={
+            'ontology': ontology_id,
+            'subject_category': subject_category,
+            'object_category': object_category,
+            'taxon': taxon
+        })
+
+    key = (ontology_id, subject_category, object_category, taxon)
+    return get_association_set_cache().get(key, get_release(), build)
@@ -0,0 +1,389 @@
+"""
+Response cache for Resource GET methods
+
+Cached entries are keyed on the resource name, the route parameters
+(e.g. id), the query arguments and the mask header (X-Fields). Two backends are available, set
+with cache.backend in conf/config.yaml:
+
+ - memory: an LRU dict local to each worker process
+ - sqlite: a file shared by all workers on a host, surviving restarts
+
+Entries are kept stale_ttl seconds past their TTL. A stale entry is
+returned right away (X-Cache: STALE) and refreshed in the background,
+unless a backend circuit breaker is open or half open (see
+biolink.circuit_breaker): the last good response is then served as is
+until the backend recovers.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request, Response, copy_current_request_context
+from flask_restplus import Resource
+
+from biolink.settings import get_biolink_config
+from biolink import circuit_breaker
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TTL = 3600
+DEFAULT_STALE_TTL = 0
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_SQLITE_PATH = '/tmp/biolink-cache.sqlite'
+
+response_cache = None
+
+
+class MemoryCacheBackend(object):
+    """
+    Size-bounded LRU mapping of key to (expiry time, value)
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return expires, value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SqliteCacheBackend(object):
+    """
+    LRU cache stored in a sqlite file, values are stored as JSON
+
+    The file can be shared by several processes; eviction of expired
+    and least recently used entries runs every `evict_every` writes
+    """
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, max_entries=DEFAULT_MAX_ENTRIES, evict_every=100):
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self.writes = 0
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS cache '
+            '(key TEXT PRIMARY KEY, value TEXT, expires REAL, accessed REAL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+        self.connection.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires = row
+            if expires < now:
+                self.connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+                self.connection.commit()
+                return None
+            self.connection.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+            self.connection.commit()
+        return expires, json.loads(value)
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), now + ttl, now)
+            )
+            self.writes += 1
+            if self.writes % self.evict_every == 0:
+                self._evict(now)
+            self.connection.commit()
+
+    def _evict(self, now):
+        self.connection.execute('DELETE FROM cache WHERE expires < ?', (now,))
+        self.connection.execute(
+            'DELETE FROM cache WHERE key IN '
+            '(SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def delete(self, key):
+        with self.lock:
+            self.connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+            self.connection.commit()
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute('DELETE FROM cache')
+            self.connection.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+def create_backend(backend='memory', max_entries=DEFAULT_MAX_ENTRIES, path=DEFAULT_SQLITE_PATH, **kwargs):
+    if backend == 'memory':
+        return MemoryCacheBackend(max_entries=max_entries)
+    elif backend == 'sqlite':
+        return SqliteCacheBackend(path=path, max_entries=max_entries)
+    else:
+        raise ValueError('Unknown cache backend {}'.format(backend))
+
+
+class ResponseCache(object):
+    """
+    Wraps a cache backend with per-route TTLs and hit/miss counters
+
+    Values are stored for ttl + stale_ttl seconds along with the time
+    they stop being fresh
+    """
+
+    def __init__(self, backend, ttl=DEFAULT_TTL, routes=None, enabled=True, stale_ttl=DEFAULT_STALE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.routes = routes or {}
+        self.enabled = enabled
+        self.stats = {}
+        self.revalidating = set()
+        self.lock = threading.Lock()
+
+    def get_ttl(self, route):
+        return self.routes.get(route, self.ttl)
+
+    def get(self, route, key):
+        """
+        (fresh until, value) of the key, None if missing or expired
+        """
+        entry = self.backend.get(key)
+        if entry is None:
+            self._count(route, 'misses')
+            return None
+        expires, value = entry
+        fresh_until = value.get('fresh_until', expires)
+        self._count(route, 'hits' if fresh_until >= time.time() else 'stale')
+        return fresh_until, value
+
+    def set(self, route, key, value):
+        """
+        Store the value, returns the time until which it is fresh
+        """
+        ttl = self.get_ttl(route)
+        fresh_until = time.time() + ttl
+        value['fresh_until'] = fresh_until
+        self.backend.set(key, value, ttl + self.stale_ttl)
+        return fresh_until
+
+    def start_revalidation(self, key):
+        """
+        False if the key is already being revalidated
+        """
+        with self.lock:
+            if key in self.revalidating:
+                return False
+            self.revalidating.add(key)
+            return True
+
+    def end_revalidation(self, key):
+        with self.lock:
+            self.revalidating.discard(key)
+
+    def _count(self, route, counter):
+        if route not in self.stats:
+            self.stats[route] = {'hits': 0, 'stale': 0, 'misses': 0}
+        self.stats[route][counter] += 1
+
+    def get_stats(self):
+        routes = {}
+        for route, counts in self.stats.items():
+            total = counts['hits'] + counts['stale'] + counts['misses']
+            routes[route] = {
+                'hits': counts['hits'],
+                'stale': counts['stale'],
+                'misses': counts['misses'],
+                'hit_ratio': (counts['hits'] + counts['stale']) / total if total else 0.0,
+                'ttl': self.get_ttl(route)
+            }
+        return {
+            'enabled': self.enabled,
+            'backend': type(self.backend).__name__,
+            'stale_ttl': self.stale_ttl,
+            'revalidating': len(self.revalidating),
+            'entries': len(self.backend),
+            'routes': routes
+        }
+
+
+def get_response_cache():
+    global response_cache
+    if response_cache is None:
+        cfg = get_biolink_config().get('cache', {})
+        response_cache = ResponseCache(
+            create_backend(**cfg),
+            ttl=cfg.get('ttl', DEFAULT_TTL),
+            routes=cfg.get('routes'),
+            enabled=cfg.get('enabled', True),
+            stale_ttl=cfg.get('stale_ttl', DEFAULT_STALE_TTL)
+        )
+    return response_cache
+
+
+def mask_header():
+    return current_app.config.get('RESTPLUS_MASK_HEADER', 'X-Fields')
+
+
+def make_key(route, view_args, args, mask=None):
+    """
+    Normalized cache key for a resource, its route parameters, query
+    arguments and mask header (responses are cached once marshalled)
+    """
+    normalized = [
+        route,
+        sorted(view_args.items()),
+        sorted(args.items(multi=True)),
+        mask
+    ]
+    return hashlib.sha1(json.dumps(normalized).encode('utf-8')).hexdigest()
+
+
+def make_etag(data):
+    return hashlib.md5(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def cache_headers(etag, fresh_until):
+    max_age = max(int(fresh_until - time.time()), 0)
+    return {
+        'ETag': '"{}"'.format(etag),
+        'Cache-Control': 'public, max-age={}'.format(max_age),
+        'Vary': mask_header()
+    }
+
+
+def cache_response(method):
+    """
+    Resource method decorator, see CachedResource
+
+    Only successful GET responses are cached, unless their Cache-Control
+    header is no-store. Requests whose If-None-Match header matches the
+    cached ETag get an empty 304 response. Stale entries are served while
+    they are revalidated in the background, or without revalidation while
+    a backend is degraded
+    """
+    route = type(method.__self__).__name__
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        cache = get_response_cache()
+        if not cache.enabled or request.method != 'GET':
+            return method(*args, **kwargs)
+
+        key = make_key(route, request.view_args or {}, request.args, request.headers.get(mask_header()))
+        entry = cache.get(route, key)
+        if entry is None:
+            response = _fetch(method, route, cache, key, *args, **kwargs)
+            if isinstance(response, tuple) and len(response) == 3 and 'ETag' in response[2]:
+                response[2]['X-Cache'] = 'MISS'
+            return response
+
+        fresh_until, cached = entry
+        headers = cache_headers(cached['etag'], fresh_until)
+        if fresh_until >= time.time():
+            headers['X-Cache'] = 'HIT'
+        else:
+            headers.update(_serve_stale(method, route, cache, key, args, kwargs))
+        if request.if_none_match.contains(cached['etag']):
+            return Response(status=304, headers=headers)
+        return cached['data'], 200, headers
+
+    return wrapper
+
+
+def _fetch(method, route, cache, key, *args, **kwargs):
+    """
+    Response of the method, stored if successful, with its cache headers
+    """
+    response = method(*args, **kwargs)
+    if isinstance(response, Response):
+        return response
+    if isinstance(response, tuple):
+        data = response[0]
+        status = response[1] if len(response) > 1 else 200
+        headers = dict(response[2]) if len(response) > 2 else {}
+    else:
+        data, status, headers = response, 200, {}
+    if status != 200 or 'no-store' in headers.get('Cache-Control', ''):
+        return response
+
+    try:
+        etag = make_etag(data)
+    except TypeError:
+        log.warning("Response of {} is not JSON serializable, not caching".format(route))
+        return response
+    fresh_until = cache.set(route, key, {'data': data, 'etag': etag})
+    headers.update(cache_headers(etag, fresh_until))
+    return data, status, headers
+
+
+def _serve_stale(method, route, cache, key, args, kwargs):
+    """
+    Headers of a stale entry; the entry is revalidated in the background,
+    unless a backend is degraded or it is already being revalidated
+    """
+    if not circuit_breaker.degraded() and cache.start_revalidation(key):
+        threading.Thread(
+            target=copy_current_request_context(_revalidate),
+            args=(method, route, cache, key) + tuple(args),
+            kwargs=kwargs,
+            daemon=True
+        ).start()
+    return {'X-Cache': 'STALE', 'Warning': '110 - "Response is Stale"'}
+
+
+def _revalidate(method, route, cache, key, *args, **kwargs):
+    try:
+        _fetch(method, route, cache, key, *args, **kwargs)
+    except Exception as e:
+        log.warning("Could not revalidate {} response: {}".format(route, e))
+    finally:
+        cache.end_revalidation(key)
+
+
+class CachedResource(Resource):
+    """
+    Resource whose GET responses are stored in the response cache
+    """
+    method_decorators = [cache_response]
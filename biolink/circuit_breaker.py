@@ -0,0 +1,247 @@
+"""
+Circuit breakers for the Golr and SciGraph backends
+
+Each backend host gets a breaker that watches the outcome and duration
+of its last calls. When too many of them fail or are slow, the breaker
+opens and calls fail fast with BackendUnavailableException (a 503)
+instead of piling up on timeouts. After open_duration seconds it lets a
+few probe calls through (half open) and closes again if they succeed;
+probes that do not finish within probe_timeout seconds open it again.
+
+While a breaker is not closed, cached responses past their TTL are
+served as is, see biolink.cache. Breaker states are reported at
+/api/status/health; settings are in the circuit_breaker section of
+conf/config.yaml
+"""
+import logging
+import re
+import threading
+import time
+from collections import deque
+from functools import wraps
+from urllib.parse import urlsplit
+
+from biolink.error_handlers import BackendUnavailableException
+from biolink.settings import get_biolink_config
+
+log = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+breakers = {}
+breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker_config():
+    return get_biolink_config().get('circuit_breaker', {})
+
+
+class CircuitBreaker(object):
+
+    def __init__(self, name, window=50, min_calls=10, failure_rate=0.5, slow_call_duration=None,
+                 slow_call_rate=0.8, open_duration=30, half_open_calls=3, probe_timeout=60, enabled=True):
+        """
+        Arguments
+        ---------
+        name
+            backend host
+
+        window, min_calls
+            the rates are computed over the last `window` calls, once
+            there are at least `min_calls` of them
+
+        failure_rate, slow_call_rate
+            fraction of failed calls, or of calls slower than
+            slow_call_duration seconds, that opens the breaker
+
+        open_duration
+            seconds to fail fast before probing the backend again
+
+        half_open_calls
+            number of successful probes needed to close the breaker
+
+        probe_timeout
+            seconds after which the breaker opens again if the probes
+            have not all been recorded, e.g. when a probe was killed
+        """
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate = slow_call_rate
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+        self.probe_timeout = probe_timeout
+        self.enabled = enabled
+        self.outcomes = deque(maxlen=window)
+        self.state = STATE_CLOSED
+        self.opened_at = None
+        self.half_opened_at = None
+        self.probes = 0
+        self.probe_successes = 0
+        self.rejected = 0
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """
+        Whether a call may go to the backend now
+        """
+        if not self.enabled:
+            return True
+        with self.lock:
+            if self.state == STATE_OPEN and time.time() - self.opened_at >= self.open_duration:
+                log.info("Circuit breaker of {} is half open".format(self.name))
+                self.state = STATE_HALF_OPEN
+                self.half_opened_at = time.time()
+                self.probes = 0
+                self.probe_successes = 0
+            if self.state == STATE_HALF_OPEN and self.probes >= self.half_open_calls \
+                    and time.time() - self.half_opened_at >= self.probe_timeout:
+                log.warning("Circuit breaker probes of {} timed out".format(self.name))
+                self._open()
+            if self.state == STATE_CLOSED:
+                return True
+            if self.state == STATE_HALF_OPEN and self.probes < self.half_open_calls:
+                self.probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, duration, failed):
+        if not self.enabled:
+            return
+        slow = self.slow_call_duration is not None and duration >= self.slow_call_duration
+        with self.lock:
+            if self.state == STATE_HALF_OPEN:
+                if failed or slow:
+                    self._open()
+                else:
+                    self.probe_successes += 1
+                    if self.probe_successes >= self.half_open_calls:
+                        log.info("Circuit breaker of {} is closed".format(self.name))
+                        self.state = STATE_CLOSED
+                        self.outcomes.clear()
+            elif self.state == STATE_CLOSED:
+                self.outcomes.append((failed, slow))
+                if len(self.outcomes) >= self.min_calls:
+                    failure_rate, slow_rate = self._rates()
+                    if failure_rate >= self.failure_rate or slow_rate >= self.slow_call_rate:
+                        self._open()
+
+    def _open(self):
+        log.warning("Circuit breaker of {} is open".format(self.name))
+        self.state = STATE_OPEN
+        self.opened_at = time.time()
+        self.trips += 1
+
+    def _rates(self):
+        calls = len(self.outcomes)
+        if calls == 0:
+            return 0.0, 0.0
+        failures = sum(1 for failed, slow in self.outcomes if failed)
+        slow_calls = sum(1 for failed, slow in self.outcomes if slow)
+        return failures / calls, slow_calls / calls
+
+    def retry_after(self):
+        if self.state != STATE_OPEN:
+            return 0
+        return max(int(self.opened_at + self.open_duration - time.time()), 0)
+
+    def call(self, func, is_failure=None, is_client_error=None):
+        """
+        Result of func(), unless the breaker is open
+
+        is_failure tells whether a result is a failure, is_client_error
+        whether an exception is caused by the request rather than the
+        backend (these do not count as failures). Interrupted calls
+        (GreenletExit, gevent.Timeout) count as failures
+
+        :raises BackendUnavailableException
+        """
+        if not self.allow():
+            raise BackendUnavailableException(
+                '{} is unavailable, retry in {}s'.format(self.name, self.retry_after()),
+                retry_after=self.retry_after())
+        start = time.time()
+        try:
+            result = func()
+        except Exception as e:
+            self.record(time.time() - start, is_client_error is None or not is_client_error(e))
+            raise
+        except BaseException:
+            self.record(time.time() - start, True)
+            raise
+        self.record(time.time() - start, is_failure is not None and is_failure(result))
+        return result
+
+    def get_status(self):
+        with self.lock:
+            failure_rate, slow_rate = self._rates()
+            return {
+                'state': self.state,
+                'calls': len(self.outcomes),
+                'failure_rate': failure_rate,
+                'slow_call_rate': slow_rate,
+                'rejected': self.rejected,
+                'trips': self.trips,
+                'retry_after': self.retry_after()
+            }
+
+
+def get_circuit_breaker(name):
+    with breakers_lock:
+        if name not in breakers:
+            breakers[name] = CircuitBreaker(name, **get_circuit_breaker_config())
+        return breakers[name]
+
+
+def degraded():
+    """
+    Whether any backend breaker is open or half open
+    """
+    return any(breaker.state != STATE_CLOSED for breaker in list(breakers.values()))
+
+
+def server_error(response):
+    return getattr(response, 'status_code', 200) >= 500
+
+
+def solr_client_error(e):
+    # pysolr raises SolrError for both unreachable servers and error responses
+    return re.search(r'\(HTTP 4\d\d\)', str(e)) is not None
+
+
+def guarded(host_func, is_failure=None, is_client_error=None):
+    """
+    Decorator running calls through the circuit breaker of the backend
+    host returned by host_func, called with the same arguments
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            breaker = get_circuit_breaker(host_func(*args, **kwargs))
+            return breaker.call(lambda: func(*args, **kwargs), is_failure, is_client_error)
+        return wrapper
+    return decorator
+
+
+def host(url):
+    return urlsplit(url).netloc or url
+
+
+def guard_backends():
+    """
+    Put the Golr requests made through pysolr (all ontobio Golr queries)
+    behind circuit breakers; the SciGraph facade is decorated in
+    scigraph_util
+    """
+    import pysolr
+
+    send = pysolr.Solr._send_request
+    if not getattr(send, '__guarded__', False):
+        wrapper = guarded(lambda solr, *args, **kwargs: host(solr.url), is_client_error=solr_client_error)(send)
+        wrapper.__guarded__ = True
+        pysolr.Solr._send_request = wrapper
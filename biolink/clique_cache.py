@@ -0,0 +1,197 @@
+"""
+Cache of SciGraph clique leaders (id -> leader of its equivalence clique)
+
+Cliques only change when a new SciGraph graph is released, so leaders are
+cached for a long TTL, and ids without a leader are cached too (for
+negative_ttl). Keys include the SciGraph release, set as clique_cache.version
+in conf/config.yaml or derived from the versions of the SciGraph datasets,
+so that a new release starts from an empty cache.
+
+The cache uses the same memory or sqlite backends as the response cache;
+with sqlite it is shared by the workers on a host and can be preloaded with
+
+    python -m biolink.clique_cache [--scigraph NAME] IDS_FILE ...
+"""
+import argparse
+import fileinput
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from biolink.cache import create_backend
+from biolink.concurrency import concurrent_map
+from biolink.settings import get_biolink_config
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TTL = 86400
+DEFAULT_NEGATIVE_TTL = 3600
+DEFAULT_MAX_ENTRIES = 100000
+DEFAULT_SQLITE_PATH = '/tmp/biolink-clique-cache.sqlite'
+DEFAULT_VERSION_CHECK = 600
+
+clique_caches = {}
+backend = None
+
+
+def get_clique_cache_config():
+    return get_biolink_config().get('clique_cache', {})
+
+
+class CliqueLeaderCache(object):
+    """
+    Clique leader nodes of one SciGraph instance
+
+    Values are the SciGraph node dicts of the leaders (None for ids that
+    do not resolve), so that callers get a fresh BioObject each time
+    """
+
+    def __init__(self, scigraph, backend, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 version=None, version_check=DEFAULT_VERSION_CHECK, enabled=True):
+        self.scigraph = scigraph
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.fixed_version = version
+        self.version_check = version_check
+        self.enabled = enabled
+        self.version = version
+        self.version_checked = 0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0}
+
+    def get_version(self):
+        """
+        SciGraph release the cached entries belong to
+        """
+        if self.fixed_version is not None:
+            return self.fixed_version
+        now = time.time()
+        if now - self.version_checked > self.version_check:
+            self.version_checked = now
+            try:
+                self.version = release_version(self.scigraph.get_datasets())
+            except Exception as e:
+                # keep the previous version until SciGraph answers again
+                log.warning("Cannot get SciGraph release of {}: {}".format(self.scigraph.url_prefix, e))
+                if self.version is None:
+                    self.version = 'unknown'
+        return self.version
+
+    def make_key(self, id):
+        return 'clique:{}:{}:{}'.format(self.scigraph.url_prefix, self.get_version(), id)
+
+    def get_node(self, id):
+        """
+        Leader node of id, fetched from SciGraph on a cache miss; None if
+        id has no clique leader
+        """
+        found, node = self.lookup(id)
+        if not found:
+            node = self.scigraph.fetch_clique_leader_node(id)
+            self.set_node(id, node)
+        return node
+
+    def lookup(self, id):
+        """
+        Cached leader node of id, as a (found, node) tuple
+        """
+        if not self.enabled:
+            return False, None
+        entry = self.backend.get(self.make_key(id))
+        if entry is None:
+            self._count('misses')
+            return False, None
+        expires, node = entry
+        self._count('hits' if node is not None else 'negative_hits')
+        return True, node
+
+    def set_node(self, id, node):
+        if self.enabled:
+            self.backend.set(self.make_key(id), node, self.ttl if node is not None else self.negative_ttl)
+
+    def warm(self, ids):
+        """
+        Fetch and cache the leaders of the ids not already cached
+
+        Returns the number of ids that were fetched
+        """
+        missing = [id for id in set(ids) if self.backend.get(self.make_key(id)) is None]
+        fetched = 0
+        for id, (node, error) in zip(missing, concurrent_map(self.scigraph.fetch_clique_leader_node, missing)):
+            if error is not None:
+                log.warning("Cannot get clique leader of {}: {}".format(id, error))
+                continue
+            self.set_node(id, node)
+            fetched += 1
+        return fetched
+
+    def _count(self, counter):
+        with self.lock:
+            self.stats[counter] += 1
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        total = stats['hits'] + stats['negative_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['hits'] + stats['negative_hits']) / total if total else 0.0
+        stats['version'] = self.version
+        stats['enabled'] = self.enabled
+        return stats
+
+
+def release_version(datasets):
+    """
+    Short hash of the SciGraph dataset versions, changes with each release
+    """
+    versions = sorted((node.get('id'), json.dumps(node.get('meta', {}), sort_keys=True)) for node in datasets)
+    return hashlib.sha1(json.dumps(versions).encode('utf-8')).hexdigest()[:12]
+
+
+def get_clique_cache(scigraph):
+    """
+    CliqueLeaderCache of a SciGraph instance; the backend is shared by
+    all the instances of the process
+    """
+    global backend
+    if scigraph.url_prefix not in clique_caches:
+        cfg = get_clique_cache_config()
+        if backend is None:
+            backend = create_backend(
+                backend=cfg.get('backend', 'memory'),
+                max_entries=cfg.get('max_entries', DEFAULT_MAX_ENTRIES),
+                path=cfg.get('path', DEFAULT_SQLITE_PATH)
+            )
+        clique_caches[scigraph.url_prefix] = CliqueLeaderCache(
+            scigraph,
+            backend,
+            ttl=cfg.get('ttl', DEFAULT_TTL),
+            negative_ttl=cfg.get('negative_ttl', DEFAULT_NEGATIVE_TTL),
+            version=cfg.get('version'),
+            version_check=cfg.get('version_check', DEFAULT_VERSION_CHECK),
+            enabled=cfg.get('enabled', True)
+        )
+    return clique_caches[scigraph.url_prefix]
+
+
+def main():
+    from biolink.settings import get_scigraph
+
+    parser = argparse.ArgumentParser(description='Preload the clique leader cache')
+    parser.add_argument('files', nargs='*', help='files with one id per line; reads stdin if none')
+    parser.add_argument('--scigraph', default='scigraph_data', help='SciGraph instance in config.yaml')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if get_clique_cache_config().get('backend', 'memory') == 'memory':
+        log.warning("clique_cache.backend is memory, the preloaded leaders are lost when this command exits")
+    ids = [line.strip() for line in fileinput.input(args.files) if line.strip()]
+    cache = get_clique_cache(get_scigraph(args.scigraph))
+    fetched = cache.warm(ids)
+    print("{} ids, {} fetched, release {}".format(len(set(ids)), fetched, cache.version))
+
+
+if __name__ == '__main__':
+    main()
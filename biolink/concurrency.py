@@ -0,0 +1,169 @@
+"""
+Helpers for running independent backend calls concurrently
+
+Under gunicorn's gevent worker the calls are spawned as greenlets, otherwise
+they run on a small thread pool. The mode, pool size and per-request deadline
+are read from the concurrency section of conf/config.yaml
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from biolink.settings import get_biolink_config
+from biolink.tracing import propagate
+
+log = logging.getLogger(__name__)
+
+MODE_AUTO = 'auto'
+MODE_GEVENT = 'gevent'
+MODE_THREAD = 'thread'
+MODE_SERIAL = 'serial'
+
+DEFAULT_MAX_WORKERS = 8
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised (or returned) for calls that did not finish before the deadline
+    """
+    pass
+
+
+def get_concurrency_config():
+    return get_biolink_config().get('concurrency', {})
+
+
+def _gevent_is_active():
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def get_mode():
+    mode = get_concurrency_config().get('mode', MODE_AUTO)
+    if mode == MODE_AUTO:
+        mode = MODE_GEVENT if _gevent_is_active() else MODE_THREAD
+    return mode
+
+
+def fan_out(calls, timeout=None, max_workers=None):
+    """
+    Run a list of zero-argument callables concurrently
+
+    Arguments
+    ---------
+    calls
+        list of callables that do not depend on each other
+
+    timeout
+        deadline in seconds for the whole batch, defaults to
+        concurrency.deadline in config.yaml
+
+    max_workers
+        max number of calls in flight, defaults to concurrency.max_workers
+
+    Returns: list of (value, error) tuples in the same order as calls.
+    error is None on success; calls still running at the deadline get
+    a DeadlineExceeded error and their result is discarded
+    """
+    return list(concurrent_map(lambda call: call(), calls, timeout=timeout, max_workers=max_workers))
+
+
+def concurrent_map(func, items, timeout=None, max_workers=None):
+    """
+    Apply func to each item concurrently, with at most max_workers in flight
+
+    Generator of (value, error) tuples in the order of items. Each tuple is
+    yielded as soon as it and all the preceding ones are done, so results can
+    be streamed while later items are still being fetched. The deadline and
+    pool size default to the concurrency section of config.yaml
+    """
+    items = list(items)
+    if len(items) == 0:
+        return
+    cfg = get_concurrency_config()
+    if timeout is None:
+        timeout = cfg.get('deadline')
+    if max_workers is None:
+        max_workers = cfg.get('max_workers', DEFAULT_MAX_WORKERS)
+    max_workers = max(1, min(max_workers, len(items)))
+    func = propagate(func)
+    deadline = time.time() + timeout if timeout is not None else None
+
+    mode = get_mode()
+    if mode == MODE_SERIAL or len(items) == 1:
+        runner = _run_serial
+    elif mode == MODE_GEVENT:
+        runner = _run_greenlets
+    else:
+        runner = _run_threads
+    for result in runner(func, items, deadline, max_workers):
+        yield result
+
+
+def _remaining(deadline):
+    if deadline is None:
+        return None
+    return max(deadline - time.time(), 0)
+
+
+def _deadline_exceeded():
+    return None, DeadlineExceeded('deadline exceeded')
+
+
+def _run_serial(func, items, deadline, max_workers):
+    for item in items:
+        if deadline is not None and time.time() > deadline:
+            yield _deadline_exceeded()
+            continue
+        try:
+            yield func(item), None
+        except Exception as e:
+            yield None, e
+
+
+def _run_threads(func, items, deadline, max_workers):
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = []
+    try:
+        futures += [executor.submit(func, item) for item in items]
+        for future in futures:
+            wait([future], timeout=_remaining(deadline))
+            if not future.done():
+                future.cancel()
+                yield _deadline_exceeded()
+            elif future.exception() is not None:
+                yield None, future.exception()
+            else:
+                yield future.result(), None
+    finally:
+        # Do not block on stragglers, they are abandoned
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def _run_greenlets(func, items, deadline, max_workers):
+    import gevent
+    from gevent.lock import BoundedSemaphore
+
+    semaphore = BoundedSemaphore(max_workers)
+
+    def bounded(item):
+        with semaphore:
+            return func(item)
+
+    greenlets = [gevent.spawn(bounded, item) for item in items]
+    try:
+        for greenlet in greenlets:
+            greenlet.join(timeout=_remaining(deadline))
+            if not greenlet.ready():
+                yield _deadline_exceeded()
+            elif not greenlet.successful():
+                yield None, greenlet.exception
+            else:
+                yield greenlet.value, None
+    finally:
+        gevent.killall([greenlet for greenlet in greenlets if not greenlet.ready()], block=False)
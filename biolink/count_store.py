@@ -0,0 +1,278 @@
+"""
+Materialized association counts of bioentities
+
+The association counts of a bioentity (get_association_counts, shown on
+every entity page) only change with a data release. They are stored in a
+sqlite file shared by the workers on a host, keyed on the clique leader,
+its type and the release (see biolink.clique_cache), and looked up before
+asking Golr. Counts computed on a miss are stored too.
+
+The store also keeps how often the counts of each bioentity are
+requested, so that a background job can precompute the most requested
+ones after a release, or those of the ids listed in files:
+
+    python -m biolink.count_store build --top 10000
+    python -m biolink.count_store build --type gene GENE_IDS_FILE ...
+    python -m biolink.count_store stats
+
+Settings are in the count_store section of conf/config.yaml
+"""
+import argparse
+import fileinput
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from biolink.settings import get_biolink_config, get_data_path
+
+log = logging.getLogger(__name__)
+
+# relative to the data directory, see settings.get_data_path
+DEFAULT_PATH = 'association-counts.sqlite'
+
+# request counts are written to the store every FLUSH_REQUESTS lookups
+FLUSH_REQUESTS = 100
+
+# ids computed per batch by the build job
+BUILD_BATCH_SIZE = 50
+
+# release of the clique cache when SciGraph cannot tell it
+UNKNOWN_RELEASE = 'unknown'
+
+count_store = None
+count_store_lock = threading.Lock()
+
+
+def get_count_store_config():
+    return get_biolink_config().get('count_store', {})
+
+
+class AssociationCountStore(object):
+    """
+    Association counts per release, clique leader, type and kind of counts
+    (distinct or not), in a sqlite file
+    """
+
+    def __init__(self, path=DEFAULT_PATH, flush_requests=FLUSH_REQUESTS):
+        path = get_data_path(path)
+        self.path = path
+        self.flush_requests = flush_requests
+        self.lock = threading.RLock()
+        self.stats = {'hits': 0, 'misses': 0}
+        self.requests = Counter()
+        self.pending_requests = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS counts '
+            '(release TEXT, id TEXT, type TEXT, distinct_counts INTEGER, counts TEXT, updated REAL, '
+            'PRIMARY KEY (release, id, type, distinct_counts))'
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS requests '
+            '(id TEXT, type TEXT, requests INTEGER, PRIMARY KEY (id, type))'
+        )
+        self.connection.commit()
+
+    def get(self, release, id, type, distinct_counts=False):
+        """
+        Stored counts, None if there are none for this release; the
+        request is counted
+        """
+        with self.lock:
+            counts = self.lookup(release, id, type, distinct_counts)
+            self.stats['hits' if counts is not None else 'misses'] += 1
+            self.count_request(id, type)
+        return counts
+
+    def lookup(self, release, id, type, distinct_counts=False):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT counts FROM counts WHERE release = ? AND id = ? AND type = ? AND distinct_counts = ?',
+                (release, id, type, int(distinct_counts))
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, release, id, type, distinct_counts, counts):
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO counts (release, id, type, distinct_counts, counts, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (release, id, type, int(distinct_counts), json.dumps(counts, separators=(',', ':')), time.time())
+            )
+            self.connection.commit()
+
+    def count_request(self, id, type):
+        with self.lock:
+            self.requests[(id, type)] += 1
+            self.pending_requests += 1
+            if self.pending_requests >= self.flush_requests:
+                self.flush()
+
+    def flush(self):
+        """
+        Add the request counts of this process to the store
+        """
+        with self.lock:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO requests (id, type, requests) VALUES (?, ?, 0)',
+                list(self.requests)
+            )
+            self.connection.executemany(
+                'UPDATE requests SET requests = requests + ? WHERE id = ? AND type = ?',
+                [(count, id, type) for (id, type), count in self.requests.items()]
+            )
+            self.connection.commit()
+            self.requests.clear()
+            self.pending_requests = 0
+
+    def most_requested(self, limit=None):
+        """
+        (id, type) of the most requested counts, the most requested first
+        """
+        with self.lock:
+            self.flush()
+            rows = self.connection.execute(
+                'SELECT id, type FROM requests ORDER BY requests DESC, id LIMIT ?',
+                (limit if limit is not None else -1,)
+            ).fetchall()
+        return [(id, type) for id, type in rows]
+
+    def prune(self, release):
+        """
+        Remove the counts of the other releases, returns the number removed
+        """
+        with self.lock:
+            removed = self.connection.execute('DELETE FROM counts WHERE release != ?', (release,)).rowcount
+            self.connection.commit()
+        return removed
+
+    def get_stats(self):
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT release, COUNT(*), MAX(updated) FROM counts GROUP BY release'
+            ).fetchall()
+            total = self.stats['hits'] + self.stats['misses']
+            stats = dict(self.stats, hit_ratio=self.stats['hits'] / total if total else 0.0)
+        stats['releases'] = {release: {'entries': count, 'updated': updated} for release, count, updated in rows}
+        return stats
+
+
+def get_count_store():
+    """
+    AssociationCountStore configured in config.yaml, None if it is disabled
+    """
+    global count_store
+    cfg = get_count_store_config()
+    if not cfg.get('enabled', False):
+        return None
+    # created under a lock, the first requests of a worker often arrive together
+    with count_store_lock:
+        if count_store is None:
+            count_store = AssociationCountStore(path=cfg.get('path', DEFAULT_PATH))
+    return count_store
+
+
+def get_release(scigraph):
+    from biolink.clique_cache import get_clique_cache
+    return get_clique_cache(scigraph).get_version()
+
+
+def get_association_counts(scigraph, id, type, distinct_counts=False, approximate=False):
+    """
+    Association counts of the clique leader id, from the store if they
+    are there for the current release, else computed and stored
+
+    Approximate distinct counts are served from stored exact ones, and
+    are not stored themselves
+    """
+    from biolink.api.bio.association_counts import get_association_counts as compute_counts
+
+    store = get_count_store()
+    release = get_release(scigraph) if store is not None else None
+    # without a known release, stored counts could be from another one
+    if release is None or release == UNKNOWN_RELEASE:
+        return compute_counts(id, type, distinct_counts=distinct_counts, approximate=approximate)
+    counts = store.get(release, id, type, distinct_counts)
+    if counts is None:
+        counts = compute_counts(id, type, distinct_counts=distinct_counts, approximate=approximate)
+        if not (distinct_counts and approximate):
+            store.put(release, id, type, distinct_counts, counts)
+    return counts
+
+
+def build(store, scigraph, entities, distinct_counts=False, batch_size=BUILD_BATCH_SIZE):
+    """
+    Compute and store the counts of the (id, type) entities not already
+    stored for the current release
+
+    Returns the number of entities computed
+    """
+    from biolink.api.bio.association_counts import get_association_counts as compute_counts
+    from biolink.concurrency import concurrent_map
+
+    release = get_release(scigraph)
+    missing = [(id, type) for id, type in entities
+               if store.lookup(release, id, type, distinct_counts) is None]
+    computed = 0
+    # in batches, each one gets the concurrency deadline
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        results = concurrent_map(lambda entity: compute_counts(*entity, distinct_counts=distinct_counts), batch)
+        for (id, type), (counts, error) in zip(batch, results):
+            if error is not None:
+                log.warning("Cannot get association counts of {} {}: {}".format(type, id, error))
+                continue
+            store.put(release, id, type, distinct_counts, counts)
+            computed += 1
+        log.info("{}/{} association counts computed".format(computed, len(missing)))
+    return computed
+
+
+def main():
+    from biolink.settings import get_scigraph
+
+    parser = argparse.ArgumentParser(description='Manage the materialized association counts')
+    subparsers = parser.add_subparsers(dest='command')
+    build_parser = subparsers.add_parser('build', help='compute the counts of the most requested or listed ids')
+    build_parser.add_argument('files', nargs='*', help='files with one id per line, of type --type')
+    build_parser.add_argument('--type', help='type of the ids in the files, e.g. gene, disease or phenotype')
+    build_parser.add_argument('--top', type=int, help='number of most requested ids, default all of them')
+    build_parser.add_argument('--distinct', action='store_true', help='compute distinct counts')
+    build_parser.add_argument('--prune', action='store_true', help='remove the counts of previous releases')
+    subparsers.add_parser('stats', help='print the number of stored counts per release')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    store = AssociationCountStore(path=get_count_store_config().get('path', DEFAULT_PATH))
+    if args.command != 'build':
+        print(json.dumps(store.get_stats(), indent=2))
+        return
+
+    scigraph = get_scigraph('scigraph_data')
+    if args.files:
+        if args.type is None:
+            parser.error('--type is required with files')
+        ids = [line.strip() for line in fileinput.input(args.files) if line.strip()]
+        # counts are keyed on clique leaders
+        entities = []
+        for id in ids:
+            try:
+                entities.append((scigraph.get_clique_leader(id).id, args.type))
+            except Exception as e:
+                log.warning("Cannot get clique leader of {}: {}".format(id, e))
+    else:
+        entities = store.most_requested(args.top)
+    computed = build(store, scigraph, entities, distinct_counts=args.distinct)
+    print("{} entities, {} computed, release {}".format(len(entities), computed, get_release(scigraph)))
+    if args.prune:
+        print("{} counts of previous releases removed".format(store.prune(get_release(scigraph))))
+
+
+if __name__ == '__main__':
+    main()
@@ -135,6 +135,17 @@ disease_object = api.inherit('DiseaseObject', bio_object, {
     'clinical_modifiers': fields.List(fields.Nested(named_object_core), description='Clinical modifiers such as age of onset, pace of progression, and temporal patterns'),
 })
 
+bio_object_batch_input = api.model('BioObjectBatchInput', {
+    'ids': fields.List(fields.String(description='ID or CURIE'), description='ids to look up, e.g. NCBIGene:84570, MONDO:0007947', required=True),
+    'type': fields.String(description='bioentity type shared by all ids, e.g. gene, disease'),
+})
+
+bio_object_batch_result = api.model('BioObjectBatchResult', {
+    'id': fields.String(description='ID as given in the request'),
+    'bio_object': fields.Nested(bio_object, allow_null=True, description='Object for this id, null if it could not be resolved'),
+    'error': fields.Raw(description='Error for this id, if it could not be resolved'),
+})
+
 # Assoc
 
 annotation_extension = api.model('AnnotationExtension', {
@@ -183,7 +194,8 @@ compact_association_set = api.model('CompactAssociationSet', {
 association_results = api.inherit('AssociationResults', search_result, {
     'associations': fields.List(fields.Nested(association), description='Complete representation of full association object, plus evidence'),
     'compact_associations': fields.List(fields.Nested(compact_association_set), description='Compact representation in which objects (e.g. phenotypes) are collected for subject-predicate pairs'),
-    'objects': fields.List(fields.String, description='List of distinct objects used')
+    'objects': fields.List(fields.String, description='List of distinct objects used'),
+    'next_cursor': fields.String(description='cursor of the next page, if the request has a cursor and there are more results')
 })
 
 d2p_association = api.inherit('D2PAssociation', association, {
@@ -206,7 +218,8 @@ d2p_association_results = api.inherit('D2PAssociationResults', search_result, {
                                         description='Compact representation in which objects '
                                                     '(e.g. phenotypes) are collected '
                                                     'for subject-predicate pairs'),
-    'objects': fields.List(fields.String, description='List of distinct objects used')
+    'objects': fields.List(fields.String, description='List of distinct objects used'),
+    'next_cursor': fields.String(description='cursor of the next page, if the request has a cursor and there are more results')
 })
 
 
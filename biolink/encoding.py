@@ -0,0 +1,178 @@
+"""
+Response encoders of the api, chosen from the request Accept header
+
+ - application/json: the json module, as flask-restplus, or orjson if
+   configured and installed
+ - application/msgpack (or application/x-msgpack): MessagePack, if msgpack is installed
+ - application/cbor: CBOR, if cbor2 is installed
+
+The default JSON output is byte for byte the flask-restplus one. orjson
+is faster and writes the same values, but without the spaces after
+separators and with non-ASCII characters as UTF-8 rather than \\u
+escapes, so it is opt-in (json: orjson). Responses orjson cannot encode
+(e.g. integers over 64 bits) fall back to the json module, as do all
+responses when RESTPLUS_JSON is set or in debug mode.
+
+Default JSON responses with at least stream_rows associations (or other
+List(Nested) elements of their model) are streamed: each element is
+marshalled and encoded as the response is written, see
+biolink.marshalling.iter_json. The body is the same, but streamed
+responses are not kept in the response cache.
+
+Settings are in the encoding section of conf/config.yaml
+"""
+import json
+import logging
+
+from flask import current_app, make_response, request, Response, stream_with_context
+
+from biolink.settings import get_biolink_config
+from biolink.tracing import span
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+log = logging.getLogger(__name__)
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+X_MSGPACK = 'application/x-msgpack'
+CBOR = 'application/cbor'
+
+JSON_STDLIB = 'stdlib'
+JSON_ORJSON = 'orjson'
+
+DEFAULT_STREAM_ROWS = 5000
+# size of the chunks of streamed responses
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def get_encoding_config():
+    return get_biolink_config().get('encoding', {})
+
+
+def encode_json(data, **settings):
+    return (json.dumps(data, **settings) + "\n").encode('utf-8')
+
+
+def encode_orjson(data):
+    try:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+    except TypeError as e:
+        log.debug("orjson could not encode the response ({}), using json".format(e))
+        return encode_json(data)
+
+
+def encode_msgpack(data):
+    return msgpack.packb(data, use_bin_type=True)
+
+
+def encode_cbor(data):
+    return cbor2.dumps(data)
+
+
+def get_json_encoder(name=None):
+    """
+    Encoder of the json setting, the json module if orjson is not installed
+    """
+    if name is None:
+        name = get_encoding_config().get('json', JSON_STDLIB)
+    if name == JSON_ORJSON and orjson is not None:
+        return encode_orjson
+    return encode_json
+
+
+def get_encoders():
+    """
+    Encoder of each available media type, application/json first
+    """
+    cfg = get_encoding_config()
+    encoders = [(JSON, get_json_encoder(cfg.get('json', JSON_STDLIB)))]
+    if cfg.get('msgpack', True) and msgpack is not None:
+        encoders += [(MSGPACK, encode_msgpack), (X_MSGPACK, encode_msgpack)]
+    if cfg.get('cbor', True) and cbor2 is not None:
+        encoders.append((CBOR, encode_cbor))
+    return encoders
+
+
+def representation(mediatype, encode):
+    """
+    flask-restplus representation function of an encoder
+    """
+    def output(data, code, headers=None):
+        with span('encoding', mediatype):
+            if mediatype == JSON:
+                settings = current_app.config.get('RESTPLUS_JSON', {})
+                if settings or current_app.debug:
+                    settings = dict(settings)
+                    if current_app.debug:
+                        settings.setdefault('indent', 4)
+                    body = encode_json(data, **settings)
+                else:
+                    body = encode(data)
+            else:
+                body = encode(data)
+        response = make_response(body, code)
+        response.headers.extend(headers or {})
+        response.vary.add('Accept')
+        return response
+    return output
+
+
+def stream_json(representations, model, data, code=200, headers=None):
+    """
+    Streamed JSON response of data marshalled with a
+    biolink.marshalling.CompiledModel, if the request gets the default
+    JSON encoding and data has at least stream_rows elements; None
+    otherwise
+    """
+    stream_rows = get_encoding_config().get('stream_rows', DEFAULT_STREAM_ROWS)
+    if not stream_rows or code != 200 or model.stream_length(data) < stream_rows:
+        return None
+    mediatype = request.accept_mimetypes.best_match(representations, default=JSON)
+    if mediatype != JSON or get_json_encoder() is not encode_json or \
+            current_app.config.get('RESTPLUS_JSON') or current_app.debug:
+        return None
+    response = Response(stream_with_context(json_chunks(model.iter_json(data))), code, mimetype=JSON)
+    response.headers.extend(headers or {})
+    response.vary.add('Accept')
+    return response
+
+
+def json_chunks(chunks):
+    """
+    The text chunks of iter_json, with the final newline of encode_json,
+    joined into chunks of about STREAM_CHUNK_SIZE bytes
+    """
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= STREAM_CHUNK_SIZE:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    buffer.append("\n")
+    yield ''.join(buffer).encode('utf-8')
+
+
+def init_api(api):
+    """
+    Register the encoders as representations of the api; the media type
+    is negotiated by flask-restplus, JSON being the default
+    """
+    for mediatype, encode in get_encoders():
+        api.representations[mediatype] = representation(mediatype, encode)
@@ -52,6 +52,15 @@ class UnhandledException(CustomException):
     def __init__(self, message, status_code=500, debug=None):
         CustomException.__init__(self, message, status_code, debug)
 
+class BackendUnavailableException(CustomException):
+    """
+    Use this exception when a backend is known to be down, e.g. when its
+    circuit breaker is open
+    """
+    def __init__(self, message, status_code=503, debug=None, retry_after=None):
+        CustomException.__init__(self, message, status_code, debug)
+        self.retry_after = retry_after
+
 @api.errorhandler
 def default_error_handler(e):
     """
@@ -104,6 +113,18 @@ def unhandled_exception_handler(e):
     logging.error(message)
     return e.to_dict(), e.status_code
 
+@api.errorhandler(BackendUnavailableException)
+def backend_unavailable_exception_handler(e):
+    """
+    Error handler to handle BackendUnavailableException
+    """
+    message = e.message
+    logging.warning(message)
+    headers = {}
+    if e.retry_after is not None:
+        headers['Retry-After'] = str(e.retry_after)
+    return e.to_dict(), e.status_code, headers
+
 @api.errorhandler(InvalidSyntax)
 def invalid_syntax_exception_handler(e):
     """
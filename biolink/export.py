@@ -0,0 +1,161 @@
+"""
+Streaming export of Golr associations
+
+Associations are read from Golr one page at a time using Solr cursor marks
+and written out as they arrive, either as newline delimited JSON (one compact
+association per line) or as TSV (one subject/relation/object row per line).
+Only a single page of documents is held in memory at any point.
+"""
+import json
+import logging
+import zlib
+
+from flask import Response, stream_with_context
+from ontobio.golr.golr_query import GolrAssociationQuery, M, map_field
+
+log = logging.getLogger(__name__)
+
+FORMAT_JSON = 'json'
+FORMAT_NDJSON = 'ndjson'
+FORMAT_TSV = 'tsv'
+
+STREAM_FORMATS = [FORMAT_NDJSON, FORMAT_TSV]
+
+MIMETYPES = {
+    FORMAT_NDJSON: 'application/x-ndjson',
+    FORMAT_TSV: 'text/tab-separated-values'
+}
+
+TSV_COLUMNS = ['subject', 'subject_label', 'relation', 'object']
+
+DEFAULT_PAGE_SIZE = 5000
+
+# Flush the compressor once this many bytes of uncompressed text are pending
+GZIP_FLUSH_SIZE = 64 * 1024
+
+
+def iterate_docs(query, params=None, page_size=DEFAULT_PAGE_SIZE, sort=None):
+    """
+    Generator of raw Solr documents for a GolrAssociationQuery
+
+    Pages are requested with cursorMark, which unlike start/rows paging
+    costs the same for the last page as for the first one
+    """
+    if params is None:
+        params = query.solr_params()
+    params = dict(params)
+    params.pop('start', None)
+    params['rows'] = page_size
+    sort_fields = [sort] if sort is not None else []
+    params['sort'] = ', '.join(['{} asc'.format(field) for field in sort_fields + [M.ID]])
+    cursor = '*'
+    while True:
+        results = query.solr.search(cursorMark=cursor, **params)
+        for doc in results.docs:
+            yield doc
+        next_cursor = results.raw_response.get('nextCursorMark')
+        if next_cursor is None or next_cursor == cursor:
+            break
+        cursor = next_cursor
+
+
+def stream_compact_associations(subject_category, object_category, taxon, page_size=DEFAULT_PAGE_SIZE, **kwargs):
+    """
+    Streaming counterpart of ontobio's bulk_fetch
+
+    Yields the same compact associations ({subject, subject_label, relation,
+    objects}) as bulk_fetch. Documents are sorted on subject so that all the
+    objects of a subject are read in one run and can be grouped as they arrive.
+    """
+    log.info("Streaming bulk query: {} {} {}".format(subject_category, object_category, taxon))
+    query = GolrAssociationQuery(
+        subject_category=subject_category,
+        object_category=object_category,
+        subject_taxon=taxon,
+        use_compact_associations=True,
+        facet_fields=[],
+        **kwargs
+    )
+    # also sets invert_subject_object and field_mapping on the query
+    params = query.solr_params()
+    subject_field = M.OBJECT if query.invert_subject_object else M.SUBJECT
+    subject_field = map_field(subject_field, query.field_mapping)
+
+    run = []
+    run_subject = None
+    for doc in iterate_docs(query, params, page_size=page_size, sort=subject_field):
+        subject = doc.get(subject_field)
+        if subject != run_subject and len(run) > 0:
+            for association in _translate_run(query, run):
+                yield association
+            run = []
+        run_subject = subject
+        run.append(doc)
+    for association in _translate_run(query, run):
+        yield association
+
+
+def _translate_run(query, docs):
+    return query.translate_docs_compact(
+        docs,
+        field_mapping=query.field_mapping,
+        slim=query.slim,
+        invert_subject_object=query.invert_subject_object,
+        map_identifiers=query.map_identifiers
+    )
+
+
+def ndjson_lines(associations):
+    for association in associations:
+        yield json.dumps(association) + '\n'
+
+
+def tsv_lines(associations):
+    yield '\t'.join(TSV_COLUMNS) + '\n'
+    for association in associations:
+        for obj in association['objects']:
+            row = [association['subject'], association['subject_label'], association['relation'], obj]
+            yield '\t'.join([_tsv_value(value) for value in row]) + '\n'
+
+
+def _tsv_value(value):
+    if value is None:
+        return ''
+    return str(value).replace('\t', ' ').replace('\n', ' ')
+
+
+def gzip_chunks(lines, flush_size=GZIP_FLUSH_SIZE):
+    """
+    Compress a stream of text lines into gzip chunks on the fly
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending += len(data)
+        chunk = compressor.compress(data)
+        if pending >= flush_size:
+            chunk += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def stream_response(associations, fmt, compress=False, filename='associations'):
+    """
+    Chunked response writing associations as NDJSON or TSV
+    """
+    if fmt == FORMAT_TSV:
+        lines = tsv_lines(associations)
+    else:
+        lines = ndjson_lines(associations)
+    headers = {
+        'Content-Disposition': 'attachment; filename="{}.{}"'.format(filename, fmt)
+    }
+    if compress:
+        body = gzip_chunks(lines)
+        headers['Content-Encoding'] = 'gzip'
+    else:
+        body = (line.encode('utf-8') for line in lines)
+    return Response(stream_with_context(body), mimetype=MIMETYPES[fmt], headers=headers)
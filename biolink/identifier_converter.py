@@ -1,82 +1,219 @@
 import logging
-from biolink.settings import get_biolink_config
-from scigraph.scigraph_util import SciGraph
+from collections import OrderedDict
+
+from biolink.settings import get_scigraph
+from biolink.concurrency import concurrent_map
+from biolink.xref_store import get_xref_store, GENE_TO_PROTEIN, PROTEIN_TO_GENE
 from biothings_client import get_client
 
+# MyGeneInfo querymany scopes of the gene id prefixes
+MYGENE_SCOPES = {
+    'NCBIGene': 'entrezgene',
+    'HGNC': 'HGNC',
+    'ENSEMBL': 'ensembl.gene'
+}
+
+
+class IdentifierConverter(object):
+    """
+    Base class of the converters, looking ids up in the xref store (see
+    biolink.xref_store) before converting them remotely
 
-class SciGraphIdentifierConverter(object):
+    Subclasses implement fetch_genes_to_proteins and fetch_proteins_to_genes,
+    returning a dict of the ids they could convert; ids that could not be
+    looked up (e.g. on a connection error) are left out and not stored
+    """
+    source = None
+
+    def __init__(self):
+        self.xref_store = get_xref_store()
+
+    def convert_genes_to_proteins(self, identifiers):
+        """
+        Returns an OrderedDict of each distinct gene ID to its list of UniProtKB IDs
+        """
+        return self._convert(GENE_TO_PROTEIN, self.fetch_genes_to_proteins, identifiers)
+
+    def convert_proteins_to_genes(self, identifiers):
+        """
+        Returns an OrderedDict of each distinct UniProtKB ID to its list of gene IDs
+        """
+        return self._convert(PROTEIN_TO_GENE, self.fetch_proteins_to_genes, identifiers)
+
+    def _convert(self, direction, fetch, identifiers):
+        identifiers = list(OrderedDict.fromkeys(identifiers))
+        converted = {}
+        if self.xref_store is not None:
+            converted.update(self.xref_store.get_many(direction, identifiers))
+        missing = [identifier for identifier in identifiers if identifier not in converted]
+        if len(missing) > 0:
+            fetched = fetch(missing)
+            if self.xref_store is not None:
+                self.xref_store.put_many(direction, fetched, self.source)
+            converted.update(fetched)
+        return OrderedDict((identifier, converted.get(identifier, [])) for identifier in identifiers)
+
+
+class SciGraphIdentifierConverter(IdentifierConverter):
     """
     Class for performing ID conversion using SciGraph
     """
+    source = 'scigraph'
+
     def __init__(self):
-        self.scigraph = SciGraph(get_biolink_config()['scigraph_data']['url'])
+        super(SciGraphIdentifierConverter, self).__init__()
+        self.scigraph = get_scigraph('scigraph_data')
 
     def convert_gene_to_protein(self, identifier):
         """
         Query SciGraph with a gene ID and get its corresponding UniProtKB ID
         """
-        protein_ids = self.scigraph.gene_to_uniprot_proteins(identifier)
-        return protein_ids
+        return self.convert_genes_to_proteins([identifier])[identifier]
 
     def convert_protein_to_gene(self, identifier):
         """
         Query SciGraph with UniProtKB ID and get its corresponding HGNC gene ID
         """
-        gene_ids = self.scigraph.uniprot_protein_to_genes(identifier)
-        return gene_ids
+        return self.convert_proteins_to_genes([identifier])[identifier]
+
+    def fetch_genes_to_proteins(self, identifiers):
+        """
+        Genes looked up concurrently in SciGraph
+        """
+        return self._fetch_all(self.scigraph.gene_to_uniprot_proteins, identifiers)
+
+    def fetch_proteins_to_genes(self, identifiers):
+        """
+        Proteins looked up concurrently in SciGraph
+        """
+        return self._fetch_all(self.scigraph.uniprot_protein_to_genes, identifiers)
+
+    def _fetch_all(self, convert, identifiers):
+        converted = OrderedDict()
+        for identifier, (ids, error) in zip(identifiers, concurrent_map(convert, identifiers)):
+            if error is not None:
+                logging.warning("Could not convert {}: {}".format(identifier, error))
+            else:
+                converted[identifier] = ids
+        return converted
 
 
-class MyGeneInfoIdentifierConverter(object):
+class MyGeneInfoIdentifierConverter(IdentifierConverter):
     """
     Class for performing ID conversion using MyGeneInfo
     """
+    source = 'mygene'
+
     def __init__(self):
+        super(MyGeneInfoIdentifierConverter, self).__init__()
         self.mygene_client = get_client('gene')
 
     def convert_gene_to_protein(self, identifier):
         """
         Query MyGeneInfo with a gene ID and get its corresponding UniProtKB ID
         """
-        uniprot_ids = []
+        return self.convert_genes_to_proteins([identifier])[identifier]
+
+    def convert_protein_to_gene(self, identifier):
+        """
+        Query MyGeneInfo with UniProtKB ID and get its corresponding HGNC gene ID
+        """
+        return self.convert_proteins_to_genes([identifier])[identifier]
+
+    def fetch_genes_to_proteins(self, identifiers):
+        """
+        Genes looked up with one MyGeneInfo querymany request per gene ID
+        prefix; genes with other prefixes are queried one by one
+        """
+        converted = OrderedDict()
+        by_scope = {}
+        for identifier in identifiers:
+            prefix, _, local_id = identifier.partition(':')
+            if prefix in MYGENE_SCOPES:
+                by_scope.setdefault(MYGENE_SCOPES[prefix], OrderedDict())[local_id] = identifier
+            else:
+                uniprot_ids = self._query_gene_to_protein(identifier)
+                if uniprot_ids is not None:
+                    converted[identifier] = uniprot_ids
+
+        for scope, identifiers_by_query in by_scope.items():
+            hits = self._querymany(list(identifiers_by_query), scope, 'uniprot')
+            if hits is None:
+                continue
+            for identifier in identifiers_by_query.values():
+                converted[identifier] = []
+            for hit in hits:
+                identifier = identifiers_by_query.get(str(hit.get('query')))
+                if identifier is not None:
+                    converted[identifier] += uniprot_ids_of_hit(hit)
+        return converted
+
+    def fetch_proteins_to_genes(self, identifiers):
+        """
+        Proteins looked up with a single MyGeneInfo querymany request; like
+        a MyGeneInfo query, only the HGNC gene of the best hit is used
+        """
+        identifiers_by_query = OrderedDict((identifier.split(':', 1)[-1], identifier) for identifier in identifiers)
+        hits = self._querymany(list(identifiers_by_query), 'uniprot', 'HGNC')
+        if hits is None:
+            return {}
+        converted = OrderedDict((identifier, []) for identifier in identifiers)
+        for hit in hits:
+            identifier = identifiers_by_query.get(str(hit.get('query')))
+            gene_id = hgnc_id_of_hit(hit)
+            if identifier is not None and gene_id is not None and len(converted[identifier]) == 0:
+                converted[identifier].append(gene_id)
+        return converted
+
+    def _query_gene_to_protein(self, identifier):
         if identifier.startswith('NCBIGene:'):
             # MyGeneInfo uses 'entrezgene' prefix instead of 'NCBIGene'
             identifier = identifier.replace('NCBIGene', 'entrezgene')
         try:
             results = self.mygene_client.query(identifier, fields='uniprot')
-            if results['hits']:
-                for hit in results['hits']:
-                    if 'Swiss-Prot' in hit['uniprot']:
-                        uniprot_id = hit['uniprot']['Swiss-Prot']
-                        if not uniprot_id.startswith('UniProtKB'):
-                            uniprot_id = "UniProtKB:{}".format(uniprot_id)
-                        uniprot_ids.append(uniprot_id)
-                    else:
-                        trembl_ids = hit['uniprot']['TrEMBL']
-                        for x in trembl_ids:
-                            if not x.startswith('UniProtKB'):
-                                x = "UniProtKB:{}".format(x)
-                            uniprot_ids.append(x)
         except ConnectionError:
             logging.error("ConnectionError while querying MyGeneInfo with {}".format(identifier))
-
+            return None
+        uniprot_ids = []
+        for hit in results['hits'] or []:
+            uniprot_ids += uniprot_ids_of_hit(hit)
         return uniprot_ids
 
-    def convert_protein_to_gene(self, identifier):
+    def _querymany(self, queries, scopes, fields):
         """
-        Query MyGeneInfo with UniProtKB ID and get its corresponding HGNC gene ID
+        Hits of a MyGeneInfo querymany request, None if it failed
         """
-        gene_id = None
-        if identifier.startswith('UniProtKB'):
-            identifier = identifier.split(':', 1)[1]
-
         try:
-            results = self.mygene_client.query(identifier, fields='HGNC')
-            if results['hits']:
-                hit = results['hits'][0]
-                gene_id = hit['HGNC']
-                if not gene_id.startswith('HGNC'):
-                    gene_id = 'HGNC:{}'.format(gene_id)
+            return [hit for hit in self.mygene_client.querymany(queries, scopes=scopes, fields=fields,
+                                                                 returnall=False, verbose=False)
+                    if not hit.get('notfound')]
         except ConnectionError:
-            logging.error("ConnectionError while querying MyGeneInfo with {}".format(identifier))
+            logging.error("ConnectionError while querying MyGeneInfo with {} ids".format(len(queries)))
+            return None
+
+
+def uniprot_ids_of_hit(hit):
+    """
+    UniProtKB IDs of a MyGeneInfo hit: its Swiss-Prot ID, or failing that
+    its TrEMBL IDs
+    """
+    uniprot = hit.get('uniprot')
+    if not uniprot:
+        return []
+    if 'Swiss-Prot' in uniprot:
+        ids = uniprot['Swiss-Prot']
+    else:
+        ids = uniprot.get('TrEMBL', [])
+    if isinstance(ids, str):
+        ids = [ids]
+    return [x if x.startswith('UniProtKB') else "UniProtKB:{}".format(x) for x in ids]
+
 
-        return [gene_id]
+def hgnc_id_of_hit(hit):
+    gene_id = hit.get('HGNC')
+    if gene_id is None:
+        return None
+    gene_id = str(gene_id)
+    if not gene_id.startswith('HGNC'):
+        gene_id = 'HGNC:{}'.format(gene_id)
+    return gene_id
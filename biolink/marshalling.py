@@ -0,0 +1,390 @@
+"""
+Precompiled marshalling of flask-restplus models
+
+flask-restplus marshals a response by walking the fields of its model for
+every object, down through each Nested model. Here each model is compiled
+once into a Python function that builds the output dict directly, with
+plain dict lookups for dict data, and the common field types (Raw,
+String, Nested and Lists of these) inlined. Other fields, and data of
+unusual types, go through the field's own output method, so the output
+is the same as flask_restplus.marshal.
+
+Masks (the X-Fields header) are applied to the model before compiling it,
+compiled masked models are kept for the last MAX_MASKS masks.
+
+iter_json writes the JSON document of a marshalled object in chunks,
+marshalling and encoding the elements of its lists one at a time; the
+association routes stream large responses this way (see
+biolink.encoding.stream_json).
+"""
+import json
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, current_app, has_app_context
+from flask_restplus import fields as restplus_fields
+from flask_restplus import marshal as restplus_marshal
+from flask_restplus.fields import get_value, is_indexable_but_not_string
+from flask_restplus.mask import Mask, apply as apply_mask
+from flask_restplus.utils import unpack
+
+log = logging.getLogger(__name__)
+
+MAX_MASKS = 128
+
+# keys for which get_value on a dict (or None) may return an attribute
+RESERVED_KEYS = set(dir(OrderedDict)) | set(dir(None))
+
+DICT_TYPES = (dict, OrderedDict)
+SEQUENCE_TYPES = (list, tuple)
+LIST_TYPES = (list, tuple, set)
+
+compiled_fields = {}
+compiled_lock = threading.RLock()
+
+
+def _getter(obj):
+    if obj is None:
+        return _get_none
+    return lambda key: get_value(key, obj)
+
+
+def _get_none(key):
+    return None
+
+
+class _Compiler(object):
+    """
+    Generates the source of the marshalling function of a fields dict,
+    the names it refers to are kept in namespace
+    """
+
+    def __init__(self, memo):
+        self.memo = memo
+        self.namespace = {
+            'get_value': get_value,
+            'getter': _getter,
+            'DICT_TYPES': DICT_TYPES,
+            'SEQUENCE_TYPES': SEQUENCE_TYPES,
+            'LIST_TYPES': LIST_TYPES,
+        }
+        self.lines = []
+
+    def constant(self, prefix, value):
+        name = '{}{}'.format(prefix, len(self.namespace))
+        self.namespace[name] = value
+        return name
+
+    def compile(self, fields, skip_none):
+        # nested raw dicts marshal the same object
+        self.lines = [
+            'def marshal_fields(obj):',
+            '    if type(obj) in SEQUENCE_TYPES:',
+            '        return [marshal_fields(item) for item in obj]',
+            '    get = obj.get if type(obj) in DICT_TYPES else getter(obj)',
+        ]
+        items = []
+        for i, (key, field) in enumerate(fields.items()):
+            if isinstance(field, dict):
+                nested = self.constant('M', compile_fields(field, skip_none, self.memo))
+                items.append((key, '{}(obj)'.format(nested)))
+                continue
+            field = field() if isinstance(field, type) else field
+            attribute = key if field.attribute is None else field.attribute
+            value = 'v{}'.format(i)
+            if isinstance(attribute, str) and '.' not in attribute and attribute not in RESERVED_KEYS:
+                self.lines.append('    {} = get({!r})'.format(value, attribute))
+            else:
+                self.lines.append('    {} = get_value({}, obj)'.format(value, self.constant('K', attribute)))
+            items.append((key, self.field_expression(key, field, value)))
+
+        self.lines.append('    out = {')
+        self.lines += ['        {!r}: {},'.format(key, expression) for key, expression in items]
+        self.lines.append('    }')
+        if skip_none:
+            self.lines.append('    out = {k: v for k, v in out.items() if v is not None and v != {}}')
+        self.lines.append('    return out')
+        exec('\n'.join(self.lines), self.namespace)
+        return self.namespace['marshal_fields']
+
+    def field_expression(self, key, field, value):
+        """
+        Expression of the output of a field from its value, or a call to
+        the output method of the field
+        """
+        field_type = type(field)
+        generic = '{}.output({!r}, obj)'.format(self.constant('F', field), key)
+        if field_type in (restplus_fields.Raw, restplus_fields.String) and not field.mask:
+            default = field.default
+            if callable(default):
+                return generic
+            if field_type is restplus_fields.String:
+                default = str(default) if default else default
+                formatted = 'str({})'.format(value)
+            else:
+                formatted = value
+            if default is None:
+                return '(None if {0} is None else {1})'.format(value, formatted)
+            return '({} if {} is None else {})'.format(self.constant('D', default), value, formatted)
+
+        if field_type is restplus_fields.Nested:
+            nested = self.nested_function(field)
+            if field.allow_null:
+                return '(None if {0} is None else {1}({0}))'.format(value, nested)
+            if field.default is not None:
+                return '({} if {} is None else {}({}))'.format(
+                    self.constant('D', field.default), value, nested, value)
+            return '{}({})'.format(nested, value)
+
+        if field_type is restplus_fields.List and not callable(field.default):
+            item = self.item_expression(field.container)
+            if item is None:
+                return generic
+            default = self.constant('D', field.default)
+            return '({0} if {1} is None else [{2} for x in {1}] if type({1}) in LIST_TYPES else {3})'.format(
+                default, value, item, generic)
+
+        return generic
+
+    def item_expression(self, container):
+        """
+        Expression of the output of a list element x, None if the list
+        needs the output method of the field
+        """
+        container_type = type(container)
+        if container_type in (restplus_fields.Raw, restplus_fields.String):
+            if container.mask or container.attribute is not None or container.default is not None:
+                return None
+            if container_type is restplus_fields.String:
+                return '(None if x is None else str(x))'
+            return 'x'
+        if container_type is restplus_fields.Nested and container.attribute is None:
+            nested = self.nested_function(container)
+            if container.allow_null:
+                return '(None if x is None else {}(x))'.format(nested)
+            if container.default is not None:
+                return '({} if x is None else {}(x))'.format(self.constant('D', container.default), nested)
+            return '{}(x)'.format(nested)
+        return None
+
+    def nested_function(self, field):
+        return self.constant('N', compile_fields(field.nested, getattr(field, 'skip_none', False), self.memo))
+
+
+def compile_fields(fields, skip_none=False, memo=None):
+    """
+    Marshalling function of a model or dict of fields, same as
+    flask_restplus.marshal(data, fields, skip_none=skip_none)
+    """
+    fields = getattr(fields, 'resolved', fields)
+    wildcard = getattr(restplus_fields, 'Wildcard', None)
+    if wildcard is not None and any(isinstance(field, wildcard) or field is wildcard for field in fields.values()):
+        return lambda data: restplus_marshal(data, fields, skip_none=skip_none)
+    if memo is None:
+        memo = {}
+    # the fields are kept with their function so that their id is not reused
+    key = (id(fields), skip_none)
+    if key not in memo:
+        # placeholder for recursive models, replaced once compiled
+        function = []
+        memo[key] = (fields, lambda data: function[0](data))
+        function.append(_Compiler(memo).compile(fields, skip_none))
+        memo[key] = (fields, function[0])
+    return memo[key][1]
+
+
+class CompiledModel(object):
+    """
+    Compiled marshalling function of a model, and of the masks applied to it
+    """
+
+    def __init__(self, fields, skip_none=False):
+        self.fields = fields
+        self.skip_none = skip_none
+        self.default_mask = getattr(fields, '__mask__', None)
+        self.function = compile_fields(self.masked_fields(self.default_mask), skip_none)
+        self.masked = OrderedDict()
+        self.lock = threading.Lock()
+        self.stream_plan = None
+
+    def masked_fields(self, mask):
+        resolved = getattr(self.fields, 'resolved', self.fields)
+        if mask:
+            return apply_mask(resolved, mask, skip=True)
+        return resolved
+
+    def get_function(self, mask=None):
+        mask = mask or self.default_mask
+        if not mask:
+            return self.function
+        key = str(mask)
+        with self.lock:
+            if key in self.masked:
+                self.masked.move_to_end(key)
+                return self.masked[key]
+        function = compile_fields(self.masked_fields(mask), self.skip_none)
+        with self.lock:
+            self.masked[key] = function
+            while len(self.masked) > MAX_MASKS:
+                self.masked.popitem(last=False)
+        return function
+
+    def marshal(self, data, envelope=None, mask=None):
+        out = self.get_function(mask)(data)
+        if envelope:
+            out = {envelope: out}
+        return out
+
+    def get_stream_plan(self):
+        """
+        Fields of the model, the List(Nested) ones with the marshalling
+        function of their elements, and the function marshalling the
+        other fields
+        """
+        if self.stream_plan is None:
+            resolved = self.masked_fields(self.default_mask)
+            plan = []
+            rest = OrderedDict()
+            for key, field in resolved.items():
+                if type(field) is restplus_fields.List and type(field.container) is restplus_fields.Nested:
+                    container = field.container
+                    plan.append((key, field, compile_fields(container.nested, getattr(container, 'skip_none', False))))
+                else:
+                    plan.append((key, field, None))
+                    rest[key] = field
+            self.stream_plan = plan, compile_fields(rest, self.skip_none)
+        return self.stream_plan
+
+    def stream_length(self, data):
+        """
+        Number of elements of the List(Nested) fields of the model in
+        data, not counting generators
+        """
+        plan, _ = self.get_stream_plan()
+        length = 0
+        for key, field, marshal_item in plan:
+            if marshal_item is not None:
+                value = get_value(key if field.attribute is None else field.attribute, data)
+                if isinstance(value, LIST_TYPES):
+                    length += len(value)
+        return length
+
+    def iter_json(self, data, dumps=json.dumps):
+        """
+        Generator of the chunks of the JSON document of the marshalled
+        data, the same text as dumps(marshal(data)); the elements of the
+        List(Nested) fields of the model are marshalled and encoded one
+        at a time, so they can be generators
+        """
+        plan, marshal_rest = self.get_stream_plan()
+        out = marshal_rest(data)
+        separator = '{'
+        for key, field, marshal_item in plan:
+            if marshal_item is None:
+                if key in out:
+                    yield '{}{}: {}'.format(separator, dumps(key), dumps(out[key]))
+                    separator = ', '
+                continue
+            value = get_value(key if field.attribute is None else field.attribute, data)
+            if not is_indexable_but_not_string(value) or isinstance(value, dict):
+                value = field.output(key, data)
+                if not (self.skip_none and (value is None or value == {})):
+                    yield '{}{}: {}'.format(separator, dumps(key), dumps(value))
+                    separator = ', '
+                continue
+            yield '{}{}: ['.format(separator, dumps(key))
+            separator = ', '
+            container = field.container
+            item_separator = ''
+            for item in value:
+                if item is None and container.allow_null:
+                    marshalled = None
+                elif item is None and container.default is not None:
+                    marshalled = container.default
+                else:
+                    marshalled = marshal_item(item)
+                yield item_separator + dumps(marshalled)
+                item_separator = ', '
+            yield ']'
+        yield '}' if separator == ', ' else '{}'
+
+
+def get_compiled_model(fields, skip_none=False):
+    """
+    CompiledModel of a model, compiled on first use
+    """
+    key = (id(fields), skip_none)
+    with compiled_lock:
+        if key not in compiled_fields:
+            compiled_fields[key] = (fields, CompiledModel(fields, skip_none))
+        return compiled_fields[key][1]
+
+
+def marshal(data, fields, envelope=None, skip_none=False, mask=None, ordered=False):
+    """
+    Drop-in replacement of flask_restplus.marshal
+    """
+    if ordered:
+        return restplus_marshal(data, fields, envelope, skip_none, mask, ordered)
+    return get_compiled_model(fields, skip_none).marshal(data, envelope, mask)
+
+
+class marshal_with(object):
+    """
+    Drop-in replacement of the flask_restplus.marshal_with decorator,
+    the model is compiled when the decorator is created
+
+    request_mask, if given, is called with the fields in each request
+    and returns a mask to use when there is no X-Fields header, or None
+
+    stream, if given, is called with the CompiledModel, data, status and
+    headers of each response without a mask or envelope, and returns a
+    streamed response of it (see CompiledModel.iter_json), or None to
+    marshal the data
+    """
+
+    def __init__(self, fields, envelope=None, skip_none=False, mask=None, ordered=False, request_mask=None,
+                 stream=None):
+        self.fields = fields
+        self.request_mask = request_mask
+        self.stream = stream
+        self.envelope = envelope
+        self.skip_none = skip_none
+        self.ordered = ordered
+        self.mask = Mask(mask, skip=True)
+        if not ordered:
+            self.compiled = get_compiled_model(fields, skip_none)
+
+    def marshal(self, data, mask):
+        if self.ordered:
+            return restplus_marshal(data, self.fields, self.envelope, self.skip_none, mask, self.ordered)
+        return self.compiled.marshal(data, self.envelope, mask)
+
+    def __call__(self, f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            resp = f(*args, **kwargs)
+            mask = self.mask
+            if has_app_context():
+                mask_header = current_app.config['RESTPLUS_MASK_HEADER']
+                mask = request.headers.get(mask_header) or \
+                    (self.request_mask is not None and self.request_mask(self.fields)) or mask
+            data, code, headers = unpack(resp)
+            if self.stream is not None and not (mask or self.envelope or self.ordered):
+                streamed = self.stream(self.compiled, data, code, headers)
+                if streamed is not None:
+                    return streamed
+            if isinstance(resp, tuple):
+                return self.marshal(data, mask), code, headers
+            return self.marshal(resp, mask)
+        return wrapper
+
+
+def iter_json(data, fields, skip_none=False, dumps=json.dumps):
+    """
+    Chunks of the JSON document of data marshalled with fields, see
+    CompiledModel.iter_json
+    """
+    return get_compiled_model(fields, skip_none).iter_json(data, dumps)
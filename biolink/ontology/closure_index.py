@@ -0,0 +1,151 @@
+"""
+Ancestor/descendant closure index of an ontology over a set of relations
+
+Nodes are numbered with compact integer ids and the closure of each node
+is a sorted array of node numbers, so that ancestor, descendant, shared
+ancestor and most informative common ancestor (MICA) lookups are array
+slices and set intersections instead of graph walks.
+
+An index is either read from the precomputed closures of an ontology
+snapshot (see biolink.ontology.snapshot) or built once from a loaded
+ontobio Ontology.
+"""
+import logging
+import math
+
+from biolink.ontology.snapshot import AdjacencyArrays, compute_closures, closure_key, to_csr, transpose
+
+log = logging.getLogger(__name__)
+
+
+class ClosureIndex(object):
+
+    def __init__(self, ids, ancestors, descendants, labels, index=None):
+        """
+        Arguments
+        ---------
+        ids
+            sequence of node ids, position = node number
+        ancestors, descendants
+            per node number, sorted sequence of node numbers
+        labels
+            sequence of labels ('' for none), by node number
+        index
+            function of a node id to its number or None, defaults to a dict lookup
+        """
+        self.ids = ids
+        self.ancestor_rows = ancestors
+        self.descendant_rows = descendants
+        self.labels = labels
+        if index is None:
+            numbers = {id: i for i, id in enumerate(ids)}
+            index = numbers.get
+        self.index = index
+
+    @staticmethod
+    def from_snapshot(snapshot, relations):
+        ancestors, descendants = snapshot.closures[closure_key(relations)]
+        return ClosureIndex(snapshot.ids, ancestors, descendants, snapshot.labels, index=snapshot.index)
+
+    @staticmethod
+    def from_ontology(ont, relations=None):
+        graph = ont.get_graph()
+        ids = sorted(set(str(n) for n in graph.nodes()))
+        numbers = {id: i for i, id in enumerate(ids)}
+        parents = [set() for _ in ids]
+        for parent, child, data in graph.edges(data=True):
+            if relations is None or data.get('pred') in relations:
+                parents[numbers[str(child)]].add(numbers[str(parent)])
+        closures = [sorted(closure) for closure in compute_closures(parents)]
+        node_data = dict(graph.nodes(data=True))
+        labels = [node_data.get(id, {}).get('label') or '' for id in ids]
+        return ClosureIndex(
+            ids,
+            AdjacencyArrays(*to_csr(closures)),
+            AdjacencyArrays(*to_csr([sorted(row) for row in transpose(closures)])),
+            labels,
+            index=numbers.get
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id):
+        return self.index(id) is not None
+
+    def label(self, id):
+        i = self.index(id)
+        if i is None:
+            return None
+        return self.labels[i] or None
+
+    def ancestors(self, id, reflexive=False):
+        return self._ids(self._closure(self.ancestor_rows, id, reflexive))
+
+    def descendants(self, id, reflexive=False):
+        return self._ids(self._closure(self.descendant_rows, id, reflexive))
+
+    def traverse(self, ids, up=True, down=False):
+        """
+        The query nodes, plus their ancestors if up and descendants if down;
+        same result as ontobio's Ontology.traverse_nodes
+        """
+        found = set()
+        for id in ids:
+            found.add(id)
+            i = self.index(id)
+            if i is None:
+                continue
+            if up:
+                found.update(self.ids[j] for j in self.ancestor_rows[i])
+            if down:
+                found.update(self.ids[j] for j in self.descendant_rows[i])
+        return found
+
+    def shared_ancestors(self, a, b, reflexive=True):
+        """
+        Ancestors common to a and b, in node order. With reflexive, a and b
+        count as their own ancestors
+        """
+        return self._ids(self._shared(a, b, reflexive))
+
+    def information_content(self, id):
+        """
+        Intrinsic information content, -log of the fraction of the ontology
+        subsumed by the node
+        """
+        i = self.index(id)
+        if i is None:
+            return None
+        return self._information_content(i)
+
+    def mica(self, a, b):
+        """
+        Most informative common ancestor of a and b (reflexive), or None
+        """
+        shared = self._shared(a, b, True)
+        if len(shared) == 0:
+            return None
+        # the most informative ancestor is the one with the fewest descendants
+        best = min(shared, key=lambda i: (len(self.descendant_rows[i]), i))
+        return self.ids[best]
+
+    def _information_content(self, i):
+        return -math.log((len(self.descendant_rows[i]) + 1) / len(self.ids))
+
+    def _closure(self, rows, id, reflexive):
+        i = self.index(id)
+        if i is None:
+            return []
+        closure = rows[i]
+        if reflexive:
+            return sorted(set(closure) | {i})
+        return closure
+
+    def _shared(self, a, b, reflexive):
+        ancestors_a = self._closure(self.ancestor_rows, a, reflexive)
+        ancestors_b = self._closure(self.ancestor_rows, b, reflexive)
+        return sorted(set(ancestors_a).intersection(ancestors_b))
+
+    def _ids(self, numbers):
+        return [self.ids[i] for i in numbers]
@@ -1,23 +1,173 @@
 import logging
+import os
 
 from ontobio.ontol_factory import OntologyFactory
-from biolink.settings import get_biolink_config
+from biolink.settings import get_biolink_config, get_data_path
+from biolink.ontology.snapshot import OntologySnapshot, build_snapshot, read_header, closure_key, DEFAULT_CLOSURES
+from biolink.ontology.closure_index import ClosureIndex
+from biolink.tracing import span
 
 cfg = get_biolink_config()
 omap = {}
+snapshots = {}
+# closure indexes of the configured relation sets
+closure_indexes = {}
 
-def get_ontology(id):
+# relative to the data directory, see settings.get_data_path
+DEFAULT_SNAPSHOT_PATH = 'snapshots'
+
+def get_handle(id):
     handle = id
     for c in cfg['ontologies']:
         if c['id'] == id:
             logging.info("getting handle for id: {} from cfg".format(id))
             handle = c['handle']
+    return handle
+
+def get_snapshot_config():
+    return cfg.get('ontology_snapshots', {})
+
+def get_snapshot_path(handle):
+    """
+    Location of the compiled snapshot of an ontology handle
+    """
+    name = handle.replace('/', '_').replace(':', '_')
+    return os.path.join(get_data_path(get_snapshot_config().get('path', DEFAULT_SNAPSHOT_PATH)), name + '.snapshot')
+
+def get_snapshot(id):
+    """
+    Memory-mapped snapshot of an ontology, or None if snapshots are
+    disabled or none can be used for it
+
+    A snapshot that has been rebuilt since it was mapped is mapped again
+    """
+    if not get_snapshot_config().get('enabled', False):
+        return None
+    handle = get_handle(id)
+    path = get_snapshot_path(handle)
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    snapshot = snapshots.get(handle)
+    if snapshot is None or snapshot.mtime != mtime:
+        logging.info("Mapping ontology snapshot {}".format(path))
+        try:
+            snapshots[handle] = OntologySnapshot(path)
+        except ValueError as e:
+            # e.g. the format of an older release, until it is rebuilt
+            logging.warning("Cannot use ontology snapshot {}: {}".format(path, e))
+            return None
+    return snapshots[handle]
+
+def create_ontology(handle):
+    logging.info("Creating a new ontology object for {}".format(handle))
+    ofa = OntologyFactory()
+    return ofa.create(handle)
+
+def get_ontology(id):
+    """
+    Full ontobio Ontology, loaded from source once per process
+
+    This takes tens of seconds for large ontologies; traversals and
+    subontologies are served from the snapshot when there is one, see
+    traverse_nodes and get_subontology
+    """
+    handle = get_handle(id)
 
     if handle not in omap:
-        logging.info("Creating a new ontology object for {}".format(handle))
-        ofa = OntologyFactory()
-        omap[handle] = ofa.create(handle)
+        with span('ontology', handle):
+            omap[handle] = create_ontology(handle)
     else:
         logging.info("Using cached for {}".format(handle))
     return omap[handle]
 
+def get_closure_index(id, relations=None, build=True):
+    """
+    ClosureIndex of an ontology over all relations (relations None) or
+    one of the relation sets of the ontology_snapshots closures config,
+    None for other relation sets (see traverse_nodes)
+
+    Read from the ontology snapshot when it has the closure, otherwise
+    built once per process from the loaded ontology. If build is False,
+    None is returned instead of loading an ontology that is not already
+    in memory
+    """
+    handle = get_handle(id)
+    snapshot = get_snapshot(handle)
+    if snapshot is not None and relations is not None and snapshot.has_closure(relations):
+        return ClosureIndex.from_snapshot(snapshot, relations)
+
+    key = (handle, closure_key(relations) if relations is not None else None)
+    if key[1] is not None and key[1] not in configured_closure_keys():
+        return None
+    if key in closure_indexes:
+        return closure_indexes[key]
+    if not build and handle not in omap:
+        return None
+    logging.info("Building closure index for {} over {}".format(handle, relations))
+    closure_indexes[key] = ClosureIndex.from_ontology(get_ontology(handle), relations)
+    return closure_indexes[key]
+
+def configured_closure_keys():
+    return set(closure_key(relations) for relations in get_snapshot_config().get('closures', DEFAULT_CLOSURES))
+
+def traverse_nodes(id, nodes, relations=None, up=True, down=False):
+    """
+    The nodes, plus their ancestors if up and descendants if down over
+    the relations, as ontobio's Ontology.traverse_nodes
+
+    Uses the precomputed closures of the snapshot if it has them, else
+    walks the snapshot. Without a snapshot, the closure index of the
+    loaded ontology is used for configured relation sets, and other ones
+    (from request arguments) are walked in the ontology rather than
+    indexed
+    """
+    snapshot = get_snapshot(id)
+    if snapshot is None or (relations is not None and snapshot.has_closure(relations)):
+        index = get_closure_index(id, relations)
+        if index is not None:
+            return index.traverse(nodes, up=up, down=down)
+    if snapshot is not None:
+        return snapshot.traverse(nodes, relations, up=up, down=down)
+    return get_ontology(id).traverse_nodes(nodes, up=up, down=down, relations=relations)
+
+def get_subontology(id, nodes, relations=None):
+    """
+    Subontology of the nodes over the relations, from the snapshot of the
+    ontology if there is one
+    """
+    snapshot = get_snapshot(id)
+    if snapshot is not None:
+        return snapshot.subontology(nodes, relations)
+    return get_ontology(id).subontology(nodes, relations=relations)
+
+def preload_ontology(id):
+    """
+    Map the snapshot of an ontology, or load it if it has none
+    """
+    if get_snapshot(id) is None:
+        get_ontology(id)
+
+def rebuild_snapshot(id, force=False):
+    """
+    Build the snapshot of an ontology from its source
+
+    The existing snapshot is only replaced if the ontology changed,
+    unless force is set. Returns True if a new snapshot was written
+    """
+    handle = get_handle(id)
+    path = get_snapshot_path(handle)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    ont = create_ontology(handle)
+    closures = get_snapshot_config().get('closures')
+    previous = read_header(path) if os.path.exists(path) else None
+    tmp_path = path + '.new'
+    header = build_snapshot(ont, tmp_path, handle=handle, closures=closures)
+    if not force and previous is not None and previous['checksum'] == header['checksum'] \
+            and previous['closures'] == header['closures']:
+        logging.info("Snapshot of {} is up to date".format(handle))
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, path)
+    return True
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+"""
+Rebuild the compiled ontology snapshots used by the API workers
+
+Usage: python -m biolink.ontology.rebuild_snapshots [--force] [ID ...]
+
+Without IDs all ontologies listed in conf/config.yaml are rebuilt.
+Snapshots whose source has not changed are left in place.
+"""
+import argparse
+import logging
+
+from biolink.ontology.ontology_manager import cfg, get_snapshot_path, get_handle, rebuild_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild compiled ontology snapshots')
+    parser.add_argument('ids', nargs='*', help='ontology ids, e.g. go hp; defaults to all configured ontologies')
+    parser.add_argument('--force', action='store_true', help='rewrite snapshots even if the ontology is unchanged')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    ids = args.ids or [ontology['id'] for ontology in cfg['ontologies']]
+    for id in ids:
+        written = rebuild_snapshot(id, force=args.force)
+        print("{}\t{}\t{}".format(id, 'rebuilt' if written else 'unchanged', get_snapshot_path(get_handle(id))))
+
+
+if __name__ == '__main__':
+    main()
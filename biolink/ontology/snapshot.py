@@ -0,0 +1,505 @@
+"""
+Compiled, memory-mapped ontology snapshots
+
+Building an ontobio Ontology from its source (SPARQL, obographs json)
+takes tens of seconds for GO, HP, Uberon or MONDO. A snapshot holds the
+ids, labels, edges and closures of an ontology in a single binary file
+that workers memory-map on first use: the OS shares the pages between all
+processes on the host and opening a snapshot does no parsing.
+
+Snapshots serve closure and label lookups (see
+biolink.ontology.closure_index), traversals and the subontologies of the
+ontol subgraph routes, with the node metadata (definitions, synonyms,
+xrefs...) of their obographs output.
+
+A snapshot file contains:
+
+ - a sorted string table of node ids (node index = position in the table)
+ - a string table of labels, indexed by node
+ - a string table of the JSON metadata of each node, xrefs included
+ - per relation, the parents and children of each node (CSR arrays of
+   node indexes)
+ - for each configured relation set, the precomputed ancestor and
+   descendant closures (CSR arrays of sorted node indexes)
+
+Layout: 8 byte magic, 8 byte header length, JSON header, then 8-byte
+aligned sections described by the header. Arrays are stored with native
+byte order, recorded in the header.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+log = logging.getLogger(__name__)
+
+MAGIC = b'BLONTSNP'
+FORMAT_VERSION = 2
+ALIGNMENT = 8
+
+SUBCLASS_OF = 'subClassOf'
+PART_OF = 'BFO:0000050'
+
+# Relation sets whose closures are precomputed unless configured otherwise,
+# the default relations of the ontol subgraph endpoints
+DEFAULT_CLOSURES = [[SUBCLASS_OF], [SUBCLASS_OF, PART_OF]]
+
+
+def closure_key(relations):
+    return '+'.join(sorted(set(relations)))
+
+
+class StringTable(object):
+    """
+    Read-only sequence of strings stored as an offsets array and a utf-8 blob
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+
+    def bisect(self, s):
+        """
+        Index of s in a sorted table, or None
+        """
+        target = s.encode('utf-8')
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = bytes(self.blob[self.offsets[mid]:self.offsets[mid + 1]])
+            if value < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and bytes(self.blob[self.offsets[lo]:self.offsets[lo + 1]]) == target:
+            return lo
+        return None
+
+
+class AdjacencyArrays(object):
+    """
+    Compressed sparse rows: the row of node i is indices[indptr[i]:indptr[i+1]]
+    """
+
+    def __init__(self, indptr, indices):
+        self.indptr = indptr
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+
+class OntologySnapshot(object):
+    """
+    A memory-mapped snapshot file, see module docs
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mtime = os.fstat(f.fileno()).st_mtime
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[0:len(MAGIC)] != MAGIC:
+            raise ValueError('{} is not an ontology snapshot'.format(path))
+        header_len, = struct.unpack_from('<Q', self.mm, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = json.loads(self.mm[start:start + header_len].decode('utf-8'))
+        if self.header['version'] != FORMAT_VERSION:
+            raise ValueError('{} has snapshot format {}, expected {}'.format(
+                path, self.header['version'], FORMAT_VERSION))
+        if self.header['byteorder'] != sys.byteorder:
+            raise ValueError('{} was built on a {} endian host'.format(path, self.header['byteorder']))
+        self.view = memoryview(self.mm)
+
+        self.handle = self.header['handle']
+        self.ontology_id = self.header['id']
+        self.checksum = self.header['checksum']
+        self.ids = self._strings('ids')
+        self.labels = self._strings('labels')
+        self.metas = self._strings('meta')
+        self.relations = self.header['relations']
+        self.parent_arrays = {
+            relation: self._adjacency('parents/{}'.format(relation)) for relation in self.relations
+        }
+        self.child_arrays = {
+            relation: self._adjacency('children/{}'.format(relation)) for relation in self.relations
+        }
+        self.closures = {}
+        for key in self.header['closures']:
+            self.closures[key] = (
+                self._adjacency('ancestors/{}'.format(key)),
+                self._adjacency('descendants/{}'.format(key))
+            )
+
+    def _section(self, name):
+        offset, length, typecode = self.header['sections'][name]
+        return self.view[offset:offset + length].cast(typecode)
+
+    def _strings(self, name):
+        return StringTable(self._section(name + '.offsets'), self._section(name + '.blob'))
+
+    def _adjacency(self, name):
+        return AdjacencyArrays(self._section(name + '.indptr'), self._section(name + '.indices'))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, id):
+        return self.index(id) is not None
+
+    def index(self, id):
+        """
+        Integer index of a node id, or None if the node is not in the ontology
+        """
+        return self.ids.bisect(id)
+
+    def label(self, id):
+        i = self.index(id)
+        if i is None:
+            return None
+        return self.labels[i] or None
+
+    def meta(self, id):
+        """
+        obographs metadata of a node, None if it has none
+        """
+        i = self.index(id)
+        if i is None or not self.metas[i]:
+            return None
+        return json.loads(self.metas[i])
+
+    def parents(self, id, relations=None):
+        return self._neighbors(self.parent_arrays, id, relations)
+
+    def children(self, id, relations=None):
+        return self._neighbors(self.child_arrays, id, relations)
+
+    def _neighbors(self, arrays, id, relations):
+        i = self.index(id)
+        if i is None:
+            return []
+        found = set()
+        for rows in self._rows(arrays, relations):
+            found.update(rows[i])
+        return [self.ids[j] for j in sorted(found)]
+
+    def _rows(self, arrays, relations):
+        if relations is None:
+            relations = self.relations
+        return [arrays[relation] for relation in relations if relation in arrays]
+
+    def traverse(self, ids, relations=None, up=True, down=False):
+        """
+        The query nodes, plus their ancestors if up and descendants if down
+        over the relations (all if None), walking the parent and child
+        arrays; same result as ontobio's Ontology.traverse_nodes
+        """
+        found = set(ids)
+        start = [i for i in map(self.index, ids) if i is not None]
+        for go, arrays in ((up, self.parent_arrays), (down, self.child_arrays)):
+            if go:
+                found.update(self.ids[j] for j in _reachable(self._rows(arrays, relations), start))
+        return found
+
+    def subontology(self, nodes, relations=None):
+        """
+        ontobio Ontology of the nodes and of the edges between them over
+        the relations (all if None), as Ontology.subontology
+        """
+        import networkx as nx
+        from ontobio.ontol import Ontology
+        graph = nx.MultiDiGraph()
+        numbers = set()
+        for id in nodes:
+            i = self.index(id)
+            if i is None:
+                continue
+            numbers.add(i)
+            data = {}
+            if self.labels[i]:
+                data['label'] = self.labels[i]
+            if self.metas[i]:
+                data['meta'] = json.loads(self.metas[i])
+            graph.add_node(id, **data)
+        for relation in (self.relations if relations is None else relations):
+            rows = self.parent_arrays.get(relation)
+            if rows is None:
+                continue
+            for i in sorted(numbers):
+                for j in rows[i]:
+                    if j in numbers:
+                        graph.add_edge(self.ids[j], self.ids[i], pred=relation)
+        # xrefs are inlined in the node metadata
+        return Ontology(handle=self.handle, id=self.ontology_id, graph=graph, xref_graph=nx.MultiGraph())
+
+    def has_closure(self, relations):
+        return closure_key(relations) in self.closures
+
+    def ancestors(self, id, relations):
+        return self._closure(id, relations, 0)
+
+    def descendants(self, id, relations):
+        return self._closure(id, relations, 1)
+
+    def _closure(self, id, relations, direction):
+        key = closure_key(relations)
+        if key not in self.closures:
+            raise KeyError('No closure for {} in {}'.format(key, self.path))
+        i = self.index(id)
+        if i is None:
+            return []
+        return [self.ids[j] for j in self.closures[key][direction][i]]
+
+
+def compute_closures(parents):
+    """
+    Transitive closure over a list of parent index lists
+
+    Returns a list of sets of ancestor indexes, not including the node
+    itself. Nodes are visited in topological order so that each closure
+    is the union of its parents' closures; nodes in or below a cycle fall
+    back to a graph walk.
+    """
+    n = len(parents)
+    children = [[] for _ in range(n)]
+    pending = [len(p) for p in parents]
+    for child, ps in enumerate(parents):
+        for p in ps:
+            children[p].append(child)
+    closures = [None] * n
+    queue = [i for i in range(n) if pending[i] == 0]
+    while queue:
+        i = queue.pop()
+        closure = set(parents[i])
+        for p in parents[i]:
+            closure.update(closures[p])
+        closures[i] = closure
+        for child in children[i]:
+            pending[child] -= 1
+            if pending[child] == 0:
+                queue.append(child)
+    for i in range(n):
+        if closures[i] is None:
+            closures[i] = _walk(parents, i)
+    return closures
+
+
+def _reachable(rows_list, start):
+    """
+    Node indexes reachable from start (not included unless on a cycle)
+    through any of the adjacency rows
+    """
+    seen = set()
+    stack = list(start)
+    while stack:
+        i = stack.pop()
+        for rows in rows_list:
+            for j in rows[i]:
+                if j not in seen:
+                    seen.add(j)
+                    stack.append(j)
+    return seen
+
+
+def _walk(parents, i):
+    seen = set()
+    stack = list(parents[i])
+    while stack:
+        j = stack.pop()
+        if j not in seen:
+            seen.add(j)
+            stack.extend(parents[j])
+    seen.discard(i)
+    return seen
+
+
+def to_csr(rows):
+    indptr = array('Q', [0])
+    indices = array('I')
+    for row in rows:
+        indices.extend(row)
+        indptr.append(len(indices))
+    return indptr, indices
+
+
+def _string_table(strings):
+    offsets = array('Q', [0])
+    blob = bytearray()
+    for s in strings:
+        blob += s.encode('utf-8')
+        offsets.append(len(blob))
+    encoded = array('B')
+    encoded.frombytes(bytes(blob))
+    return offsets, encoded
+
+
+def transpose(rows):
+    transposed = [[] for _ in range(len(rows))]
+    for i, row in enumerate(rows):
+        for j in row:
+            transposed[j].append(i)
+    return transposed
+
+
+def build_snapshot(ont, path, handle=None, closures=None):
+    """
+    Compile an ontobio Ontology into a snapshot file at path
+
+    The file is written next to path and renamed into place, so that
+    processes that have the previous snapshot mapped keep a valid copy.
+    Returns the header of the new snapshot
+    """
+    if closures is None:
+        closures = DEFAULT_CLOSURES
+    graph = ont.get_graph()
+    ids = sorted(set(str(n) for n in graph.nodes()))
+    index = {id: i for i, id in enumerate(ids)}
+    node_data = dict(graph.nodes(data=True))
+    labels = [node_data.get(id, {}).get('label') or '' for id in ids]
+    metas = _metas(ont, ids, node_data)
+    parents_by_relation = _parents_by_relation(graph, index)
+
+    sections = []
+    checksum = hashlib.sha1()
+
+    def add_strings(name, strings):
+        offsets, blob = _string_table(strings)
+        sections.append((name + '.offsets', offsets))
+        sections.append((name + '.blob', blob))
+        checksum.update(blob.tobytes())
+
+    def add_adjacency(name, rows):
+        indptr, indices = to_csr([sorted(row) for row in rows])
+        sections.append((name + '.indptr', indptr))
+        sections.append((name + '.indices', indices))
+        checksum.update(indptr.tobytes())
+        checksum.update(indices.tobytes())
+
+    add_strings('ids', ids)
+    add_strings('labels', labels)
+    add_strings('meta', metas)
+    relations = sorted(parents_by_relation.keys())
+    for relation in relations:
+        add_adjacency('parents/{}'.format(relation), parents_by_relation[relation])
+        add_adjacency('children/{}'.format(relation), transpose(parents_by_relation[relation]))
+
+    # Closures are derived data, they do not contribute to the checksum
+    closure_keys = [closure_key(closure_relations) for closure_relations in closures]
+    sections += _closure_sections(parents_by_relation, closures, len(ids))
+
+    header = {
+        'version': FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'handle': handle if handle is not None else ont.handle,
+        'id': ont.id,
+        'created': time.time(),
+        'checksum': checksum.hexdigest(),
+        'nodes': len(ids),
+        'relations': relations,
+        'closures': closure_keys,
+        'sections': {}
+    }
+    _write(path, header, sections)
+    log.info("Wrote snapshot of {} ({} nodes) to {}".format(header['handle'], len(ids), path))
+    return header
+
+
+def _parents_by_relation(graph, index):
+    """
+    Per relation, the set of parent indexes of each node
+    """
+    parents_by_relation = {}
+    for parent, child, data in graph.edges(data=True):
+        relation = data.get('pred', SUBCLASS_OF)
+        if relation not in parents_by_relation:
+            parents_by_relation[relation] = [set() for _ in index]
+        parents_by_relation[relation][index[str(child)]].add(index[str(parent)])
+    return parents_by_relation
+
+
+def _metas(ont, ids, node_data):
+    """
+    JSON metadata of each node ('' for none), with the xrefs of the xref
+    graph inlined as OboJsonGraphRenderer does
+    """
+    xref_graph = ont.xref_graph
+    metas = []
+    for id in ids:
+        meta = node_data.get(id, {}).get('meta')
+        if xref_graph is not None and id in xref_graph:
+            meta = dict(meta or {}, xrefs=[{'val': x} for x in xref_graph.neighbors(id)])
+        metas.append(json.dumps(meta) if meta else '')
+    return metas
+
+
+def _closure_sections(parents_by_relation, closures, n):
+    """
+    Ancestor and descendant sections of each relation set of closures
+    """
+    sections = []
+    for closure_relations in closures:
+        key = closure_key(closure_relations)
+        merged = [set() for _ in range(n)]
+        for relation in closure_relations:
+            for i, row in enumerate(parents_by_relation.get(relation, [])):
+                merged[i].update(row)
+        ancestors = compute_closures(merged)
+        for name, rows in (('ancestors', ancestors), ('descendants', transpose(ancestors))):
+            indptr, indices = to_csr([sorted(row) for row in rows])
+            sections.append(('{}/{}.indptr'.format(name, key), indptr))
+            sections.append(('{}/{}.indices'.format(name, key), indices))
+    return sections
+
+
+def _write(path, header, sections):
+    # Section offsets depend on the header length and the header holds the
+    # offsets: lay out the sections assuming a generous header size
+    header_size = _aligned(len(json.dumps(header)) + 128 * (len(sections) + 1) + 1024)
+    offset = _aligned(len(MAGIC) + 8 + header_size)
+    for name, data in sections:
+        length = len(data) * data.itemsize
+        header['sections'][name] = [offset, length, data.typecode]
+        offset = _aligned(offset + length)
+    encoded = json.dumps(header).encode('utf-8')
+    if len(encoded) > header_size:
+        raise ValueError('Snapshot header does not fit in {} bytes'.format(header_size))
+
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', len(encoded)))
+        f.write(encoded)
+        for name, data in sections:
+            f.seek(header['sections'][name][0])
+            data.tofile(f)
+        f.truncate(offset)
+    os.replace(tmp_path, path)
+
+
+def _aligned(n):
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def read_header(path):
+    """
+    Header of a snapshot file, without mapping the sections
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('{} is not an ontology snapshot'.format(path))
+        header_len, = struct.unpack('<Q', f.read(8))
+        return json.loads(f.read(header_len).decode('utf-8'))
@@ -24,9 +24,11 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 
 CONFIG = path.join(path.dirname(path.abspath(__file__)), '../conf/config.yaml')
 ROUTES = path.join(path.dirname(path.abspath(__file__)), '../conf/routes.yaml')
+DATA_DIR = path.join(path.dirname(path.abspath(__file__)), '../data')
 biolink_config = None
 route_mapping = None
 identifier_converter = None
+scigraph_instances = {}
 
 def get_biolink_config():
     global biolink_config
@@ -35,6 +37,16 @@ def get_biolink_config():
             biolink_config = yaml.load(f, Loader=yaml.FullLoader)
     return biolink_config
 
+def get_data_path(file_path):
+    """
+    Absolute path of a data file (xref store, association counts...):
+    relative paths are resolved against the BIOLINK_DATA_DIR environment
+    variable, the data_dir of config.yaml or the data directory of the
+    repository, in that order, rather than the working directory
+    """
+    data_dir = environ.get('BIOLINK_DATA_DIR') or get_biolink_config().get('data_dir') or DATA_DIR
+    return path.abspath(path.join(data_dir, file_path))
+
 def get_route_mapping():
     global route_mapping
     if route_mapping is None:
@@ -49,3 +61,20 @@ def get_identifier_converter():
         MyClass = getattr(importlib.import_module(module_name), class_name)
         identifier_converter = MyClass()
     return identifier_converter
+
+def get_scigraph(name='scigraph_data'):
+    """
+    Returns a SciGraph facade configured from the given config.yaml
+    entry, shared per process so that its connection pool is reused
+    """
+    if name not in scigraph_instances:
+        from scigraph.scigraph_util import SciGraph
+        scigraph_instances[name] = SciGraph(**get_biolink_config()[name])
+    return scigraph_instances[name]
+
+def get_async_scigraph(name='scigraph_data'):
+    """
+    Returns the non-blocking client of the SciGraph instance configured
+    from the given config.yaml entry, see scigraph.async_scigraph
+    """
+    return get_scigraph(name).async_client
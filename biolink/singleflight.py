@@ -0,0 +1,172 @@
+"""
+Coalescing of identical concurrent backend requests
+
+When several greenlets or threads make the same Golr or SciGraph request
+at the same time, only the first one is sent; the others wait for it and
+get the same result, or the same exception. Waiters give up after a
+timeout. Requests are keyed on the backend URL, path and normalized
+parameters, and counters of issued and coalesced requests are kept per
+backend.
+
+Settings are in the singleflight section of conf/config.yaml
+"""
+import json
+import logging
+import threading
+from functools import wraps
+
+from biolink.settings import get_biolink_config
+
+log = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30
+
+singleflight = None
+singleflight_lock = threading.Lock()
+
+
+class CoalescedRequestTimeout(Exception):
+    """
+    Raised in callers that waited too long for an identical in-flight request
+    """
+    pass
+
+
+class CoalescedRequestInterrupted(Exception):
+    """
+    Raised in callers waiting for an identical in-flight request whose
+    caller was interrupted (e.g. a greenlet killed at a fan out deadline)
+    """
+    pass
+
+
+def get_singleflight_config():
+    return get_biolink_config().get('singleflight', {})
+
+
+class _Call(object):
+
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, enabled=True):
+        self.timeout = timeout
+        self.enabled = enabled
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def do(self, group, key, func):
+        """
+        Result of func(), shared with the concurrent calls of the same
+        group and key
+        """
+        if not self.enabled:
+            return func()
+        with self.lock:
+            call = self.calls.get((group, key))
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.calls[(group, key)] = call
+            self._count(group, 'issued' if leader else 'coalesced')
+
+        if leader:
+            try:
+                call.result = func()
+            except BaseException as e:
+                # GreenletExit or gevent.Timeout are not Exceptions, and
+                # are not for the waiters to raise
+                if isinstance(e, Exception):
+                    call.error = e
+                else:
+                    call.error = CoalescedRequestInterrupted('{} request interrupted: {!r}'.format(group, e))
+                with self.lock:
+                    self._count(group, 'errors')
+                raise
+            finally:
+                with self.lock:
+                    del self.calls[(group, key)]
+                call.event.set()
+            return call.result
+
+        if not call.event.wait(self.timeout):
+            with self.lock:
+                self._count(group, 'timeouts')
+            raise CoalescedRequestTimeout('{} request still in flight after {}s'.format(group, self.timeout))
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _count(self, group, counter):
+        if group not in self.stats:
+            self.stats[group] = {'issued': 0, 'coalesced': 0, 'errors': 0, 'timeouts': 0}
+        self.stats[group][counter] += 1
+
+    def get_stats(self):
+        with self.lock:
+            groups = {group: dict(counts) for group, counts in self.stats.items()}
+            in_flight = len(self.calls)
+        for counts in groups.values():
+            total = counts['issued'] + counts['coalesced']
+            counts['coalesced_ratio'] = counts['coalesced'] / total if total else 0.0
+        return {'enabled': self.enabled, 'in_flight': in_flight, 'backends': groups}
+
+
+def get_singleflight():
+    global singleflight
+    # created under a lock, the first requests of a worker often arrive together
+    with singleflight_lock:
+        if singleflight is None:
+            cfg = get_singleflight_config()
+            singleflight = SingleFlight(timeout=cfg.get('timeout', DEFAULT_TIMEOUT), enabled=cfg.get('enabled', True))
+    return singleflight
+
+
+def make_key(*parts):
+    return json.dumps(parts, sort_keys=True, default=str)
+
+
+def coalesced(group, key_func):
+    """
+    Decorator coalescing concurrent calls for which key_func, called with
+    the same arguments, returns the same key; calls with a None key are
+    never coalesced
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = key_func(*args, **kwargs)
+            if key is None:
+                return func(*args, **kwargs)
+            return get_singleflight().do(group, key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def _solr_request_key(solr, method, path='', body=None, headers=None, files=None):
+    # only searches are coalesced, not updates
+    if files is not None or not path.startswith('select'):
+        return None
+    return make_key(solr.url, method, path, body)
+
+
+def coalesce_backends():
+    """
+    Coalesce the Golr searches made through pysolr (all ontobio Golr
+    queries); the SciGraph facade is decorated in scigraph_util
+    """
+    import pysolr
+
+    send = pysolr.Solr._send_request
+    if not getattr(send, '__coalesced__', False):
+        wrapper = coalesced('golr', _solr_request_key)(send)
+        wrapper.__coalesced__ = True
+        pysolr.Solr._send_request = wrapper
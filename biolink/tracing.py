@@ -0,0 +1,315 @@
+"""
+Per-request timing of backend calls
+
+Each request gets a Trace collecting spans: one per call to a backend
+(Golr, SciGraph, SPARQL, Wikidata), per ontology load and per
+flask-restplus marshalling step, with its duration and payload size.
+At the end of the request the spans are
+
+ - summed per backend into a Server-Timing response header
+ - written as one JSON log line
+ - added to per-route and per-backend duration samples, see get_stats
+
+Spans created in fan_out/concurrent_map workers are attributed to the
+request that started them. Settings are in the tracing section of
+conf/config.yaml
+"""
+import json
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import wraps
+
+from flask import g, request, has_request_context
+
+from biolink.settings import get_biolink_config
+
+log = logging.getLogger(__name__)
+
+DEFAULT_SAMPLES = 1000
+PERCENTILES = [50, 95, 99]
+
+_local = threading.local()
+
+stats = None
+
+
+def get_tracing_config():
+    return get_biolink_config().get('tracing', {})
+
+
+class Span(object):
+
+    __slots__ = ('backend', 'name', 'duration', 'size')
+
+    def __init__(self, backend, name, duration, size=None):
+        self.backend = backend
+        self.name = name
+        self.duration = duration
+        self.size = size
+
+    def as_dict(self):
+        return {
+            'backend': self.backend,
+            'name': self.name,
+            'duration_ms': round(self.duration * 1000, 3),
+            'size': self.size
+        }
+
+
+class Trace(object):
+    """
+    Spans of a single request
+    """
+
+    def __init__(self, route):
+        self.route = route
+        self.start = time.time()
+        self.spans = []
+
+    def add(self, span):
+        # list.append is atomic, spans may come from several workers
+        self.spans.append(span)
+
+    def totals(self):
+        """
+        OrderedDict of backend to (total duration, number of calls)
+        """
+        totals = OrderedDict()
+        for span in self.spans:
+            duration, calls = totals.get(span.backend, (0, 0))
+            totals[span.backend] = (duration + span.duration, calls + 1)
+        return totals
+
+    def server_timing(self, total):
+        metrics = []
+        for backend, (duration, calls) in self.totals().items():
+            metrics.append('{};dur={:.1f};desc="{} call{}"'.format(
+                backend, duration * 1000, calls, '' if calls == 1 else 's'))
+        metrics.append('total;dur={:.1f}'.format(total * 1000))
+        return ', '.join(metrics)
+
+
+class TimingStats(object):
+    """
+    Bounded samples of request durations per route and of span durations
+    per backend, for percentile reporting
+    """
+
+    def __init__(self, samples=DEFAULT_SAMPLES):
+        self.samples = samples
+        self.routes = {}
+        self.backends = {}
+        self.lock = threading.Lock()
+
+    def add(self, trace, total):
+        with self.lock:
+            self._samples(self.routes, trace.route).append(total)
+            for span in trace.spans:
+                self._samples(self.backends, span.backend).append(span.duration)
+
+    def _samples(self, table, key):
+        if key not in table:
+            table[key] = deque(maxlen=self.samples)
+        return table[key]
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'routes': {route: summarize(samples) for route, samples in self.routes.items()},
+                'backends': {backend: summarize(samples) for backend, samples in self.backends.items()}
+            }
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    summary = OrderedDict([('count', len(ordered))])
+    for p in PERCENTILES:
+        summary['p{}_ms'.format(p)] = round(percentile(ordered, p) * 1000, 3)
+    return summary
+
+
+def percentile(ordered, p):
+    """
+    Nearest-rank percentile of a sorted list
+    """
+    if len(ordered) == 0:
+        return 0.0
+    rank = max(int(math.ceil(p / 100.0 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def get_timing_stats():
+    global stats
+    if stats is None:
+        stats = TimingStats(get_tracing_config().get('samples', DEFAULT_SAMPLES))
+    return stats
+
+
+def current_trace():
+    trace = getattr(_local, 'trace', None)
+    if trace is None and has_request_context():
+        trace = g.get('trace')
+    return trace
+
+
+def propagate(func):
+    """
+    Wrap func so that spans it creates in another thread or greenlet are
+    added to the trace of the calling request
+    """
+    trace = current_trace()
+    if trace is None:
+        return func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        previous = getattr(_local, 'trace', None)
+        _local.trace = trace
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.trace = previous
+    return wrapper
+
+
+def payload_size(result):
+    """
+    Size of a backend result: length of an HTTP response body, otherwise
+    the number of associations, documents or rows
+    """
+    if hasattr(result, 'content') and hasattr(result, 'status_code'):
+        return len(result.content)
+    if isinstance(result, (str, bytes)):
+        return len(result)
+    if isinstance(result, dict):
+        for key in ('associations', 'compact_associations', 'docs'):
+            # compact results have associations set to None
+            if result.get(key) is not None:
+                return len(result[key])
+        return None
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    return None
+
+
+class span(object):
+    """
+    Context manager timing a block as a span of the current request
+    """
+
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.name = name
+        self.size = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        trace = current_trace()
+        if trace is not None:
+            trace.add(Span(self.backend, self.name, time.time() - self.start, self.size))
+        return False
+
+
+def traced(backend, name=None):
+    """
+    Decorator recording each call as a span of the current request
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(backend, span_name) as s:
+                result = func(*args, **kwargs)
+                s.size = payload_size(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def traced_marshalling(func, marshal_decorator):
+    """
+    Apply a flask-restplus marshal_with decorator to func, recording the
+    time spent marshalling (but not in func) as a span
+    """
+    @wraps(func)
+    def inner(*args, **kwargs):
+        result = func(*args, **kwargs)
+        _local.marshal_start = time.time()
+        return result
+
+    marshalled = marshal_decorator(inner)
+
+    @wraps(marshalled)
+    def wrapper(*args, **kwargs):
+        result = marshalled(*args, **kwargs)
+        start = getattr(_local, 'marshal_start', None)
+        trace = current_trace()
+        if start is not None and trace is not None:
+            trace.add(Span('marshal', func.__name__, time.time() - start, payload_size(result)))
+        _local.marshal_start = None
+        return result
+    return wrapper
+
+
+def instrument_backends():
+    """
+    Replace the Solr and SPARQL entry points used via ontobio by traced
+    versions
+
+    pysolr's request method covers every Golr query made through ontobio
+    (and biolink.export); run_solr_on and run_sparql_on make their own HTTP
+    calls. Must run before the endpoint modules are imported, as they bind
+    the ontobio functions with from-imports
+    """
+    import pysolr
+    from ontobio.golr import golr_query
+    from ontobio.sparql import sparql_ontol_utils
+
+    for owner, attr, backend in [(pysolr.Solr, '_send_request', 'golr'),
+                                 (golr_query, 'run_solr_on', 'golr'),
+                                 (sparql_ontol_utils, 'run_sparql_on', 'sparql')]:
+        func = getattr(owner, attr)
+        if not getattr(func, '__traced__', False):
+            wrapper = traced(backend)(func)
+            wrapper.__traced__ = True
+            setattr(owner, attr, wrapper)
+
+
+def start_trace():
+    if get_tracing_config().get('enabled', True):
+        g.trace = Trace(request.endpoint)
+
+
+def finish_trace(response):
+    trace = g.get('trace')
+    if trace is None:
+        return response
+    total = time.time() - trace.start
+    cfg = get_tracing_config()
+    if cfg.get('server_timing', True):
+        response.headers['Server-Timing'] = trace.server_timing(total)
+    if cfg.get('log', True):
+        log.info(json.dumps({
+            'event': 'request_trace',
+            'route': trace.route,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 3),
+            'spans': [s.as_dict() for s in trace.spans]
+        }))
+    get_timing_stats().add(trace, total)
+    return response
+
+
+def init_app(app):
+    instrument_backends()
+    app.before_request(start_trace)
+    app.after_request(finish_trace)
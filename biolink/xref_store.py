@@ -0,0 +1,194 @@
+"""
+Persistent store of gene <-> protein cross-references
+
+Conversions made by biolink.identifier_converter are stored in a sqlite
+file, shared by all the workers on a host, with the source of each mapping
+(scigraph, mygene or an imported file) and when it was made. Converters
+look ids up here before asking SciGraph or MyGeneInfo.
+
+The store can be filled offline from a tab-separated file of gene and
+protein ids (e.g. an HGNC or UniProt id mapping export):
+
+    python -m biolink.xref_store import MAPPING_FILE [--source NAME]
+    python -m biolink.xref_store stats
+
+Settings are in the xref_store section of conf/config.yaml
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from biolink.settings import get_biolink_config, get_data_path
+
+log = logging.getLogger(__name__)
+
+GENE_TO_PROTEIN = 'gene_to_protein'
+PROTEIN_TO_GENE = 'protein_to_gene'
+DIRECTIONS = [GENE_TO_PROTEIN, PROTEIN_TO_GENE]
+
+# relative to the data directory, see settings.get_data_path
+DEFAULT_PATH = 'xrefs.sqlite'
+
+# sqlite limits the number of parameters of a statement
+BATCH_SIZE = 500
+
+xref_store = None
+
+
+def get_xref_store_config():
+    return get_biolink_config().get('xref_store', {})
+
+
+class XrefStore(object):
+    """
+    Mappings of an id to a list of ids, per direction, in a sqlite file
+
+    Mappings older than max_age seconds are ignored, except for imported
+    ones (max_age None keeps everything)
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_age=None):
+        path = get_data_path(path)
+        self.path = path
+        self.max_age = max_age
+        self.lock = threading.RLock()
+        self.stats = {direction: {'hits': 0, 'misses': 0} for direction in DIRECTIONS}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS xrefs '
+            '(direction TEXT, id TEXT, xrefs TEXT, source TEXT, imported INTEGER, updated REAL, '
+            'PRIMARY KEY (direction, id))'
+        )
+        self.connection.commit()
+
+    def get_many(self, direction, ids):
+        """
+        Stored mappings of the ids, as an OrderedDict of id to list of ids;
+        ids without a (fresh) mapping are left out
+        """
+        found = {}
+        oldest = time.time() - self.max_age if self.max_age is not None else None
+        ids = list(OrderedDict.fromkeys(ids))
+        with self.lock:
+            for start in range(0, len(ids), BATCH_SIZE):
+                batch = ids[start:start + BATCH_SIZE]
+                rows = self.connection.execute(
+                    'SELECT id, xrefs, imported, updated FROM xrefs WHERE direction = ? AND id IN ({})'.format(
+                        ','.join('?' * len(batch))),
+                    [direction] + batch
+                ).fetchall()
+                for id, xrefs, imported, updated in rows:
+                    if oldest is None or imported or updated >= oldest:
+                        found[id] = json.loads(xrefs)
+            self.stats[direction]['hits'] += len(found)
+            self.stats[direction]['misses'] += len(ids) - len(found)
+        return OrderedDict((id, found[id]) for id in ids if id in found)
+
+    def put_many(self, direction, mappings, source, imported=False):
+        """
+        Store a dict of id to list of ids
+        """
+        now = time.time()
+        with self.lock:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO xrefs (direction, id, xrefs, source, imported, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [(direction, id, json.dumps(list(xrefs)), source, int(imported), now)
+                 for id, xrefs in mappings.items()]
+            )
+            self.connection.commit()
+
+    def import_mappings(self, lines, source):
+        """
+        Import gene <-> protein pairs from tab-separated lines of a gene id
+        and a protein id; blank lines and lines starting with # are skipped
+
+        Returns the number of genes and proteins imported
+        """
+        proteins = OrderedDict()
+        genes = OrderedDict()
+        for line in lines:
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+            columns = line.split('\t')
+            if len(columns) < 2:
+                log.warning("Skipping mapping line {}".format(line))
+                continue
+            gene, protein = columns[0].strip(), columns[1].strip()
+            proteins.setdefault(gene, OrderedDict())[protein] = True
+            genes.setdefault(protein, OrderedDict())[gene] = True
+        self.put_many(GENE_TO_PROTEIN, proteins, source, imported=True)
+        self.put_many(PROTEIN_TO_GENE, genes, source, imported=True)
+        return len(proteins), len(genes)
+
+    def get_stats(self):
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT direction, source, COUNT(*), MAX(updated) FROM xrefs GROUP BY direction, source'
+            ).fetchall()
+            stats = {}
+            for direction in DIRECTIONS:
+                counts = self.stats[direction]
+                total = counts['hits'] + counts['misses']
+                stats[direction] = {
+                    'hits': counts['hits'],
+                    'misses': counts['misses'],
+                    'hit_ratio': counts['hits'] / total if total else 0.0,
+                    'sources': {}
+                }
+        for direction, source, count, updated in rows:
+            if direction in stats:
+                stats[direction]['sources'][source] = {'entries': count, 'updated': updated}
+        return stats
+
+
+def get_xref_store():
+    """
+    XrefStore configured in config.yaml, None if it is disabled
+    """
+    global xref_store
+    cfg = get_xref_store_config()
+    if not cfg.get('enabled', False):
+        return None
+    if xref_store is None:
+        xref_store = XrefStore(path=cfg.get('path', DEFAULT_PATH), max_age=cfg.get('max_age'))
+    return xref_store
+
+
+def open_mapping_file(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt')
+    return open(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the gene/protein cross-reference store')
+    subparsers = parser.add_subparsers(dest='command')
+    import_parser = subparsers.add_parser('import', help='import a tab-separated gene/protein mapping file')
+    import_parser.add_argument('file', help='gene id and protein id per line, optionally gzipped')
+    import_parser.add_argument('--source', help='name of the mapping source, defaults to the file name')
+    subparsers.add_parser('stats', help='print the number of stored mappings per source')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    cfg = get_xref_store_config()
+    store = XrefStore(path=cfg.get('path', DEFAULT_PATH), max_age=cfg.get('max_age'))
+    if args.command == 'import':
+        with open_mapping_file(args.file) as f:
+            genes, proteins = store.import_mappings(f, args.source or os.path.basename(args.file))
+        print("{} genes, {} proteins imported into {}".format(genes, proteins, store.path))
+    else:
+        print(json.dumps(store.get_stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
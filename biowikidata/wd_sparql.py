@@ -15,6 +15,7 @@ import SPARQLWrapper, logging
 
 from biolink import NAME, VERSION
 from ontobio.util.user_agent import get_user_agent
+from biolink.tracing import traced
 
 USER_AGENT = get_user_agent(name=NAME, version=VERSION, modules=[SPARQLWrapper], caller_name=__name__)
 sparql = SPARQLWrapper.SPARQLWrapper("http://query.wikidata.org/sparql", agent=USER_AGENT)
@@ -60,6 +61,7 @@ class PrefixMap:
 
 prefix_map = PrefixMap()
 
+@traced('wikidata')
 def run_sparql_query(q,limit=10):
     """
     Run a given SPARQL query over the Wikidata SPARQL endpoint
@@ -0,0 +1,156 @@
+"""
+Non-blocking client for a SciGraph service
+
+AsyncSciGraph starts the lookups of a blocking SciGraph facade (neighbors,
+node, get_clique_leader, bioobject, traverse_chain, extract_subgraph)
+without waiting for them: each method returns a pending call whose
+result(timeout=None) waits for the lookup, as for a
+concurrent.futures.Future. Calls are spawned as greenlets under gunicorn's
+gevent worker and run on a thread pool otherwise (see biolink.concurrency).
+They share the facade's pooled session, and at most max_concurrency
+requests of a client are in flight at any time, across all the requests
+of the worker.
+
+The graph walks of the facade expand each level with AsyncSciGraph.expand,
+so Flask resources keep calling SciGraph as before:
+
+    graph = get_scigraph().extract_subgraph(['HP:0000107'])
+
+    pending = get_async_scigraph().bioobject('NCBIGene:3630', node_type='gene')
+    ...
+    gene = pending.result()
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+
+from biolink.concurrency import MODE_GEVENT, MODE_SERIAL, DEFAULT_MAX_WORKERS, concurrent_map, \
+    get_concurrency_config, get_mode
+from biolink.tracing import propagate
+
+
+class AsyncSciGraph(object):
+
+    def __init__(self, scigraph, max_concurrency=None):
+        """
+        Arguments
+        ---------
+        scigraph
+            blocking SciGraph facade doing the requests
+
+        max_concurrency
+            max number of requests in flight, defaults to the smaller of
+            concurrency.max_workers and the facade's pool_size, so that
+            requests never wait for a pooled connection
+        """
+        if max_concurrency is None:
+            max_concurrency = min(get_concurrency_config().get('max_workers', DEFAULT_MAX_WORKERS),
+                                  scigraph.pool_size)
+        self.scigraph = scigraph
+        self.max_concurrency = max(1, max_concurrency)
+        self.lock = threading.Lock()
+        # created on first use, once gunicorn's gevent worker has patched
+        # the standard library
+        self.slots = None
+        self.executor = None
+
+    def _get_slots(self):
+        with self.lock:
+            if self.slots is None:
+                if get_mode() == MODE_GEVENT:
+                    from gevent.lock import BoundedSemaphore
+                    self.slots = BoundedSemaphore(self.max_concurrency)
+                else:
+                    self.slots = threading.BoundedSemaphore(self.max_concurrency)
+            return self.slots
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+            return self.executor
+
+    def request(self, method, *args, **kwargs):
+        """
+        Calls a lookup method of the facade once a request slot is free
+        """
+        with self._get_slots():
+            return method(*args, **kwargs)
+
+    def spawn(self, func, *args, **kwargs):
+        """
+        Starts func(*args, **kwargs) without waiting for it
+
+        Returns: pending call, see PendingGreenlet
+        """
+        func = propagate(func)
+        mode = get_mode()
+        if mode == MODE_GEVENT:
+            import gevent
+            return PendingGreenlet(gevent.spawn(func, *args, **kwargs))
+        if mode == MODE_SERIAL:
+            future = Future()
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        return self._get_executor().submit(func, *args, **kwargs)
+
+    def neighbors(self, id=None, **params):
+        return self.spawn(self.request, self.scigraph.neighbors, id, **params)
+
+    def node(self, id=None, **params):
+        return self.spawn(self.request, self.scigraph.node, id, **params)
+
+    def get_clique_leader(self, id):
+        return self.spawn(self.request, self.scigraph.get_clique_leader, id)
+
+    def bioobject(self, id, node_type=None, class_name='BioObject', **params):
+        return self.spawn(self.request, self.scigraph.bioobject, id, node_type=node_type, class_name=class_name,
+                          **params)
+
+    # The walks do not hold a request slot themselves, only their lookups do
+    def traverse_chain(self, id=None, rels=[], type=None, blank=True, reverse_direction=False, max_nodes=None):
+        return self.spawn(self.scigraph.traverse_chain, id=id, rels=rels, type=type, blank=blank,
+                          reverse_direction=reverse_direction, max_nodes=max_nodes)
+
+    def extract_subgraph(self, ids=[], relationshipType='subClassOf', max_depth=None, max_nodes=None):
+        return self.spawn(self.scigraph.extract_subgraph, ids=ids, relationshipType=relationshipType,
+                          max_depth=max_depth, max_nodes=max_nodes)
+
+    def expand(self, ids, **params):
+        """
+        Neighbors of each of the ids, fetched concurrently and waited for
+
+        parameters are passed to SciGraph.neighbors
+
+        Returns a list of BBOPGraph in the order of ids
+        """
+        graphs = []
+        results = concurrent_map(lambda id: self.request(self.scigraph.neighbors, id, **params), ids,
+                                 max_workers=self.max_concurrency)
+        for graph, error in results:
+            if error is not None:
+                raise error
+            graphs.append(graph)
+        return graphs
+
+
+class PendingGreenlet(object):
+    """
+    Lookup running in a greenlet, with the result() of a concurrent.futures.Future
+    """
+
+    def __init__(self, greenlet):
+        self.greenlet = greenlet
+
+    def done(self):
+        return self.greenlet.ready()
+
+    def result(self, timeout=None):
+        self.greenlet.join(timeout=timeout)
+        if not self.greenlet.ready():
+            raise TimeoutError()
+        if not self.greenlet.successful():
+            raise self.greenlet.exception
+        return self.greenlet.value
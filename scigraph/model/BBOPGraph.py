@@ -9,14 +9,23 @@ class BBOPGraph:
     """
     BBOPGraph Graph object model
     https://github.com/berkeleybop/bbop-graph
-    """
 
-    nodemap = {}
+    Nodes are keyed by id and edges by (sub, pred, obj) so adding or
+    merging the same node or edge twice is a no-op. Edges are indexed
+    by subject, object and predicate, making neighbor lookups independent
+    of the size of the graph.
+    """
 
-    def __init__(self, obj):
+    def __init__(self, obj=None):
         self.nodes = []
         self.edges = []
-        self.add_json_graph(obj)
+        self.nodemap = {}
+        self.edgemap = {}
+        self.subject_index = {}
+        self.object_index = {}
+        self.predicate_index = {}
+        if obj is not None:
+            self.add_json_graph(obj)
 
     def add_json_graph(self, obj):
         for node in obj['nodes']:
@@ -25,11 +34,20 @@ class BBOPGraph:
             self.add_edge(Edge(edge))
 
     def add_node(self, node) :
+        if node.id in self.nodemap:
+            return
         self.nodemap[node.id] = node
         self.nodes.append(node)
 
     def add_edge(self, edge) :
+        key = edge.key()
+        if key in self.edgemap:
+            return
+        self.edgemap[key] = edge
         self.edges.append(edge)
+        self.subject_index.setdefault(edge.sub, []).append(edge)
+        self.object_index.setdefault(edge.obj, []).append(edge)
+        self.predicate_index.setdefault(edge.pred, []).append(edge)
 
     def merge(self, graph):
         for node in graph.nodes:
@@ -37,6 +55,9 @@ class BBOPGraph:
         for edge in graph.edges:
             self.add_edge(edge)
 
+    def has_node(self, id):
+        return id in self.nodemap
+
     def get_node(self, id) :
         return self.nodemap[id]
 
@@ -45,8 +66,6 @@ class BBOPGraph:
 
     def get_root_nodes(self, relations):
         roots = []
-        if relations is None:
-            relations = []
         for node in self.nodes:
             if len(self.get_outgoing_edges(node.id, relations)) == 0:
                 roots.append(node)
@@ -54,30 +73,37 @@ class BBOPGraph:
 
     def get_leaf_nodes(self, relations):
         roots = []
-        if relations is None:
-            relations = []
         for node in self.nodes:
             if len(self.get_incoming_edges(node.id, relations)) == 0:
                 roots.append(node)
         return roots
 
-    def get_outgoing_edges(self, nid, relations):
-        el = []
-        if relations is None:
-            relations = []
-        for edge in self.edges:
-            if edge.sub == nid:
-                if len(relations) == 0 or e.pred in relations:
-                    el.append(edge)
-        return el
-
-    def get_incoming_edges(self, nid, relations=[]):
-        el = []
-        for edge in self.edges:
-            if edge.obj == nid:
-                if len(relations) == 0 or edge.pred in relations:
-                    el.append(edge)
-        return el
+    def get_outgoing_edges(self, nid, relations=None):
+        return self._filter_edges(self.subject_index.get(nid, []), relations)
+
+    def get_incoming_edges(self, nid, relations=None):
+        return self._filter_edges(self.object_index.get(nid, []), relations)
+
+    def get_edges_by_predicate(self, pred):
+        return list(self.predicate_index.get(pred, []))
+
+    def get_parents(self, nid, relations=None):
+        """
+        ids of nodes connected to nid by an outgoing edge
+        """
+        return [edge.obj for edge in self.get_outgoing_edges(nid, relations)]
+
+    def get_children(self, nid, relations=None):
+        """
+        ids of nodes connected to nid by an incoming edge
+        """
+        return [edge.sub for edge in self.get_incoming_edges(nid, relations)]
+
+    @staticmethod
+    def _filter_edges(edges, relations):
+        if not relations:
+            return list(edges)
+        return [edge for edge in edges if edge.pred in relations]
 
     def as_dict(self):
         return {
@@ -87,7 +113,10 @@ class BBOPGraph:
 
 
 class Node:
-    def __init__(self, id, lbl=None, meta=None):    
+
+    __slots__ = ('id', 'lbl', 'meta')
+
+    def __init__(self, id, lbl=None, meta=None):
         self.id = id
         self.lbl = lbl
         self.meta = Meta(meta)
@@ -104,19 +133,30 @@ class Node:
 
 
 class Edge:
+
+    __slots__ = ('sub', 'pred', 'obj', 'meta')
+
     def __init__(self, obj):
         self.sub = obj['sub']
         self.pred = obj['pred']
         self.obj = obj['obj']
         self.meta = obj['meta']
-    
+
+    def key(self):
+        return (self.sub, self.pred, self.obj)
+
     def __str__(self):
         return self.sub + "-[" + self.pred + "]->" + self.obj
 
 
 class Meta:
+
+    __slots__ = ('type_list', 'category_list', 'pmap')
+
     def __init__(self, obj):
-        self.type_list = obj['types']
+        if obj is None:
+            obj = {}
+        self.type_list = obj.get('types', [])
         self.category_list = []
         if 'category' in obj:
             self.category_list = obj['category']
@@ -1,4 +1,7 @@
+import requests
 from requests import RequestException
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 __author__ = 'cjm'
 
@@ -7,6 +10,8 @@ Utility classes for wrapping a SciGraph service
 """
 
 import importlib
+import logging
+from collections import OrderedDict
 from prefixcommons.curie_util import expand_uri
 from ontobio.util.user_agent import get_user_agent
 from ontobio.util.scigraph_util import get_curie_map
@@ -17,6 +22,12 @@ from scigraph.model.EntityAnnotationResults import *
 from biomodel.core import BioObject, SynonymPropertyValue
 from biolink import NAME, VERSION
 from biolink.error_handlers import NoResultFoundException
+from biolink.concurrency import fan_out
+from biolink.tracing import traced
+from biolink.clique_cache import get_clique_cache
+from biolink.singleflight import coalesced, make_key
+from biolink.circuit_breaker import guarded, host, server_error
+from scigraph.async_scigraph import AsyncSciGraph
 
 # TODO: modularize into vocab/graph/etc?
 
@@ -29,6 +40,11 @@ HAS_DISPOSITION = 'RO:0000091'
 ENCODES = 'RO:0002205'
 HAS_DBXREF = 'oboInOwl:hasDbXref'
 
+# Responses worth retrying when SciGraph is restarting or behind a busy proxy
+RETRY_STATUS_CODES = [502, 503, 504]
+
+USER_AGENT = get_user_agent(name=NAME, version=VERSION, modules=[requests], caller_name=__name__)
+
 class SciGraph:
     """
     Facade object for accessing a SciGraph instance.
@@ -38,13 +54,86 @@ class SciGraph:
 
     """
 
-    def __init__(self, url=None):
+    def __init__(self, url=None, timeout=None, pool_size=10, keep_alive=True, max_retries=0, backoff_factor=0,
+                 max_concurrency=None):
+        """
+        Arguments
+        ---------
+        url
+            base URL of the SciGraph instance
+
+        timeout
+            seconds to wait for SciGraph to respond, None waits forever
+
+        pool_size
+            max number of connections kept open to the SciGraph host
+
+        keep_alive
+            if False, connections are closed after each request
+
+        max_retries
+            number of times to retry failed connections and 5xx gateway errors
+
+        backoff_factor
+            sleep between retries, grows as backoff_factor * 2^(retry - 1)
+
+        max_concurrency
+            max number of requests in flight for graph walks, see
+            scigraph.async_scigraph
+        """
         if url is not None:
             self.url_prefix = url
         else:
             self.url_prefix = "http://scigraph-data.monarchinitiative.org/scigraph/"
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = self._create_session(pool_size, keep_alive, max_retries, backoff_factor)
+        self.async_client = AsyncSciGraph(self, max_concurrency)
         return
 
+    def _create_session(self, pool_size, keep_alive, max_retries, backoff_factor):
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['User-Agent'] = USER_AGENT
+        if not keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def pool_stats(self):
+        """
+        Connection reuse counters for the pooled session
+
+        A hit is a request served over an already open connection,
+        a miss is a request that had to open a new one
+        """
+        requests_made = 0
+        connections_opened = 0
+        pools = 0
+        for adapter in set(self.session.adapters.values()):
+            pool_manager = adapter.poolmanager
+            for key in pool_manager.pools.keys():
+                pool = pool_manager.pools.get(key)
+                if pool is None:
+                    continue
+                pools += 1
+                requests_made += pool.num_requests
+                connections_opened += pool.num_connections
+        return {
+            'url': self.url_prefix,
+            'pools': pools,
+            'requests': requests_made,
+            'hits': max(requests_made - connections_opened, 0),
+            'misses': connections_opened
+        }
+
     def neighbors(self, id=None, **params):
         """
         Get neighbors of a node
@@ -76,16 +165,28 @@ class SciGraph:
 
     def get_clique_leader(self, id) -> BioObject:
         """
+        Leader of the equivalence clique of id, see biolink.clique_cache
+
         :raises NoResultFoundException
         :return: BioObject
         """
-        response = self.get_response("dynamic/cliqueLeader", q=id, format="json")
+        node = get_clique_cache(self).get_node(id)
+        if node is None:
+            raise NoResultFoundException('SciGraph dynamic/cliqueLeader yields no result for {}'.format(id))
+
+        return self.make_NamedObject(**node, class_name='BioObject')
+
+    def fetch_clique_leader_node(self, id):
+        """
+        Uncached dynamic/cliqueLeader lookup
 
+        :return: SciGraph node dict of the clique leader, None if there is none
+        """
+        response = self.get_response("dynamic/cliqueLeader", q=id, format="json")
         nodes = response.json()['nodes']
         if len(nodes) == 0:
-            raise NoResultFoundException('SciGraph dynamic/cliqueLeader yields no result for {}'.format(id))
-
-        return self.make_NamedObject(**nodes[0], class_name='BioObject')
+            return None
+        return nodes[0]
 
     def bioobject(self, id, node_type=None, class_name='BioObject', **params):
         """
@@ -102,52 +203,74 @@ class SciGraph:
         Returns: biomodel.BioObject or subclass
         """
         bio_object = self.get_clique_leader(id)
+        return self.add_bioobject_details(bio_object, node_type)
 
-        # get nodes connected with edge 'in_taxon'
-        response = self.get_response(
-            "graph/neighbors",
-            q=bio_object.id,
-            format="json",
-            depth=1,
-            relationshipType=IN_TAXON,
-            direction="OUTGOING"
-        )
+    def add_bioobject_details(self, bio_object, node_type=None):
+        """
+        Populates taxon (and for diseases, inheritance and clinical modifiers)
+        of a clique leader returned by get_clique_leader
 
-        graph = BBOPGraph(response.json())
+        The neighbor lookups are independent and run concurrently. If one of
+        them fails the corresponding fields are left empty and the failure is logged
 
+        Returns: biomodel.BioObject or subclass
+        """
+        calls = [lambda: self._outgoing_graph(bio_object.id, IN_TAXON)]
+        if node_type == 'disease':
+            calls.append(lambda: self._outgoing_graph(bio_object.id, HAS_DISPOSITION))
+        return self.set_bioobject_details(bio_object, node_type, fan_out(calls))
+
+    def set_bioobject_details(self, bio_object, node_type, results):
+        """
+        Populates a clique leader from its outgoing in_taxon graph (and for
+        diseases has_disposition graph), given as (graph, error) tuples
+
+        Returns: biomodel.BioObject or subclass
+        """
+        # get nodes connected with edge 'in_taxon'
+        graph, error = results[0]
         bio_object.taxon = None
-        for tax_edge in graph.edges:
-            bio_object.taxon = self.make_NamedObject(
-                **graph.get_node(tax_edge.obj).as_dict()
-            )
+        if error is not None:
+            logging.warning("Could not fetch taxon of {}: {}".format(bio_object.id, error))
+        else:
+            for tax_edge in graph.edges:
+                bio_object.taxon = self.make_NamedObject(
+                    **graph.get_node(tax_edge.obj).as_dict()
+                )
 
         # Type specific
         if node_type == 'disease':
             # get nodes connected with edge 'has_disposition'
-            response = self.get_response(
-                "graph/neighbors",
-                q=bio_object.id,
-                format="json",
-                depth=1,
-                relationshipType=HAS_DISPOSITION,
-                direction="OUTGOING"
-            )
-            graph = BBOPGraph(response.json())
+            graph, error = results[1]
             bio_object.inheritance = []
             bio_object.clinical_modifiers = []
-            for disposition_edge in graph.edges:
-                disposition = graph.get_node(disposition_edge.obj)
-                if 'inheritance' in disposition.meta.category_list:
-                    bio_object.inheritance.append(
-                        self.make_NamedObject(**disposition.as_dict())
-                    )
-                else:
-                    bio_object.clinical_modifiers.append(
-                        self.make_NamedObject(**disposition.as_dict())
-                    )
+            if error is not None:
+                logging.warning("Could not fetch dispositions of {}: {}".format(bio_object.id, error))
+            else:
+                for disposition_edge in graph.edges:
+                    disposition = graph.get_node(disposition_edge.obj)
+                    if 'inheritance' in disposition.meta.category_list:
+                        bio_object.inheritance.append(
+                            self.make_NamedObject(**disposition.as_dict())
+                        )
+                    else:
+                        bio_object.clinical_modifiers.append(
+                            self.make_NamedObject(**disposition.as_dict())
+                        )
 
         return bio_object
 
+    def _outgoing_graph(self, id, relationship_type):
+        response = self.get_response(
+            "graph/neighbors",
+            q=id,
+            format="json",
+            depth=1,
+            relationshipType=relationship_type,
+            direction="OUTGOING"
+        )
+        return BBOPGraph(response.json())
+
     def graph(self, id=None, depth=0):
         """
         Extracts a subgraph around a given in
@@ -163,84 +286,110 @@ class SciGraph:
         g1.merge(g3)
         return g1
 
+    def expand(self, ids, **params):
+        """
+        Neighbors of each of the ids, fetched concurrently by the
+        AsyncSciGraph client, with at most max_concurrency requests in flight
+
+        parameters are passed to neighbors
+
+        Returns a list of BBOPGraph in the order of ids
+        """
+        return self.async_client.expand(ids, **params)
+
     # TODO: replace with https://github.com/SciGraph/SciGraph/issues/200
-    def cbd(self, id=None):
+    def cbd(self, id=None, max_depth=None, max_nodes=None):
         """
         Returns the Concise Bounded Description of a node
 
+        Blank nodes are expanded breadth first, one level at a time, up to
+        max_depth levels and max_nodes expanded nodes if given
+
         See https://www.w3.org/Submission/CBD/
         """
-        nodes = [id]
-        g=BBOPGraph()
-        while len(nodes)>0:
-            n = nodes.pop()
-            nextg = self.neighbors(n, params={'blankNodes':True, 'direction':'OUTGOING','depth':1})
-            for nn in nextg.nodes:
-                if nn.id.startswith("_:"):
-                    n.append(nn.id)
-            g.merge(nextg)
+        g = BBOPGraph()
+        visited = {id}
+        frontier = [id]
+        depth = 0
+        while len(frontier) > 0 and (max_depth is None or depth < max_depth):
+            next_frontier = []
+            for nextg in self.expand(frontier, blankNodes=True, direction='OUTGOING', depth=1):
+                for nn in nextg.nodes:
+                    if nn.id.startswith("_:") and nn.id not in visited:
+                        visited.add(nn.id)
+                        next_frontier.append(nn.id)
+                g.merge(nextg)
+            frontier = _limit_frontier(next_frontier, visited, max_nodes)
+            depth += 1
         return g
 
-    def extract_subgraph(self, ids=[], relationshipType='subClassOf'):
+    def extract_subgraph(self, ids=[], relationshipType='subClassOf', max_depth=None, max_nodes=None):
         """
         Returns subgraph module extracted using list of node IDs as seed
-        """
-        g=BBOPGraph()
-        visited=[]
-        while len(ids)>0:
-            id = ids.pop()
-            nextg = self.neighbors(id, blankNodes=False, relationshipType=relationshipType, direction='OUTGOING',depth=1)
-            for edge in nextg.edges:
-                next_id = edge.obj
-                if next_id not in visited:
-                    ids.append(next_id)
-                    visited.append(next_id)
-            g.merge(nextg)
+
+        The graph is walked breadth first, fetching the neighbors of a whole
+        level concurrently, so the number of round trips grows with the
+        depth of the module rather than its size. The walk stops after
+        max_depth levels or max_nodes expanded nodes if given
+        """
+        g = BBOPGraph()
+        visited = set(ids)
+        frontier = list(OrderedDict.fromkeys(ids))
+        depth = 0
+        while len(frontier) > 0 and (max_depth is None or depth < max_depth):
+            next_frontier = []
+            for nextg in self.expand(frontier, blankNodes=False, relationshipType=relationshipType,
+                                     direction='OUTGOING', depth=1):
+                for edge in nextg.edges:
+                    next_id = edge.obj
+                    if next_id not in visited:
+                        visited.add(next_id)
+                        next_frontier.append(next_id)
+                g.merge(nextg)
+            frontier = _limit_frontier(next_frontier, visited, max_nodes)
+            depth += 1
         return g
 
     # TODO - direct SciGraph method?
-    def traverse_chain(self, id=None, rels=[], type=None, blank=True, reverse_direction=False):
+    def traverse_chain(self, id=None, rels=[], type=None, blank=True, reverse_direction=False, max_nodes=None):
         """
         Finds all nodes reachable via a specified chain of relationship types
+
+        Each link of the chain is followed from all the nodes reached by the
+        previous links at once, with the neighbor lookups of a step fetched
+        concurrently. At most max_nodes nodes are expanded per step if given
         """
-        # we pop parts of the chain from a stack, so the
-        # default direction is reversed, unless we
-        # want to follow in the opposite direction
-        rels_ordered = rels.copy()
-        if not reverse_direction:
-            rels_ordered.reverse()
+        # the chain is followed from its last link when going in the
+        # opposite direction
+        chain = list(reversed(rels)) if reverse_direction else list(rels)
 
         direction = 'OUTGOING'
         if reverse_direction:
             direction = 'INCOMING'
 
-        # list of tuples
-        stack = [ (id, rels_ordered) ]
-
         nmap = {}
-        sinks = []
-        while len(stack)>0:
-            (nextid, nextrels) = stack.pop()
-            if len(nextrels) == 0:
-                sinks.append(nextid)
-            else:
-                nextrel = nextrels.pop()
-                nextg = self.neighbors(nextid,
-                                       blankNodes=blank,
-                                       relationshipType=nextrel,
-                                       # works?
-                                       # See https://github.com/SciGraph/SciGraph/issues/135#issuecomment-305097228
-                                       entail=True,
-                                       direction=direction,
-                                       depth=1)
+        frontier = [id]
+        for rel in chain:
+            reached = OrderedDict()
+            for nextg in self.expand(frontier,
+                                     blankNodes=blank,
+                                     relationshipType=rel,
+                                     # works?
+                                     # See https://github.com/SciGraph/SciGraph/issues/135#issuecomment-305097228
+                                     entail=True,
+                                     direction=direction,
+                                     depth=1):
                 for n in nextg.nodes:
                     nmap[n.id] = n
                 for e in nextg.edges:
-                    if not blank and e.obj.startswith(":"):
+                    if not blank and e.obj.startswith("_:"):
                         continue
-                    stack.append( (e.obj, nextrels.copy()) )
+                    reached[e.obj] = True
+            frontier = list(reached)
+            if max_nodes is not None:
+                frontier = frontier[:max_nodes]
 
-        sinknodes = [nmap[x] for x in sinks]
+        sinknodes = [nmap[x] for x in frontier if x in nmap]
         if type is not None:
             sinknodes = [x for x in sinknodes if type in x.meta.pmap['types']]
 
@@ -289,6 +438,10 @@ class SciGraph:
         return EntityAnnotationResults(response.json(), content)
 
     # Internal wrapper onto requests API
+    @traced('scigraph')
+    @coalesced('scigraph', lambda self, path="", q=None, format=None, http_method='get', **params:
+               make_key(self.url_prefix, path, q, format, params) if http_method == 'get' else None)
+    @guarded(lambda self, *args, **kwargs: host(self.url_prefix), server_error)
     def get_response(self, path="", q=None, format=None, http_method='get', **params):
         url = self.url_prefix + path
         if q is not None:
@@ -296,9 +449,9 @@ class SciGraph:
         if format is not None:
             url = url  + "." + format
         if http_method == 'get':
-            r = requests.get(url, params=params, headers={'User-Agent': get_user_agent(name=NAME, version=VERSION, modules=[requests], caller_name=__name__)})
+            r = self.session.get(url, params=params, timeout=self.timeout)
         elif http_method == 'post':
-            r = requests.post(url, data=params, headers={'User-Agent': get_user_agent(name=NAME, version=VERSION, modules=[requests], caller_name=__name__)})
+            r = self.session.post(url, data=params, timeout=self.timeout)
         else:
             raise RequestException
 
@@ -336,13 +489,9 @@ class SciGraph:
 
         This method may be retired in future. See https://github.com/monarch-initiative/dipper/issues/461
         """
-        uniprot_ids = []
         clique_leader = self.get_clique_leader(id)
         objs = self.traverse_chain(clique_leader.id, [ENCODES, HAS_DBXREF], blank=False, reverse_direction=False)
-        for x in objs:
-            if x.id.startswith('UniProtKB') and x.id not in uniprot_ids:
-                uniprot_ids.append(x.id)
-        return uniprot_ids
+        return list(OrderedDict.fromkeys(x.id for x in objs if x.id.startswith('UniProtKB')))
 
     def uniprot_protein_to_genes(self, id):
         """
@@ -358,27 +507,23 @@ class SciGraph:
                                entail=True,
                                direction='INCOMING',
                                depth=1)
-        genes = []
-        for x in encoding_nodes.edges:
-            genes.append(x.sub)
+        genes = list(OrderedDict.fromkeys(x.sub for x in encoding_nodes.edges))
 
         # This second step is expensive and will no longer be required when https://github.com/SciGraph/SciGraph/issues/135
         # is implemented
-        gene_ids = []
-        for geneId in genes:
-            encoding_nodes = self.neighbors(geneId,
-                                   blankNodes=False,
-                                   relationshipType='equivalentClass',
-                                   # works?
-                                   # See https://github.com/SciGraph/SciGraph/issues/135#issuecomment-305097228
-                                   entail=True,
-                                   direction='BOTH',
-                                   depth=1)
+        gene_ids = OrderedDict()
+        for encoding_nodes in self.expand(genes,
+                                          blankNodes=False,
+                                          relationshipType='equivalentClass',
+                                          # works?
+                                          # See https://github.com/SciGraph/SciGraph/issues/135#issuecomment-305097228
+                                          entail=True,
+                                          direction='BOTH',
+                                          depth=1):
             for x in encoding_nodes.edges:
-                if x.sub not in gene_ids:
-                    gene_ids.append(x.sub)
+                gene_ids[x.sub] = True
 
-        return gene_ids
+        return list(gene_ids)
 
     def phenotype_to_entity_list(self, id):
         """
@@ -424,6 +569,15 @@ class SciGraph:
         datasets = response_json['nodes']
         return datasets
 
+def _limit_frontier(frontier, visited, max_nodes):
+    """
+    Truncates the next level of a walk once max_nodes nodes have been seen
+    """
+    if max_nodes is None:
+        return frontier
+    remaining = max_nodes - (len(visited) - len(frontier))
+    return frontier[:max(remaining, 0)]
+
 def bbg_to_assocs(g):
     return [bbedge_to_assoc(e,g) for e in g.edges]
 
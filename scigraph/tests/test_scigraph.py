@@ -1,8 +1,7 @@
-from scigraph.scigraph_util import SciGraph
-from biolink.settings import get_biolink_config
+from biolink.settings import get_scigraph
 import json
 
-sg = SciGraph(get_biolink_config()['scigraph_data']['url'])
+sg = get_scigraph('scigraph_data')
 
 def test_node():
     n = sg.node(id="MP:0000272")
@@ -13,3 +12,11 @@ def test_bio_operations():
     zp="ZP:0004204"
     enodes = sg.phenotype_to_entity_list(id=zp)
     assert len(enodes)>0
+
+def test_connection_reuse():
+    sg.node(id="MP:0000272")
+    before = sg.pool_stats()
+    sg.node(id="MP:0000272")
+    after = sg.pool_stats()
+    assert after['requests'] == before['requests'] + 1
+    assert after['hits'] > before['hits']
@@ -0,0 +1,61 @@
+"""
+pip install pytest-benchmark
+pytest tests/benchmark/benchmark_bbopgraph.py
+
+Neighbor lookups should take the same time regardless of graph size
+"""
+
+import pytest
+
+from scigraph.model.BBOPGraph import BBOPGraph
+
+SUBCLASS_OF = 'subClassOf'
+PART_OF = 'BFO:0000050'
+
+
+def make_graph(num_edges):
+    """
+    Chain of HP-like nodes where each node has two parents,
+    one via subClassOf and one via part_of
+    """
+    num_nodes = num_edges // 2 + 1
+    nodes = [{'id': 'HP:{:07d}'.format(i), 'lbl': 'term {}'.format(i), 'meta': {'types': ['class']}}
+             for i in range(num_nodes)]
+    edges = []
+    for i in range(1, num_nodes):
+        edges.append({'sub': nodes[i]['id'], 'pred': SUBCLASS_OF, 'obj': nodes[i - 1]['id'], 'meta': {}})
+        edges.append({'sub': nodes[i]['id'], 'pred': PART_OF, 'obj': nodes[i // 2]['id'], 'meta': {}})
+    return BBOPGraph({'nodes': nodes, 'edges': edges[:num_edges]})
+
+
+@pytest.fixture(scope='module', params=[1000, 10000, 100000])
+def graph(request):
+    return make_graph(request.param)
+
+
+def lookup_neighbors(graph, ids):
+    for nid in ids:
+        graph.get_outgoing_edges(nid, [SUBCLASS_OF])
+        graph.get_incoming_edges(nid)
+
+
+def test_neighbor_lookup(benchmark, graph):
+    ids = [graph.nodes[i].id for i in range(0, len(graph.nodes), len(graph.nodes) // 100)]
+    benchmark(lookup_neighbors, graph, ids)
+    assert len(graph.get_outgoing_edges(graph.nodes[-1].id)) == 2
+
+
+def test_root_nodes(benchmark, graph):
+    roots = benchmark(graph.get_root_nodes, [SUBCLASS_OF])
+    assert [node.id for node in roots] == ['HP:0000000']
+
+
+def test_merge_is_deduplicated(benchmark, graph):
+    def merge():
+        merged = BBOPGraph()
+        merged.merge(graph)
+        merged.merge(graph)
+        return merged
+    merged = benchmark.pedantic(merge, rounds=3)
+    assert len(merged.nodes) == len(graph.nodes)
+    assert len(merged.edges) == len(graph.edges)
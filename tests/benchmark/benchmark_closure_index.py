@@ -0,0 +1,68 @@
+"""
+pip install pytest-benchmark
+pytest tests/benchmark/benchmark_closure_index.py
+
+Closure index lookups against networkx traversal of the same ontology
+"""
+
+import networkx as nx
+import pytest
+from ontobio.ontol import Ontology
+
+from biolink.ontology.closure_index import ClosureIndex
+
+SUBCLASS_OF = 'subClassOf'
+PART_OF = 'BFO:0000050'
+RELATIONS = [SUBCLASS_OF, PART_OF]
+
+
+def make_ontology(num_nodes):
+    """
+    GO-like DAG: each term has a subClassOf parent and a part_of parent
+    higher up, giving closures that grow with the log of the size
+    """
+    graph = nx.MultiDiGraph()
+    ids = ['GO:{:07d}'.format(i) for i in range(num_nodes)]
+    for i, id in enumerate(ids):
+        graph.add_node(id, label='term {}'.format(i))
+    for i in range(1, num_nodes):
+        graph.add_edge(ids[(i - 1) // 4], ids[i], pred=SUBCLASS_OF)
+        graph.add_edge(ids[(i * 7919) % i // 40], ids[i], pred=PART_OF)
+    return Ontology(handle='go', id='go', graph=graph)
+
+
+@pytest.fixture(scope='module', params=[1000, 10000, 50000])
+def ontology(request):
+    return make_ontology(request.param)
+
+
+@pytest.fixture(scope='module')
+def index(ontology):
+    return ClosureIndex.from_ontology(ontology, RELATIONS)
+
+
+def query_ids(ontology):
+    nodes = sorted(ontology.nodes())
+    return nodes[len(nodes) // 2], nodes[-1]
+
+
+def test_traverse_networkx(benchmark, ontology):
+    a, b = query_ids(ontology)
+    benchmark(ontology.traverse_nodes, [a, b], up=True, down=False, relations=RELATIONS)
+
+
+def test_traverse_index(benchmark, ontology, index):
+    a, b = query_ids(ontology)
+    nodes = benchmark(index.traverse, [a, b], up=True, down=False)
+    assert nodes == ontology.traverse_nodes([a, b], up=True, down=False, relations=RELATIONS)
+
+
+def test_shared_ancestors_index(benchmark, ontology, index):
+    a, b = query_ids(ontology)
+    shared = benchmark(index.shared_ancestors, a, b)
+    assert 'GO:0000000' in shared
+
+
+def test_mica_index(benchmark, ontology, index):
+    a, b = query_ids(ontology)
+    assert benchmark(index.mica, a, b) is not None
@@ -0,0 +1,78 @@
+"""
+pip install pytest-benchmark
+pytest tests/benchmark/benchmark_encoding.py
+
+Encoding time and peak memory (in extra_info) of a 10k association
+response with each encoder
+"""
+import tracemalloc
+from collections import OrderedDict
+
+import pytest
+
+from biolink import encoding
+
+NUM_ASSOCIATIONS = 10000
+
+
+def make_association(i):
+    return OrderedDict([
+        ('id', 'association-{}'.format(i)),
+        ('subject', OrderedDict([
+            ('id', 'NCBIGene:{}'.format(84570 + i % 100)),
+            ('label', 'COL25A1'),
+            ('category', ['gene']),
+            ('taxon', OrderedDict([('id', 'NCBITaxon:9606'), ('label', 'Homo sapiens')])),
+        ])),
+        ('object', OrderedDict([
+            ('id', 'HP:{:07d}'.format(i)),
+            ('label', 'phenotype {}'.format(i)),
+            ('category', ['phenotype']),
+            ('taxon', None),
+        ])),
+        ('relation', OrderedDict([('id', 'RO:0002200'), ('label', 'has phenotype'), ('inverse', False)])),
+        ('negated', False),
+        ('provided_by', ['https://data.monarchinitiative.org/ttl/hpoa.ttl']),
+        ('evidence_types', [OrderedDict([('id', 'ECO:0000304'), ('label', 'author statement')])]),
+        ('publications', [OrderedDict([('id', 'PMID:{}'.format(25589040 + i)), ('label', None)])]),
+        ('frequency', OrderedDict([('id', 'HP:0040283'), ('label', 'Occasional')])),
+        ('onset', None),
+    ])
+
+
+@pytest.fixture(scope='module')
+def response():
+    return OrderedDict([
+        ('numFound', NUM_ASSOCIATIONS),
+        ('associations', [make_association(i) for i in range(NUM_ASSOCIATIONS)]),
+        ('facet_counts', {}),
+    ])
+
+
+def peak_memory(encode, data):
+    tracemalloc.start()
+    try:
+        encode(data)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('name,module', [
+    ('json', None),
+    ('orjson', 'orjson'),
+    ('msgpack', 'msgpack'),
+    ('cbor', 'cbor2'),
+])
+def test_encode(benchmark, response, name, module):
+    if module is not None:
+        pytest.importorskip(module)
+    encode = {
+        'json': encoding.encode_json,
+        'orjson': encoding.encode_orjson,
+        'msgpack': encoding.encode_msgpack,
+        'cbor': encoding.encode_cbor,
+    }[name]
+    body = benchmark(encode, response)
+    benchmark.extra_info['bytes'] = len(body)
+    benchmark.extra_info['peak_memory'] = peak_memory(encode, response)
@@ -0,0 +1,81 @@
+"""
+pip install pytest-benchmark
+pytest tests/benchmark/benchmark_marshalling.py
+
+Marshalling of association_results with flask-restplus and with the
+precompiled model, for 1k and 10k associations; peak memory and the
+number of allocated blocks are in extra_info
+"""
+import tracemalloc
+
+import pytest
+from flask_restplus import marshal as restplus_marshal
+
+from biolink.datamodel.serializers import association_results
+from biolink import marshalling
+
+
+def make_association(i):
+    return {
+        'id': 'association-{}'.format(i),
+        'subject': {
+            'id': 'NCBIGene:{}'.format(84570 + i % 100),
+            'label': 'COL25A1',
+            'category': ['gene'],
+            'taxon': {'id': 'NCBITaxon:9606', 'label': 'Homo sapiens'},
+        },
+        'object': {
+            'id': 'HP:{:07d}'.format(i),
+            'label': 'phenotype {}'.format(i),
+            'category': ['phenotype'],
+            'taxon': None,
+        },
+        'relation': {'id': 'RO:0002200', 'label': 'has phenotype', 'category': None},
+        'negated': False,
+        'evidence_graph': {
+            'nodes': [{'id': 'HP:{:07d}'.format(i), 'lbl': 'phenotype {}'.format(i)}],
+            'edges': [{'sub': 'NCBIGene:84570', 'pred': 'RO:0002200', 'obj': 'HP:{:07d}'.format(i)}],
+        },
+        'evidence_types': [{'id': 'ECO:0000304', 'label': 'author statement'}],
+        'provided_by': ['https://data.monarchinitiative.org/ttl/hpoa.ttl'],
+        'publications': [{'id': 'PMID:{}'.format(25589040 + i)}],
+        'frequency': {'id': 'HP:0040283', 'label': 'Occasional'},
+    }
+
+
+@pytest.fixture(scope='module', params=[1000, 10000])
+def results(request):
+    return {
+        'numFound': request.param,
+        'associations': [make_association(i) for i in range(request.param)],
+        'facet_counts': {},
+    }
+
+
+def record_allocations(benchmark, func, data):
+    tracemalloc.start()
+    try:
+        func(data)
+        snapshot = tracemalloc.take_snapshot()
+        benchmark.extra_info['peak_memory'] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    benchmark.extra_info['allocated_blocks'] = sum(stat.count for stat in snapshot.statistics('filename'))
+
+
+def test_marshal_restplus(benchmark, results):
+    func = lambda data: restplus_marshal(data, association_results)
+    benchmark(func, results)
+    record_allocations(benchmark, func, results)
+
+
+def test_marshal_compiled(benchmark, results):
+    func = lambda data: marshalling.marshal(data, association_results)
+    assert benchmark(func, results) == restplus_marshal(results, association_results)
+    record_allocations(benchmark, func, results)
+
+
+def test_iter_json_compiled(benchmark, results):
+    func = lambda data: sum(len(chunk) for chunk in marshalling.iter_json(data, association_results))
+    benchmark(func, results)
+    record_allocations(benchmark, func, results)
@@ -0,0 +1,61 @@
+"""
+pip install pytest-benchmark
+pytest tests/benchmark/benchmark_projection.py
+
+Association routes with and without a fields projection, served from
+recorded backend responses (see replay.py and benchmark_routes.py). The
+bytes read from the backends and the size of the response are saved in
+the benchmark's extra_info.
+
+Record new projected Golr queries with
+make benchmark-recordings
+"""
+
+import pytest
+
+import replay
+
+FIELDS = 'subject.id,subject.label,object.id,object.label'
+
+ROUTES = [
+    '/api/bioentity/gene/NCBIGene:3630/phenotypes?rows=1000',
+    '/api/bioentity/disease/MONDO:0007739/genes?rows=1000',
+    '/api/association/from/NCBIGene:3630?rows=1000',
+]
+
+CASES = [(url, fields) for url in ROUTES for fields in [None, FIELDS]]
+
+
+@pytest.fixture(scope='module')
+def client(recordings):
+    from biolink.app import app
+    from biolink.cache import get_response_cache
+    get_response_cache().enabled = False
+    app.testing = True
+    return app.test_client()
+
+
+def fetch(client, url):
+    response = client.get(url)
+    response.get_data()
+    return response
+
+
+@pytest.mark.parametrize('url,fields', CASES, ids=['{} fields={}'.format(url, fields) for url, fields in CASES])
+def test_projection(benchmark, client, url, fields):
+    if fields is not None:
+        url = '{}&fields={}'.format(url, fields)
+    replay_server = replay.active
+    if replay_server is not None:
+        del replay_server.misses[:]
+        replay_server.bytes_served = 0
+    response = fetch(client, url)
+    if replay_server is not None and replay_server.misses:
+        pytest.skip('no recording for {}'.format(replay_server.misses[0]))
+    assert response.status_code == 200
+
+    benchmark.group = url.split('&fields=')[0]
+    benchmark.extra_info['response_bytes'] = len(response.get_data())
+    if replay_server is not None:
+        benchmark.extra_info['backend_bytes'] = replay_server.bytes_served
+    benchmark.pedantic(fetch, args=(client, url), rounds=10, warmup_rounds=1)
@@ -0,0 +1,81 @@
+"""
+pip install pytest-benchmark
+pytest tests/benchmark/benchmark_routes.py --benchmark-autosave
+pytest tests/benchmark/benchmark_routes.py --benchmark-compare
+
+Representative routes of each namespace, served by the app test client with
+Golr, SciGraph, SPARQL and OwlSim responses replayed from
+tests/benchmark/recordings (see replay.py), so that the timings only cover
+our own parsing, marshalling and post-processing. The peak memory allocated
+while serving each route is saved in the benchmark's extra_info.
+
+Routes without recordings are skipped; record new routes with
+make benchmark-recordings
+"""
+
+import tracemalloc
+
+import pytest
+
+import replay
+
+ROUTES = [
+    ('bioentity', '/api/bioentity/gene/NCBIGene:3630'),
+    ('bioentity', '/api/bioentity/gene/NCBIGene:3630?get_association_counts=true&distinct_counts=true'),
+    ('bioentity', '/api/bioentity/gene/NCBIGene:3630/phenotypes?rows=100'),
+    ('bioentity', '/api/bioentity/gene/NCBIGene:3630/phenotypes?rows=100&facet=true'),
+    ('bioentity', '/api/bioentity/disease/MONDO:0007739/genes?rows=100'),
+    ('association', '/api/association/from/NCBIGene:3630?rows=100'),
+    ('association', '/api/association/find/gene/phenotype?subject_taxon=NCBITaxon:9606&rows=100'),
+    ('search', '/api/search/entity/marfan?rows=20'),
+    ('search', '/api/search/entity/autocomplete/marf?rows=20'),
+    ('ontol', '/api/ontology/shared/GO:0006259/GO:0046483'),
+    ('ontol', '/api/ontology/term/GO:0003677'),
+    ('sim', '/api/sim/search?id=HP:0000739&id=HP:0000740'),
+    ('mart', '/api/mart/ortholog/NCBITaxon:7227/NCBITaxon:6239'),
+    ('mart', '/api/mart/ortholog/NCBITaxon:7227/NCBITaxon:6239?format=ndjson'),
+    ('entityset', '/api/bioentityset/slimmer/anatomy?subject=NCBIGene:3630&slim=UBERON:0002107&slim=UBERON:0000955'),
+    ('entityset', '/api/bioentityset/homologs/?subject=NCBIGene:3630&subject=NCBIGene:7490'),
+]
+
+
+@pytest.fixture(scope='module')
+def client(recordings):
+    from biolink.app import app
+    from biolink.cache import get_response_cache
+    # every round must reach the route code, not the response cache
+    get_response_cache().enabled = False
+    app.testing = True
+    return app.test_client()
+
+
+def fetch(client, url):
+    response = client.get(url)
+    # consume streamed responses
+    response.get_data()
+    return response
+
+
+def peak_allocation(client, url):
+    tracemalloc.start()
+    try:
+        fetch(client, url)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('namespace,url', ROUTES, ids=['{}:{}'.format(ns, url) for ns, url in ROUTES])
+def test_route(benchmark, client, namespace, url):
+    replay_server = replay.active
+    if replay_server is not None:
+        del replay_server.misses[:]
+    response = fetch(client, url)
+    if replay_server is not None and replay_server.misses:
+        pytest.skip('no recording for {}'.format(replay_server.misses[0]))
+    assert response.status_code == 200
+
+    benchmark.group = namespace
+    benchmark.extra_info['peak_allocated_bytes'] = peak_allocation(client, url)
+    response = benchmark.pedantic(fetch, args=(client, url), rounds=10, warmup_rounds=1)
+    assert response.status_code == 200
@@ -0,0 +1,27 @@
+import pytest
+
+import replay
+
+
+def pytest_configure(config):
+    # Redirect backend traffic before any test module imports ontobio,
+    # which fetches the ECO mapping at import time
+    replay.start_from_env()
+
+
+def pytest_unconfigure(config):
+    if replay.active is not None:
+        server = replay.active
+        replay.uninstall()
+        server.stop()
+
+
+@pytest.fixture(scope='session')
+def recordings():
+    """
+    Skips the tests served from recorded backend responses when there are
+    none to replay
+    """
+    server = replay.active
+    if server is not None and server.mode == replay.MODE_REPLAY and not server.store.has_recordings():
+        pytest.skip('No recordings in {}, capture them with make benchmark-recordings'.format(server.store.path))
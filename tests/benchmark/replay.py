@@ -0,0 +1,264 @@
+"""
+Record and replay the backend responses (Golr, SciGraph, SPARQL, OwlSim,
+MyGene...) seen by the API, so that route benchmarks run offline and only
+measure our own code.
+
+All outgoing HTTP from requests (pysolr, SciGraph, OwlSim, biothings) and
+from urllib (SPARQLWrapper) is redirected to a local stub server, as
+http://127.0.0.1:<port>/<scheme>/<host>/<path>?<query>. The stub serves
+the recording of the request, saved under tests/benchmark/recordings.
+Requests without a recording get a 502 response and are listed in
+ReplayServer.misses, so that replayed benchmarks never reach the network;
+in record mode they are forwarded to the real backend and saved as new
+recordings.
+
+The committed recordings cover the routes of benchmark_routes.py and
+benchmark_projection.py, trimmed to at most 100 documents per response.
+Refresh them with network access with `make benchmark-recordings`
+(BIOLINK_REPLAY=record). Set BIOLINK_REPLAY=off to leave outgoing HTTP
+alone.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import socketserver
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+MODE_REPLAY = 'replay'
+MODE_RECORD = 'record'
+MODE_OFF = 'off'
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')
+
+LOOPBACK = {'127.0.0.1', 'localhost', '::1'}
+
+# Hop-by-hop and encoding headers that must not be replayed
+SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive'}
+
+ORIGINAL_SEND = HTTPAdapter.send
+
+# ReplayServer started by start_from_env
+active = None
+
+
+def request_key(method, url, body):
+    """
+    Recording key of a request, independent of query parameter order
+    """
+    parts = urlsplit(url)
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    normalized = [
+        method.upper(),
+        parts.scheme,
+        parts.netloc,
+        parts.path,
+        sorted(parse_qsl(parts.query, keep_blank_values=True)),
+        hashlib.sha1(body or b'').hexdigest()
+    ]
+    return hashlib.sha1(json.dumps(normalized).encode('utf-8')).hexdigest()
+
+
+class RecordingStore(object):
+    """
+    Responses stored as one JSON file per request, grouped by backend host
+    """
+
+    def __init__(self, path=RECORDINGS_DIR):
+        self.path = path
+
+    def _file(self, url, key):
+        host = urlsplit(url).netloc.replace(':', '_')
+        return os.path.join(self.path, host, key + '.json')
+
+    def has_recordings(self):
+        return os.path.isdir(self.path) and any(files for _, _, files in os.walk(self.path))
+
+    def get(self, method, url, body):
+        path = self._file(url, request_key(method, url, body))
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            recording = json.load(f)
+        if recording.get('base64'):
+            recording['body'] = base64.b64decode(recording['body'])
+        else:
+            recording['body'] = recording['body'].encode('utf-8')
+        return recording
+
+    def put(self, method, url, body, status, headers, content):
+        path = self._file(url, request_key(method, url, body))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        recording = {
+            'method': method,
+            'url': url,
+            'status': status,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in SKIPPED_HEADERS}
+        }
+        try:
+            recording['body'] = content.decode('utf-8')
+        except UnicodeDecodeError:
+            recording['body'] = base64.b64encode(content).decode('ascii')
+            recording['base64'] = True
+        with open(path, 'w') as f:
+            json.dump(recording, f, indent=1, sort_keys=True)
+
+
+class PassthroughAdapter(HTTPAdapter):
+    """
+    Adapter used by the stub itself to reach the real backends
+    """
+
+    def send(self, request, **kwargs):
+        return ORIGINAL_SEND(self, request, **kwargs)
+
+
+class _Server(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ReplayServer(object):
+    """
+    Local stub serving recorded backend responses
+    """
+
+    def __init__(self, mode=MODE_REPLAY, store=None):
+        self.mode = mode
+        self.store = store if store is not None else RecordingStore()
+        self.misses = []
+        # bytes of the backend responses served, e.g. to compare Golr field lists
+        self.bytes_served = 0
+        self.session = requests.Session()
+        self.session.mount('http://', PassthroughAdapter())
+        self.session.mount('https://', PassthroughAdapter())
+        self.server = _Server(('127.0.0.1', 0), self._handler_class())
+        self.base_url = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stub_url(self, url):
+        parts = urlsplit(url)
+        stub = '{}/{}/{}{}'.format(self.base_url, parts.scheme, parts.netloc, parts.path or '/')
+        if parts.query:
+            stub += '?' + parts.query
+        return stub
+
+    def backend_url(self, path):
+        scheme, _, rest = path.lstrip('/').partition('/')
+        return '{}://{}'.format(scheme, rest)
+
+    def respond(self, method, url, headers, body):
+        recording = self.store.get(method, url, body)
+        if recording is not None:
+            return recording['status'], recording['headers'], recording['body']
+        # Without a recording the request only goes to the real backend
+        # in record mode, otherwise it is reported as a miss
+        if self.mode != MODE_RECORD:
+            self.misses.append('{} {}'.format(method, url))
+            return 502, {'Content-Type': 'text/plain'}, 'No recording for {} {}'.format(method, url).encode('utf-8')
+        response = self.session.request(method, url, headers=headers, data=body, timeout=120)
+        self.store.put(method, url, body, response.status_code, dict(response.headers), response.content)
+        return response.status_code, response.headers, response.content
+
+    def _handler_class(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else None
+                headers = {k: v for k, v in self.headers.items() if k.lower() not in ('host', 'content-length')}
+                url = replay.backend_url(self.path)
+                try:
+                    status, response_headers, content = replay.respond(self.command, url, headers, body)
+                except Exception as e:
+                    log.exception("Replay of {} failed".format(url))
+                    status, response_headers, content = 502, {'Content-Type': 'text/plain'}, str(e).encode('utf-8')
+                self.send_response(status)
+                for k, v in response_headers.items():
+                    if k.lower() not in SKIPPED_HEADERS:
+                        self.send_header(k, v)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+                replay.bytes_served += len(content)
+
+            do_GET = _handle
+            do_POST = _handle
+            do_HEAD = _handle
+
+            def log_message(self, format, *args):
+                log.debug(format % args)
+
+        return Handler
+
+
+class _UrllibRedirect(urllib.request.BaseHandler):
+    """
+    Rewrites urllib requests (SPARQLWrapper) to the stub
+    """
+
+    def __init__(self, replay):
+        self.replay = replay
+
+    def http_request(self, req):
+        if urlsplit(req.full_url).hostname not in LOOPBACK:
+            req.full_url = self.replay.stub_url(req.full_url)
+        return req
+
+    https_request = http_request
+
+
+def install(replay):
+    """
+    Route all outgoing requests and urllib traffic through the stub;
+    loopback URLs (e.g. a local API server) are left alone
+    """
+    def send(adapter, request, **kwargs):
+        if urlsplit(request.url).hostname not in LOOPBACK:
+            request.url = replay.stub_url(request.url)
+        return ORIGINAL_SEND(adapter, request, **kwargs)
+
+    HTTPAdapter.send = send
+    urllib.request.install_opener(urllib.request.build_opener(_UrllibRedirect(replay)))
+
+
+def uninstall():
+    global active
+    active = None
+    HTTPAdapter.send = ORIGINAL_SEND
+    urllib.request.install_opener(None)
+
+
+def start_from_env():
+    """
+    Start the stub and redirect traffic to it according to BIOLINK_REPLAY
+    (replay by default). Returns None when replay is off
+    """
+    global active
+    mode = os.environ.get('BIOLINK_REPLAY', MODE_REPLAY)
+    if mode == MODE_OFF:
+        return None
+    replay = ReplayServer(mode=mode).start()
+    install(replay)
+    active = replay
+    log.info("Backend responses are {}ed via {}".format(mode, replay.base_url))
+    return replay
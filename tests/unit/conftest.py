@@ -0,0 +1,15 @@
+import os
+import shutil
+import tempfile
+
+
+def pytest_configure(config):
+    # Stores created while importing the app (xref store, association
+    # counts...) must not write to, or read from, the repository data dir
+    config.data_dir = tempfile.mkdtemp(prefix='biolink-data-')
+    os.environ['BIOLINK_DATA_DIR'] = config.data_dir
+
+
+def pytest_unconfigure(config):
+    del os.environ['BIOLINK_DATA_DIR']
+    shutil.rmtree(config.data_dir, ignore_errors=True)
@@ -0,0 +1,102 @@
+import json
+
+from ontobio.golr.golr_query import GolrAssociationQuery
+
+from biolink.api.bio import association_counts
+
+
+class FakeResults(object):
+
+    def __init__(self, facets):
+        self.raw_response = {'facets': facets}
+
+
+class FakeSolr(object):
+
+    def __init__(self, facets):
+        self.facets = facets
+        self.params = []
+
+    def search(self, **params):
+        self.params.append(params)
+        return FakeResults(self.facets)
+
+
+def fake_query(monkeypatch, facets):
+    solr = FakeSolr(facets)
+
+    class Query(GolrAssociationQuery):
+        def __init__(self, **kwargs):
+            super().__init__(solr=solr, **kwargs)
+
+    monkeypatch.setattr(association_counts, 'GolrAssociationQuery', Query)
+    return solr
+
+
+def bucket(value, count, distinct=None, taxa=None):
+    b = {'val': value, 'count': count}
+    if distinct is not None:
+        b['distinct'] = distinct
+    if taxa is not None:
+        b['taxon'] = {'buckets': taxa}
+    return b
+
+
+FACETS = {
+    'count': 14,
+    'subject': {
+        'count': 10,
+        'association_type': {'buckets': [
+            bucket('gene_phenotype', 8, 6, [bucket('NCBITaxon:9606', 8, 6)]),
+            bucket('gene_disease', 2, 1, [bucket('NCBITaxon:9606', 2, 1)]),
+        ]},
+        'is_defined_by': {'buckets': [bucket('hpoa', 6), bucket('clinvar', 4)]},
+    },
+    'object': {
+        'count': 1,
+        'association_type': {'buckets': [bucket('variant_gene', 1, 1, [bucket('NCBITaxon:9606', 1, 1)])]},
+        'is_defined_by': {'buckets': [bucket('clinvar', 1)]},
+    },
+    'ortholog': {
+        'count': 3,
+        'association_type': {'buckets': [
+            bucket('gene_phenotype', 3, 2, [bucket('NCBITaxon:10090', 2, 2), bucket('NCBITaxon:7955', 1, 1)]),
+        ]},
+    },
+}
+
+
+def test_single_request(monkeypatch):
+    solr = fake_query(monkeypatch, FACETS)
+    counts = association_counts.get_association_counts('NCBIGene:3630', 'gene')
+    assert len(solr.params) == 1
+    params = solr.params[0]
+    assert params['rows'] == 0
+    assert params['fq'][-1] == 'subject_closure:"NCBIGene:3630" OR object_closure:"NCBIGene:3630" ' \
+                               'OR subject_ortholog_closure:"NCBIGene:3630"'
+    json_facet = json.loads(params['json.facet'])
+    assert set(json_facet) == {'subject', 'object', 'ortholog'}
+    assert 'distinct' not in json_facet['subject']['facet']['association_type']['facet']
+
+    assert counts['phenotype'] == {'counts': 8, 'counts_by_taxon': {'NCBITaxon:9606': 8}}
+    assert counts['causal-disease'] == {'counts': 2, 'counts_by_taxon': {'NCBITaxon:9606': 2}}
+    assert counts['variant']['counts'] == 1
+    assert counts['ortholog-phenotype'] == {'counts': 3, 'counts_by_taxon': {'NCBITaxon:10090': 2, 'NCBITaxon:7955': 1}}
+    assert counts['sources'] == {'hpoa': 6, 'clinvar': 5}
+
+
+def test_distinct_counts(monkeypatch):
+    solr = fake_query(monkeypatch, FACETS)
+    counts = association_counts.get_association_counts('HP:0000007', 'phenotype', distinct_counts=True)
+    json_facet = json.loads(solr.params[0]['json.facet'])
+    assert set(json_facet) == {'subject', 'object'}
+    association_type = json_facet['object']['facet']['association_type']
+    assert association_type['facet']['distinct'] == 'unique(subject)'
+    assert association_type['facet']['taxon']['facet']['distinct'] == 'unique(subject)'
+    assert counts['gene'] == {'counts': 6, 'counts_by_taxon': {'NCBITaxon:9606': 6}}
+
+    solr = fake_query(monkeypatch, FACETS)
+    counts = association_counts.get_association_counts('NCBIGene:3630', 'gene', distinct_counts=True, approximate=True)
+    json_facet = json.loads(solr.params[0]['json.facet'])
+    assert json_facet['subject']['facet']['association_type']['facet']['distinct'] == 'hll(object)'
+    assert counts['phenotype'] == {'counts': 6, 'counts_by_taxon': {'NCBITaxon:9606': 6}}
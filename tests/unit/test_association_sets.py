@@ -0,0 +1,168 @@
+import threading
+
+import pytest
+from ontobio.assocmodel import AssociationSet
+
+from biolink import association_sets
+from biolink.association_sets import AssociationSetCache, CompactAssociationSet
+
+PARENTS = {'HP:2': ['HP:1'], 'HP:3': ['HP:1'], 'HP:4': ['HP:2'], 'HP:5': ['HP:3']}
+
+
+class FakeOntology(object):
+
+    def ancestors(self, term):
+        ancestors = set()
+        for parent in PARENTS.get(term, []):
+            ancestors |= {parent} | self.ancestors(parent)
+        return ancestors
+
+    def label(self, term):
+        return 'label of {}'.format(term)
+
+
+def association_set():
+    association_map = {}
+    for i in range(40):
+        gene = 'NCBIGene:{}'.format(i)
+        if i < 8:
+            association_map[gene] = ['HP:4']
+        elif i < 12:
+            association_map[gene] = ['HP:2', 'HP:5']
+        else:
+            association_map[gene] = ['HP:5'] if i % 3 else ['HP:3']
+    return AssociationSet(ontology=FakeOntology(), association_map=association_map,
+                          subject_label_map={'NCBIGene:0': 'gene0'})
+
+
+def by_term(results):
+    return sorted(results, key=lambda result: result['c'])
+
+
+@pytest.mark.parametrize('kwargs', [
+    {},
+    {'threshold': 1},
+    {'background': ['NCBIGene:{}'.format(i) for i in range(0, 40, 2)], 'threshold': 1},
+    {'hypotheses': ['HP:4', 'HP:1'], 'threshold': 1},
+])
+def test_enrichment_test(kwargs):
+    aset = association_set()
+    compact = CompactAssociationSet.from_association_set(aset)
+    subjects = ['NCBIGene:{}'.format(i) for i in range(6)] + ['NCBIGene:20', 'NCBIGene:999']
+    expected = aset.enrichment_test(subjects=subjects, labels=True, **kwargs)
+    results = compact.enrichment_test(subjects=subjects, labels=True, **kwargs)
+    assert len(results) > 0
+    assert [result['c'] for result in by_term(results)] == [result['c'] for result in by_term(expected)]
+    for result, expected_result in zip(by_term(results), by_term(expected)):
+        assert result['p'] == pytest.approx(expected_result['p'])
+        assert result['p_uncorrected'] == pytest.approx(expected_result['p_uncorrected'])
+        assert result['n'] == expected_result['n']
+
+
+def test_save_and_load(tmpdir):
+    compact = CompactAssociationSet.from_association_set(association_set(), meta={'ontology': 'hp'})
+    path = str(tmpdir.join('sets', 'hp.aset'))
+    compact.save(path)
+    loaded = CompactAssociationSet.load(path)
+    assert loaded.meta == {'ontology': 'hp'}
+    assert loaded.subject_labels[loaded.subject_index['NCBIGene:0']] == 'gene0'
+    assert loaded.inferred_types('NCBIGene:0') == {'HP:1', 'HP:2', 'HP:4'}
+    assert loaded.label('HP:4') == 'label of HP:4'
+    subjects = ['NCBIGene:{}'.format(i) for i in range(6)]
+    assert loaded.enrichment_test(subjects=subjects) == compact.enrichment_test(subjects=subjects)
+
+
+def test_cache(tmpdir):
+    builds = []
+
+    def build():
+        builds.append(1)
+        return CompactAssociationSet.from_association_set(association_set())
+
+    path = str(tmpdir.join('sets'))
+    cache = AssociationSetCache(path=path)
+    key = ('hp', 'gene', 'phenotype', 'NCBITaxon:9606')
+    aset = cache.get(key, 'r1', build)
+    assert cache.get(key, 'r1', build) is aset
+    assert len(builds) == 1
+    # a new release is built again
+    cache.get(key, 'r2', build)
+    assert len(builds) == 2
+
+    # other workers load the files
+    other = AssociationSetCache(path=path)
+    assert len(other.get(key, 'r1', build)) == 40
+    assert len(builds) == 2
+    stats = other.get_stats()
+    assert (stats['loads'], stats['builds']) == (1, 0)
+    assert stats['sets']['hp/gene/phenotype/NCBITaxon:9606']['release'] == 'r1'
+
+
+def test_build_locks_are_dropped(tmpdir, monkeypatch):
+    monkeypatch.setenv('BIOLINK_DATA_DIR', str(tmpdir))
+    cache = AssociationSetCache(path='sets')
+    assert cache.path == str(tmpdir.join('sets'))
+    started = threading.Event()
+    release = threading.Event()
+    builds = []
+
+    def build():
+        builds.append(1)
+        started.set()
+        release.wait(5)
+        return CompactAssociationSet.from_association_set(association_set())
+
+    key = ('hp', 'gene', 'phenotype', 'NCBITaxon:9606')
+    threads = [threading.Thread(target=cache.get, args=(key, 'r1', build)) for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(builds) == 1
+    assert cache.build_locks == {}
+    with pytest.raises(ValueError):
+        cache.get(key, 'r2', lambda: int('HP'))
+    assert cache.build_locks == {}
+
+
+def test_cache_budget():
+    aset = CompactAssociationSet.from_association_set(association_set())
+    cache = AssociationSetCache(max_bytes=aset.nbytes() * 2)
+    for taxon in ['NCBITaxon:9606', 'NCBITaxon:10090', 'NCBITaxon:7955']:
+        cache.get(('hp', 'gene', 'phenotype', taxon), 'r1', lambda: aset)
+    stats = cache.get_stats()
+    assert stats['evictions'] == 1
+    assert stats['nbytes'] <= stats['max_bytes']
+    assert sorted(stats['sets']) == ['hp/gene/phenotype/NCBITaxon:10090', 'hp/gene/phenotype/NCBITaxon:7955']
+
+
+def test_get_association_set(monkeypatch):
+    cache = AssociationSetCache()
+    monkeypatch.setattr(association_sets, 'association_set_cache', cache)
+    monkeypatch.setattr(association_sets, 'get_release', lambda: 'r1')
+    created = []
+    loaded = []
+
+    class FakeFactory(object):
+        def create(self, ontology=None, subject_category=None, object_category=None, taxon=None):
+            assert isinstance(ontology, FakeOntology)
+            created.append((subject_category, object_category, taxon))
+            return association_set()
+
+    def get_ontology(id):
+        loaded.append(id)
+        return FakeOntology()
+
+    import ontobio.assoc_factory
+    from biolink.ontology import ontology_manager
+    monkeypatch.setattr(ontobio.assoc_factory, 'AssociationSetFactory', FakeFactory)
+    monkeypatch.setattr(ontology_manager, 'get_ontology', get_ontology)
+    for _ in range(2):
+        aset = association_sets.get_association_set('hp', 'gene', 'phenotype', 'NCBITaxon:9606')
+    assert created == [('gene', 'phenotype', 'NCBITaxon:9606')]
+    # the ontology is only loaded to build the set
+    assert loaded == ['hp']
+    assert aset.meta['taxon'] == 'NCBITaxon:9606'
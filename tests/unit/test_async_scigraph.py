@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from biolink import concurrency
+from scigraph.scigraph_util import SciGraph
+from scigraph.model.BBOPGraph import BBOPGraph
+
+# child -> parents, HP:0000118 has 12 children
+SUBCLASS_OF = {'HP:00001{:02d}'.format(i): ['HP:0000118'] for i in range(12)}
+SUBCLASS_OF['HP:0000118'] = []
+
+
+class FakeSciGraph(SciGraph):
+    """
+    Serves neighbors from SUBCLASS_OF, recording the max number of
+    requests in flight
+    """
+
+    def __init__(self, sleep=time.sleep):
+        super(FakeSciGraph, self).__init__(url='http://scigraph.test/', max_concurrency=3)
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def neighbors(self, id=None, **params):
+        with self.lock:
+            self.requests.append(id)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        parents = SUBCLASS_OF[id]
+        return BBOPGraph({
+            'nodes': [{'id': x, 'lbl': x, 'meta': {}} for x in [id] + parents],
+            'edges': [{'sub': id, 'pred': 'subClassOf', 'obj': x, 'meta': {}} for x in parents]
+        })
+
+
+def set_mode(monkeypatch, mode):
+    monkeypatch.setattr(concurrency, 'get_concurrency_config',
+                        lambda: {'mode': mode, 'max_workers': 8, 'deadline': 10})
+
+
+def test_extract_subgraph_caps_requests_in_flight(monkeypatch):
+    set_mode(monkeypatch, concurrency.MODE_THREAD)
+    scigraph = FakeSciGraph()
+    graph = scigraph.extract_subgraph(sorted(SUBCLASS_OF))
+    assert len(graph.nodes) == 13
+    assert len(scigraph.requests) == 13
+    assert scigraph.max_in_flight == 3
+
+
+def test_cap_is_shared_by_concurrent_walks(monkeypatch):
+    set_mode(monkeypatch, concurrency.MODE_THREAD)
+    scigraph = FakeSciGraph()
+    seeds = sorted(SUBCLASS_OF)
+    walks = [threading.Thread(target=scigraph.extract_subgraph, args=(seeds[i::2],)) for i in range(2)]
+    for walk in walks:
+        walk.start()
+    for walk in walks:
+        walk.join()
+    assert len(scigraph.requests) > 13
+    assert scigraph.max_in_flight == 3
+
+
+def test_gevent_mode(monkeypatch):
+    gevent = pytest.importorskip('gevent')
+    set_mode(monkeypatch, concurrency.MODE_GEVENT)
+    scigraph = FakeSciGraph(sleep=gevent.sleep)
+    start = time.time()
+    nodes = scigraph.traverse_chain('HP:0000100', ['subClassOf'])
+    assert [node.id for node in nodes] == ['HP:0000118']
+    graph = scigraph.extract_subgraph(sorted(SUBCLASS_OF))
+    assert len(graph.nodes) == 13
+    assert scigraph.max_in_flight == 3
+    # 1 + 13 requests, 3 at a time rather than one after another
+    assert time.time() - start < 14 * 0.05
+
+    pending = scigraph.async_client.extract_subgraph(['HP:0000100'])
+    assert not pending.done()
+    assert len(pending.result(timeout=5).nodes) == 2
+
+
+def test_pending_calls(monkeypatch):
+    set_mode(monkeypatch, concurrency.MODE_THREAD)
+    client = FakeSciGraph().async_client
+    pending = [client.neighbors(id) for id in sorted(SUBCLASS_OF)]
+    graphs = [call.result(timeout=5) for call in pending]
+    assert [graph.edges[0].obj for graph in graphs[:12]] == ['HP:0000118'] * 12
+    assert client.scigraph.max_in_flight == 3
+    with pytest.raises(KeyError):
+        client.neighbors('HP:9999999').result(timeout=5)
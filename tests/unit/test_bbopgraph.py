@@ -0,0 +1,33 @@
+from scigraph.model.BBOPGraph import BBOPGraph
+
+GRAPH = {
+    'nodes': [
+        {'id': 'HP:0000001', 'lbl': 'All', 'meta': {'types': ['class']}},
+        {'id': 'HP:0000118', 'lbl': 'Phenotypic abnormality', 'meta': {'types': ['class']}}
+    ],
+    'edges': [
+        {'sub': 'HP:0000118', 'pred': 'subClassOf', 'obj': 'HP:0000001', 'meta': {}}
+    ]
+}
+
+
+def test_node_maps_are_per_graph():
+    g1 = BBOPGraph(GRAPH)
+    g2 = BBOPGraph()
+    assert g1.has_node('HP:0000001')
+    assert not g2.has_node('HP:0000001')
+
+
+def test_merge_is_deduplicated():
+    g = BBOPGraph(GRAPH)
+    g.merge(BBOPGraph(GRAPH))
+    assert len(g.nodes) == 2
+    assert len(g.edges) == 1
+
+
+def test_adjacency():
+    g = BBOPGraph(GRAPH)
+    assert g.get_parents('HP:0000118', ['subClassOf']) == ['HP:0000001']
+    assert g.get_children('HP:0000001') == ['HP:0000118']
+    assert [n.id for n in g.get_root_nodes(['subClassOf'])] == ['HP:0000001']
+    assert [n.id for n in g.get_leaf_nodes(None)] == ['HP:0000118']
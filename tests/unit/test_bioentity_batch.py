@@ -0,0 +1,31 @@
+from biolink.app import app
+
+
+class TestBioentityBatch():
+    """
+    Integration tests for the batch bioentity lookup
+    """
+
+    @classmethod
+    def setup_class(self):
+        app.testing = True
+        self.test_client = app.test_client()
+
+    @classmethod
+    def teardown_class(self):
+        self.test_client = None
+
+    def test_batch_keeps_input_order(self):
+        ids = ['NCBIGene:84570', 'HGNC:18603', 'NCBIGene:84570']
+        response = self.test_client.post('/api/bioentity/batch', json={'ids': ids})
+        assert response.status_code == 200
+        assert [result['id'] for result in response.json] == ids
+        assert {result['bio_object']['id'] for result in response.json} == {'HGNC:18603'}
+        assert response.json[0]['bio_object']['taxon']['label'] == 'Homo sapiens'
+
+    def test_batch_reports_errors_per_id(self):
+        response = self.test_client.post('/api/bioentity/batch', json={'ids': ['NOSUCH:0000', 'NCBIGene:84570']})
+        assert response.status_code == 200
+        assert response.json[0]['bio_object'] is None
+        assert response.json[0]['error']['code'] == 404
+        assert response.json[1]['bio_object']['id'] == 'HGNC:18603'
@@ -0,0 +1,228 @@
+import time
+
+import pytest
+from flask import Flask, Response, request
+
+from biolink import cache as cache_module
+from biolink.cache import MemoryCacheBackend, SqliteCacheBackend, ResponseCache, cache_response
+
+app = Flask(__name__)
+app.config['RESTPLUS_MASK_HEADER'] = 'X-Fields'
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmpdir):
+    if request.param == 'memory':
+        return MemoryCacheBackend(max_entries=3)
+    return SqliteCacheBackend(path=str(tmpdir.join('cache.sqlite')), max_entries=3, evict_every=1)
+
+
+def test_get_set(backend):
+    backend.set('NCBIGene:84570', {'associations': []}, 60)
+    expires, value = backend.get('NCBIGene:84570')
+    assert value == {'associations': []}
+
+
+def test_expired_entries_are_dropped(backend):
+    backend.set('NCBIGene:84570', {'associations': []}, -1)
+    assert backend.get('NCBIGene:84570') is None
+
+
+def test_lru_eviction(backend):
+    for i in range(3):
+        backend.set('key{}'.format(i), i, 60)
+    # touch key0 so that key1 is the least recently used
+    backend.get('key0')
+    backend.set('key3', 3, 60)
+    assert len(backend) == 3
+    assert backend.get('key1') is None
+    assert backend.get('key0') is not None
+
+
+def test_stale_entries():
+    cache = ResponseCache(MemoryCacheBackend(), ttl=-1, stale_ttl=60)
+    cache.set('GenericObject', 'NCBIGene:84570', {'data': {}, 'etag': 'x'})
+    fresh_until, value = cache.get('GenericObject', 'NCBIGene:84570')
+    assert fresh_until < time.time()
+    assert value['data'] == {}
+    stats = cache.get_stats()['routes']['GenericObject']
+    assert (stats['hits'], stats['stale'], stats['misses']) == (0, 1, 0)
+    # revalidated once at a time
+    assert cache.start_revalidation('NCBIGene:84570')
+    assert not cache.start_revalidation('NCBIGene:84570')
+    cache.end_revalidation('NCBIGene:84570')
+    assert cache.start_revalidation('NCBIGene:84570')
+
+
+@pytest.fixture
+def response_cache(monkeypatch):
+    cache = ResponseCache(MemoryCacheBackend())
+    monkeypatch.setattr(cache_module, 'response_cache', cache)
+    return cache
+
+
+def cached_method(get):
+    """
+    cache_response of the get method of a GenericObject resource
+    """
+    resource = type('GenericObject', (object,), {'get': get})()
+    return cache_response(resource.get)
+
+
+def test_no_store_responses_are_not_cached(response_cache):
+    calls = []
+
+    def get(self, id):
+        calls.append(id)
+        return {'id': id}, 200, {'Cache-Control': 'no-store'}
+
+    method = cached_method(get)
+    for _ in range(2):
+        with app.test_request_context('/bioentity/gene/NCBIGene:84570'):
+            data, status, headers = method('NCBIGene:84570')
+        assert headers == {'Cache-Control': 'no-store'}
+    assert len(calls) == 2
+    assert len(response_cache.backend) == 0
+
+
+def test_cached_responses(response_cache):
+    calls = []
+
+    def get(self, id):
+        calls.append(id)
+        return {'id': id}
+
+    method = cached_method(get)
+    with app.test_request_context('/bioentity/NCBIGene:84570?rows=10'):
+        data, status, headers = method('NCBIGene:84570')
+    assert (data, status, headers['X-Cache']) == ({'id': 'NCBIGene:84570'}, 200, 'MISS')
+    etag = headers['ETag']
+    assert headers['Cache-Control'] in ['public, max-age={}'.format(response_cache.ttl - i) for i in range(2)]
+
+    with app.test_request_context('/bioentity/NCBIGene:84570?rows=10'):
+        data, status, headers = method('NCBIGene:84570')
+    assert (data, status, headers['X-Cache'], headers['ETag']) == ({'id': 'NCBIGene:84570'}, 200, 'HIT', etag)
+    assert headers['Cache-Control'].startswith('public, max-age=')
+    # other query arguments are another entry
+    with app.test_request_context('/bioentity/NCBIGene:84570?rows=20'):
+        assert method('NCBIGene:84570')[2]['X-Cache'] == 'MISS'
+    assert len(calls) == 2
+
+
+def test_masked_responses(response_cache):
+    def get(self, id):
+        mask = request.headers.get('X-Fields')
+        return {'id': id} if mask == 'id' else {'id': id, 'label': 'TRPV6'}
+
+    method = cached_method(get)
+    with app.test_request_context('/bioentity/NCBIGene:3630', headers={'X-Fields': 'id'}):
+        data, status, headers = method('NCBIGene:3630')
+    assert (data, headers['X-Cache'], headers['Vary']) == ({'id': 'NCBIGene:3630'}, 'MISS', 'X-Fields')
+    # unmasked requests get their own entry
+    with app.test_request_context('/bioentity/NCBIGene:3630'):
+        data, status, headers = method('NCBIGene:3630')
+    assert (data, headers['X-Cache'], headers['Vary']) == ({'id': 'NCBIGene:3630', 'label': 'TRPV6'}, 'MISS', 'X-Fields')
+    with app.test_request_context('/bioentity/NCBIGene:3630', headers={'X-Fields': 'id'}):
+        data, status, headers = method('NCBIGene:3630')
+    assert (data, headers['X-Cache']) == ({'id': 'NCBIGene:3630'}, 'HIT')
+
+
+def test_not_modified(response_cache):
+    method = cached_method(lambda self, id: {'id': id})
+    with app.test_request_context('/bioentity/NCBIGene:84570'):
+        etag = method('NCBIGene:84570')[2]['ETag']
+    with app.test_request_context('/bioentity/NCBIGene:84570', headers={'If-None-Match': etag}):
+        response = method('NCBIGene:84570')
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+    with app.test_request_context('/bioentity/NCBIGene:84570', headers={'If-None-Match': '"other"'}):
+        assert method('NCBIGene:84570')[1] == 200
+
+
+def test_uncached_requests(response_cache):
+    calls = []
+
+    def get(self, id):
+        calls.append(id)
+        return {'id': id}
+
+    method = cached_method(get)
+    for _ in range(2):
+        with app.test_request_context('/bioentity/batch', method='POST'):
+            assert method('NCBIGene:84570') == {'id': 'NCBIGene:84570'}
+    assert len(calls) == 2
+    assert len(response_cache.backend) == 0
+
+
+def test_uncached_responses(response_cache):
+    def get(self, id):
+        if id == 'stream':
+            return Response('[]', mimetype='application/json')
+        if id == 'error':
+            return {'message': 'not found'}, 404
+        return {'ids': {id}}
+
+    method = cached_method(get)
+    for id in ['stream', 'error', 'set']:
+        with app.test_request_context('/bioentity/{}'.format(id)):
+            method(id)
+    assert len(response_cache.backend) == 0
+
+
+def wait_for_revalidation(cache, timeout=5):
+    deadline = time.time() + timeout
+    while cache.revalidating and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_stale_responses(response_cache, monkeypatch):
+    monkeypatch.setattr(cache_module.circuit_breaker, 'degraded', lambda: False)
+    response_cache.ttl = -1
+    response_cache.stale_ttl = 60
+    calls = []
+
+    def get(self, id):
+        calls.append(id)
+        return {'id': id, 'version': len(calls)}
+
+    method = cached_method(get)
+    with app.test_request_context('/bioentity/NCBIGene:84570'):
+        etag = method('NCBIGene:84570')[2]['ETag']
+    with app.test_request_context('/bioentity/NCBIGene:84570'):
+        data, status, headers = method('NCBIGene:84570')
+    # served right away, revalidated in the background
+    assert (data['version'], status, headers['X-Cache']) == (1, 200, 'STALE')
+    assert headers['Warning'] == '110 - "Response is Stale"'
+    wait_for_revalidation(response_cache)
+    assert len(calls) == 2
+
+    # the revalidated entry has another ETag
+    revalidated = next(iter(response_cache.backend.entries.values()))[1]
+    assert revalidated['data']['version'] == 2
+    assert '"{}"'.format(revalidated['etag']) != etag
+    with app.test_request_context('/bioentity/NCBIGene:84570',
+                                  headers={'If-None-Match': '"{}"'.format(revalidated['etag'])}):
+        response = method('NCBIGene:84570')
+    assert response.status_code == 304
+    assert response.headers['X-Cache'] == 'STALE'
+    wait_for_revalidation(response_cache)
+
+
+def test_no_revalidation_while_degraded(response_cache, monkeypatch):
+    monkeypatch.setattr(cache_module.circuit_breaker, 'degraded', lambda: True)
+    response_cache.ttl = -1
+    response_cache.stale_ttl = 60
+    calls = []
+
+    def get(self, id):
+        calls.append(id)
+        return {'id': id}
+
+    method = cached_method(get)
+    for _ in range(3):
+        with app.test_request_context('/bioentity/NCBIGene:84570'):
+            data, status, headers = method('NCBIGene:84570')
+    assert headers['X-Cache'] == 'STALE'
+    assert len(calls) == 1
+    assert not response_cache.revalidating
@@ -0,0 +1,103 @@
+import pytest
+
+from biolink.circuit_breaker import CircuitBreaker, solr_client_error, STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN
+from biolink.error_handlers import BackendUnavailableException
+
+
+def fail():
+    raise ConnectionError('golr.monarchinitiative.org')
+
+
+def test_breaker_opens_on_failure_rate():
+    breaker = CircuitBreaker('golr', window=10, min_calls=4, failure_rate=0.5)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    for i in range(3):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == STATE_OPEN
+    # fails fast without calling the backend
+    calls = []
+    with pytest.raises(BackendUnavailableException) as e:
+        breaker.call(lambda: calls.append(1))
+    assert calls == []
+    assert e.value.status_code == 503
+    assert breaker.get_status()['rejected'] == 1
+
+
+def test_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker('scigraph', min_calls=2, slow_call_duration=1, slow_call_rate=0.5)
+    breaker.record(0.1, False)
+    assert breaker.state == STATE_CLOSED
+    breaker.record(2, False)
+    assert breaker.state == STATE_OPEN
+
+
+def test_half_open_probes():
+    breaker = CircuitBreaker('golr', min_calls=1, open_duration=0, half_open_calls=2)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    # a failed probe opens it again
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == STATE_OPEN
+    assert breaker.get_status()['trips'] == 2
+
+    breaker.call(lambda: 'ok')
+    assert breaker.state == STATE_HALF_OPEN
+    breaker.call(lambda: 'ok')
+    assert breaker.state == STATE_CLOSED
+
+
+def test_half_open_limits_probes():
+    breaker = CircuitBreaker('golr', min_calls=1, open_duration=0, half_open_calls=1)
+    breaker.record(0, True)
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_failed_results_and_client_errors():
+    breaker = CircuitBreaker('scigraph', window=2, min_calls=2)
+    breaker.call(lambda: 404, is_failure=lambda status: status >= 500)
+    with pytest.raises(ValueError):
+        breaker.call(lambda: int('HGNC'), is_client_error=lambda e: isinstance(e, ValueError))
+    assert breaker.state == STATE_CLOSED
+    breaker.call(lambda: 502, is_failure=lambda status: status >= 500)
+    assert breaker.state == STATE_OPEN
+
+
+def test_solr_client_error():
+    assert solr_client_error(Exception('Solr responded with an error (HTTP 400): [Reason: undefined field]'))
+    assert not solr_client_error(Exception('Solr responded with an error (HTTP 503): [Reason: None]'))
+    assert not solr_client_error(Exception('Failed to connect to server at http://localhost:8983/solr/'))
+
+
+class Killed(BaseException):
+    """
+    Like GreenletExit, not an Exception
+    """
+
+
+def kill():
+    raise Killed()
+
+
+def test_interrupted_probes_are_failures():
+    breaker = CircuitBreaker('golr', min_calls=1, open_duration=0, half_open_calls=1)
+    breaker.record(0, True)
+    with pytest.raises(Killed):
+        breaker.call(kill)
+    assert breaker.state == STATE_OPEN
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == STATE_CLOSED
+
+
+def test_probes_time_out():
+    breaker = CircuitBreaker('golr', min_calls=1, open_duration=0, half_open_calls=1, probe_timeout=0)
+    breaker.record(0, True)
+    # a probe that never records, e.g. still hanging
+    assert breaker.allow()
+    assert not breaker.allow()
+    assert breaker.state == STATE_OPEN
+    assert breaker.get_status()['trips'] == 2
+    # probed again once open_duration is over
+    assert breaker.allow()
@@ -0,0 +1,76 @@
+from biolink.cache import MemoryCacheBackend, SqliteCacheBackend
+from biolink.clique_cache import CliqueLeaderCache, release_version
+
+LEADERS = {
+    'HGNC:11603': {'id': 'NCBIGene:6938', 'lbl': 'TCF12', 'meta': {}},
+    'NCBIGene:6938': {'id': 'NCBIGene:6938', 'lbl': 'TCF12', 'meta': {}}
+}
+
+
+class FakeSciGraph(object):
+
+    url_prefix = 'http://scigraph.test/scigraph/'
+
+    def __init__(self):
+        self.lookups = []
+        self.datasets = [{'id': 'monarch', 'meta': {'version': ['2019-01']}}]
+
+    def fetch_clique_leader_node(self, id):
+        self.lookups.append(id)
+        return LEADERS.get(id)
+
+    def get_datasets(self):
+        return self.datasets
+
+
+def test_leaders_and_misses_are_cached():
+    scigraph = FakeSciGraph()
+    cache = CliqueLeaderCache(scigraph, MemoryCacheBackend())
+    for i in range(3):
+        assert cache.get_node('HGNC:11603')['id'] == 'NCBIGene:6938'
+        assert cache.get_node('FOO:1') is None
+    assert scigraph.lookups == ['HGNC:11603', 'FOO:1']
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['negative_hits'], stats['misses']) == (2, 2, 2)
+
+
+def test_new_release_invalidates(tmpdir):
+    scigraph = FakeSciGraph()
+    backend = SqliteCacheBackend(path=str(tmpdir.join('cliques.sqlite')))
+    cache = CliqueLeaderCache(scigraph, backend, version_check=0)
+    cache.get_node('HGNC:11603')
+    cache.get_node('HGNC:11603')
+    scigraph.datasets = [{'id': 'monarch', 'meta': {'version': ['2019-02']}}]
+    cache.get_node('HGNC:11603')
+    assert scigraph.lookups == ['HGNC:11603', 'HGNC:11603']
+
+
+def test_pinned_version_does_not_query_scigraph():
+    scigraph = FakeSciGraph()
+    scigraph.get_datasets = None
+    cache = CliqueLeaderCache(scigraph, MemoryCacheBackend(), version='201902')
+    assert cache.make_key('HGNC:11603').endswith(':201902:HGNC:11603')
+
+
+def test_negative_ttl():
+    cache = CliqueLeaderCache(FakeSciGraph(), MemoryCacheBackend(), negative_ttl=-1)
+    cache.get_node('FOO:1')
+    cache.get_node('FOO:1')
+    assert cache.get_stats()['misses'] == 2
+
+
+def test_warm():
+    scigraph = FakeSciGraph()
+    cache = CliqueLeaderCache(scigraph, MemoryCacheBackend())
+    cache.get_node('HGNC:11603')
+    assert cache.warm(['HGNC:11603', 'NCBIGene:6938', 'FOO:1', 'FOO:1']) == 2
+    assert sorted(scigraph.lookups) == ['FOO:1', 'HGNC:11603', 'NCBIGene:6938']
+    cache.get_node('FOO:1')
+    assert cache.get_stats()['negative_hits'] == 1
+
+
+def test_release_version_ignores_dataset_order():
+    a = {'id': 'a', 'meta': {'version': ['1']}}
+    b = {'id': 'b', 'meta': {'version': ['2']}}
+    assert release_version([a, b]) == release_version([b, a])
+    assert release_version([a]) != release_version([b])
@@ -0,0 +1,41 @@
+import json
+
+from biolink.api.bio import closure_bins
+
+
+def test_closure_bin_params():
+    assert closure_bins.closure_bin_params(False) == {}
+    params = closure_bins.closure_bin_params(True)
+    assert params['facet_field_limits'] == {'object_closure': 0}
+    facets = params['json_facet']
+    assert len(facets) == len(closure_bins.get_closure_map())
+    assert facets['bin0'] == {'type': 'query', 'q': 'object_closure:"UBERON:0001434PHENOTYPE"'}
+    json.dumps(facets)
+
+
+def test_add_closure_bins():
+    bin_map = closure_bins.get_closure_map()
+    curies = list(bin_map)
+    results = {
+        'facet_counts': {'subject_taxon': {'NCBITaxon:9606': 12}, 'object_closure': {}},
+        'facets': {
+            'count': 12,
+            'bin0': {'count': 5},
+            'bin{}'.format(curies.index('HP:0001608')): {'count': 2},
+        },
+    }
+    closure_bins.add_closure_bins(results)
+    assert 'facets' not in results
+    fcs = results['facet_counts']
+    assert fcs['subject_taxon'] == {'NCBITaxon:9606': 12}
+    assert fcs['closure_bin']['Skeletal system'] == 5
+    assert fcs['closure_bin']['Voice'] == 2
+    assert fcs['closure_bin']['Eye'] == 0
+    assert fcs['object_closure']['UBERON:0001434PHENOTYPE'] == 5
+    assert set(fcs['object_closure']) == set(curies)
+
+
+def test_no_facets():
+    results = {'facet_counts': {}, 'numFound': 0}
+    closure_bins.add_closure_bins(results)
+    assert results == {'facet_counts': {}, 'numFound': 0}
@@ -0,0 +1,104 @@
+import networkx as nx
+import pytest
+from ontobio.ontol import Ontology
+
+from biolink.ontology import ontology_manager
+from biolink.ontology.closure_index import ClosureIndex
+from biolink.ontology.snapshot import OntologySnapshot, build_snapshot, closure_key
+
+SUBCLASS_OF = 'subClassOf'
+PART_OF = 'BFO:0000050'
+RELATIONS = [SUBCLASS_OF, PART_OF]
+
+
+@pytest.fixture(scope='module')
+def ontology():
+    """
+    cellular_component
+     <- organelle <- nucleus <-part_of- nucleolus
+     <- membrane <- nuclear envelope -part_of-> nucleus
+    """
+    graph = nx.MultiDiGraph()
+    for id, label in [('GO:0005575', 'cellular_component'), ('GO:0043226', 'organelle'),
+                      ('GO:0005634', 'nucleus'), ('GO:0005730', 'nucleolus'),
+                      ('GO:0016020', 'membrane'), ('GO:0005635', 'nuclear envelope')]:
+        graph.add_node(id, label=label)
+    graph.add_edge('GO:0005575', 'GO:0043226', pred=SUBCLASS_OF)
+    graph.add_edge('GO:0043226', 'GO:0005634', pred=SUBCLASS_OF)
+    graph.add_edge('GO:0005634', 'GO:0005730', pred=PART_OF)
+    graph.add_edge('GO:0005575', 'GO:0016020', pred=SUBCLASS_OF)
+    graph.add_edge('GO:0016020', 'GO:0005635', pred=SUBCLASS_OF)
+    graph.add_edge('GO:0005634', 'GO:0005635', pred=PART_OF)
+    return Ontology(handle='go', id='go', graph=graph)
+
+
+@pytest.fixture(scope='module', params=['ontology', 'snapshot'])
+def index(request, ontology, tmpdir_factory):
+    if request.param == 'ontology':
+        return ClosureIndex.from_ontology(ontology, RELATIONS)
+    path = str(tmpdir_factory.mktemp('snapshots').join('go.snapshot'))
+    build_snapshot(ontology, path, closures=[RELATIONS])
+    return ClosureIndex.from_snapshot(OntologySnapshot(path), RELATIONS)
+
+
+def test_ancestors_and_descendants(index, ontology):
+    for id in ontology.nodes():
+        assert set(index.ancestors(id)) == set(ontology.ancestors(id, relations=RELATIONS))
+        assert set(index.descendants(id)) == set(ontology.descendants(id, relations=RELATIONS))
+    assert 'GO:0005730' in index.ancestors('GO:0005730', reflexive=True)
+
+
+def test_traverse_matches_ontobio(index, ontology):
+    for up, down in [(True, False), (False, True), (True, True)]:
+        assert index.traverse(['GO:0005634'], up=up, down=down) == \
+            ontology.traverse_nodes(['GO:0005634'], up=up, down=down, relations=RELATIONS)
+
+
+def test_shared_ancestors(index):
+    assert index.shared_ancestors('GO:0005730', 'GO:0005635') == ['GO:0005575', 'GO:0005634', 'GO:0043226']
+    assert index.shared_ancestors('GO:0005730', 'GO:0005634') == ['GO:0005575', 'GO:0005634', 'GO:0043226']
+    assert index.shared_ancestors('GO:0005730', 'GO:0005634', reflexive=False) == ['GO:0005575', 'GO:0043226']
+    assert index.shared_ancestors('GO:0005730', 'GO:9999999') == []
+
+
+def test_mica(index):
+    assert index.mica('GO:0005730', 'GO:0005635') == 'GO:0005634'
+    assert index.mica('GO:0043226', 'GO:0016020') == 'GO:0005575'
+    assert index.information_content('GO:0005575') == 0.0
+    assert index.information_content('GO:0005730') > index.information_content('GO:0005634')
+    assert index.label('GO:0005634') == 'nucleus'
+
+
+def test_other_relation_sets_are_not_indexed(ontology, monkeypatch):
+    monkeypatch.setattr(ontology_manager, 'omap', {'go': ontology})
+    monkeypatch.setattr(ontology_manager, 'closure_indexes', {})
+    monkeypatch.setattr(ontology_manager, 'get_snapshot', lambda id: None)
+    monkeypatch.setattr(ontology_manager, 'get_snapshot_config', lambda: {'closures': [RELATIONS]})
+    configured = ontology_manager.get_closure_index('go', RELATIONS)
+    assert ontology_manager.get_closure_index('go', list(reversed(RELATIONS))) is configured
+    assert ontology_manager.get_closure_index('go', [PART_OF]) is None
+    for relations in [RELATIONS, [PART_OF], [SUBCLASS_OF]]:
+        assert ontology_manager.traverse_nodes('go', ['GO:0005730'], relations) == \
+            ontology.traverse_nodes(['GO:0005730'], relations=relations)
+    assert list(ontology_manager.closure_indexes) == [('go', closure_key(RELATIONS))]
+
+
+def test_shared_ancestor_route_order(index, monkeypatch):
+    from biolink.api.ontol.endpoints import ontology_endpoint
+    closures = {
+        'GO:0005730': ['GO:0005730', 'GO:0043226', 'GO:0005634', 'GO:0005575'],
+        'GO:0005635': ['GO:0005635', 'GO:0016020', 'GO:0005575', 'GO:0005634', 'GO:0043226'],
+    }
+
+    def run_solr_on(solr, doc, id, fields):
+        return {'isa_partof_closure': closures[id],
+                'isa_partof_closure_label': [index.label(c) for c in closures[id]]}
+
+    monkeypatch.setattr(ontology_endpoint, 'run_solr_on', run_solr_on)
+    resource = ontology_endpoint.OntologyTermsSharedAncestor()
+    responses = []
+    for local in [None, index]:
+        monkeypatch.setattr(ontology_endpoint, 'get_closure_index', lambda *args, **kwargs: local)
+        responses.append(resource.get('GO:0005730', 'GO:0005635'))
+    assert responses[0] == responses[1]
+    assert responses[0]['goids'] == ['GO:0005575', 'GO:0005634', 'GO:0043226']
@@ -0,0 +1,31 @@
+import time
+
+from biolink.concurrency import fan_out, DeadlineExceeded
+
+
+def fail():
+    raise ValueError('backend error')
+
+
+def test_fan_out_keeps_order():
+    results = fan_out([lambda: time.sleep(0.2) or 'a', lambda: 'b'])
+    assert results == [('a', None), ('b', None)]
+
+
+def test_fan_out_partial_failure():
+    results = fan_out([lambda: 'a', fail])
+    assert results[0] == ('a', None)
+    assert results[1][0] is None
+    assert isinstance(results[1][1], ValueError)
+
+
+def test_fan_out_runs_concurrently():
+    start = time.time()
+    fan_out([lambda: time.sleep(0.5)] * 4, max_workers=4)
+    assert time.time() - start < 1.5
+
+
+def test_fan_out_deadline():
+    results = fan_out([lambda: 'a', lambda: time.sleep(3)], timeout=0.5)
+    assert results[0] == ('a', None)
+    assert isinstance(results[1][1], DeadlineExceeded)
@@ -0,0 +1,78 @@
+import threading
+
+from biolink import count_store
+from biolink.api.bio import association_counts
+from biolink.count_store import AssociationCountStore
+
+COUNTS = {'phenotype': {'counts': 12}, 'sources': {'hpoa': 12}}
+
+
+def test_counts_by_release(tmpdir):
+    store = AssociationCountStore(path=str(tmpdir.join('counts.sqlite')))
+    store.put('r1', 'HGNC:4851', 'gene', False, COUNTS)
+    assert store.get('r1', 'HGNC:4851', 'gene') == COUNTS
+    assert store.get('r1', 'HGNC:4851', 'gene', distinct_counts=True) is None
+    assert store.get('r2', 'HGNC:4851', 'gene') is None
+    stats = store.get_stats()
+    assert (stats['hits'], stats['misses']) == (1, 2)
+    assert stats['releases']['r1']['entries'] == 1
+
+    store.put('r2', 'HGNC:4851', 'gene', False, COUNTS)
+    assert store.prune('r2') == 1
+    assert AssociationCountStore(path=store.path).lookup('r2', 'HGNC:4851', 'gene') == COUNTS
+
+
+def test_most_requested(tmpdir):
+    path = str(tmpdir.join('counts.sqlite'))
+    store = AssociationCountStore(path=path, flush_requests=2)
+    for id, type in [('MONDO:0007739', 'disease'), ('HGNC:4851', 'gene'), ('HGNC:4851', 'gene')]:
+        store.get('r1', id, type)
+    # requests of the other workers add up
+    other = AssociationCountStore(path=path)
+    other.get('r1', 'HP:0000007', 'phenotype')
+    assert store.most_requested() == [('HGNC:4851', 'gene'), ('MONDO:0007739', 'disease')]
+    assert other.most_requested(2) == [('HGNC:4851', 'gene'), ('HP:0000007', 'phenotype')]
+
+
+def test_get_association_counts(tmpdir, monkeypatch):
+    store = AssociationCountStore(path=str(tmpdir.join('counts.sqlite')))
+    computed = []
+
+    def compute_counts(id, type, distinct_counts=False, approximate=False):
+        computed.append((id, distinct_counts, approximate))
+        return COUNTS
+
+    releases = ['r1']
+    monkeypatch.setattr(count_store, 'get_count_store', lambda: store)
+    monkeypatch.setattr(count_store, 'get_release', lambda scigraph: releases[0])
+    monkeypatch.setattr(association_counts, 'get_association_counts', compute_counts)
+
+    for i in range(2):
+        assert count_store.get_association_counts(None, 'HGNC:4851', 'gene') == COUNTS
+    assert computed == [('HGNC:4851', False, False)]
+
+    # approximate counts are not stored, exact ones are used for them
+    count_store.get_association_counts(None, 'HGNC:4851', 'gene', distinct_counts=True, approximate=True)
+    count_store.get_association_counts(None, 'HGNC:4851', 'gene', distinct_counts=True)
+    count_store.get_association_counts(None, 'HGNC:4851', 'gene', distinct_counts=True, approximate=True)
+    assert computed[1:] == [('HGNC:4851', True, True), ('HGNC:4851', True, False)]
+
+    releases[0] = count_store.UNKNOWN_RELEASE
+    count_store.get_association_counts(None, 'HGNC:4851', 'gene')
+    count_store.get_association_counts(None, 'HGNC:4851', 'gene')
+    assert len(computed) == 5
+
+
+def test_get_count_store(tmpdir, monkeypatch):
+    monkeypatch.setenv('BIOLINK_DATA_DIR', str(tmpdir))
+    monkeypatch.setattr(count_store, 'count_store', None)
+    monkeypatch.setattr(count_store, 'get_count_store_config', lambda: {'enabled': True})
+    stores = []
+    threads = [threading.Thread(target=lambda: stores.append(count_store.get_count_store())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # one store per worker, in the data directory
+    assert len(set(map(id, stores))) == 1
+    assert stores[0].path == str(tmpdir.join('association-counts.sqlite'))
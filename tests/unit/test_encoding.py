@@ -0,0 +1,105 @@
+import functools
+import json
+from collections import OrderedDict
+
+import pytest
+from flask import Flask
+
+from biolink import encoding
+
+ASSOCIATION = OrderedDict([
+    ('id', 'e9f8d1d2-5d1c-4e29-a3a4-02cba6a5a0d9'),
+    ('subject', {'id': 'NCBIGene:84570', 'label': 'COL25A1', 'taxon': {'id': 'NCBITaxon:9606', 'label': 'Homo sapiens'}}),
+    ('object', {'id': 'HP:0000007', 'label': 'Autosomal recessive inheritance — AR'}),
+    ('negated', False),
+    ('frequency', None),
+    ('score', 0.25),
+    ('publications', [{'id': 'PMID:25589040'}]),
+])
+
+
+def test_orjson_values_match_json():
+    pytest.importorskip('orjson')
+    data = {'associations': [ASSOCIATION] * 3, 'numFound': 3, 'facet_counts': {1: 2}}
+    body = encoding.encode_orjson(data)
+    assert body.endswith(b'\n')
+    assert json.loads(body.decode('utf-8')) == json.loads(encoding.encode_json(data).decode('utf-8'))
+
+
+def test_orjson_falls_back_to_json():
+    pytest.importorskip('orjson')
+    data = {'id': 2 ** 70}
+    assert encoding.encode_orjson(data) == encoding.encode_json(data)
+
+
+def test_stdlib_output_is_unchanged():
+    assert encoding.get_json_encoder(encoding.JSON_STDLIB)(ASSOCIATION) == \
+        (json.dumps(ASSOCIATION) + "\n").encode('utf-8')
+
+
+@pytest.mark.parametrize('mediatype,loads', [
+    (encoding.MSGPACK, lambda body: pytest.importorskip('msgpack').unpackb(body, raw=False)),
+    (encoding.CBOR, lambda body: pytest.importorskip('cbor2').loads(body)),
+])
+def test_binary_representations(mediatype, loads):
+    encoders = dict(encoding.get_encoders())
+    if mediatype not in encoders:
+        pytest.skip('{} encoder not installed'.format(mediatype))
+    output = encoding.representation(mediatype, encoders[mediatype])
+    with Flask(__name__).test_request_context('/'):
+        response = output({'associations': [ASSOCIATION]}, 200, {'X-Cache': 'MISS'})
+    assert response.status_code == 200
+    assert response.headers['X-Cache'] == 'MISS'
+    assert 'Accept' in response.vary
+    assert loads(response.get_data()) == {'associations': [json.loads(json.dumps(ASSOCIATION))]}
+
+
+def test_debug_json_is_indented():
+    app = Flask(__name__)
+    app.debug = True
+    output = encoding.representation(encoding.JSON, encoding.get_json_encoder())
+    with app.test_request_context('/'):
+        response = output({'id': 'HP:0000007'}, 200)
+    assert response.get_data() == (json.dumps({'id': 'HP:0000007'}, indent=4) + "\n").encode('utf-8')
+
+
+def test_default_json_is_the_flask_restplus_output(monkeypatch):
+    from flask_restplus.representations import output_json
+    monkeypatch.setattr(encoding, 'get_encoding_config', lambda: {})
+    encode = dict(encoding.get_encoders())[encoding.JSON]
+    output = encoding.representation(encoding.JSON, encode)
+    data = {'associations': [ASSOCIATION], 'numFound': 1}
+    with Flask(__name__).test_request_context('/'):
+        assert output(data, 200).get_data() == output_json(data, 200).get_data()
+
+
+def test_large_responses_are_streamed(monkeypatch):
+    from flask_restplus import marshal
+    from flask_restplus.representations import output_json
+    from biolink.datamodel.serializers import association_results
+    from biolink.marshalling import marshal_with
+    monkeypatch.setattr(encoding, 'get_encoding_config', lambda: {'stream_rows': 3})
+    representations = dict(encoding.get_encoders())
+    stream = functools.partial(encoding.stream_json, representations)
+    app = Flask(__name__)
+    app.config['RESTPLUS_MASK_HEADER'] = 'X-Fields'
+    for rows in [2, 3]:
+        data = {'numFound': rows, 'associations': [ASSOCIATION] * rows}
+        decorated = marshal_with(association_results, stream=stream)(lambda: (data, 200, {'X-Cache': 'MISS'}))
+        with app.test_request_context('/'):
+            response = decorated()
+            if rows < 3:
+                # marshalled, then written by the representation
+                assert response[0] == marshal(data, association_results)
+                continue
+            assert response.is_streamed
+            body = response.get_data()
+        assert response.headers['X-Cache'] == 'MISS'
+        assert 'Accept' in response.vary
+        with app.test_request_context('/'):
+            assert body == output_json(marshal(data, association_results), 200).get_data()
+        # masked and binary responses are marshalled
+        for headers in [{'X-Fields': 'numFound'}, {'Accept': encoding.MSGPACK}]:
+            if headers.get('Accept', encoding.JSON) in representations:
+                with app.test_request_context('/', headers=headers):
+                    assert isinstance(decorated(), tuple)
@@ -0,0 +1,77 @@
+import gzip
+import json
+
+from ontobio.golr.golr_query import GolrAssociationQuery
+
+from biolink.export import iterate_docs, stream_compact_associations, ndjson_lines, tsv_lines, gzip_chunks
+
+
+class PagedResults(object):
+
+    def __init__(self, docs, next_cursor):
+        self.docs = docs
+        self.raw_response = {'nextCursorMark': next_cursor}
+
+
+class PagedSolr(object):
+    """
+    Serves a fixed list of documents page by page, following cursor marks
+    """
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.requests = []
+
+    def search(self, cursorMark=None, rows=None, **params):
+        self.requests.append(dict(params, cursorMark=cursorMark, rows=rows))
+        start = 0 if cursorMark == '*' else int(cursorMark)
+        end = min(start + rows, len(self.docs))
+        return PagedResults(self.docs[start:end], str(end) if end > start else cursorMark)
+
+
+def make_docs():
+    docs = []
+    for subject in ['NCBIGene:1', 'NCBIGene:2', 'NCBIGene:3']:
+        for n in range(3):
+            docs.append({
+                'id': '{}-{}'.format(subject, n),
+                'subject': subject,
+                'subject_label': subject.lower(),
+                'relation': 'RO:0002200',
+                'object': 'HP:000000{}'.format(n)
+            })
+    return docs
+
+
+def test_iterate_docs_follows_cursor():
+    solr = PagedSolr(make_docs())
+    query = GolrAssociationQuery(subject_category='gene', object_category='phenotype', solr=solr)
+    docs = list(iterate_docs(query, page_size=4, sort='subject'))
+    assert len(docs) == 9
+    assert [r['cursorMark'] for r in solr.requests] == ['*', '4', '8', '9']
+    assert solr.requests[0]['sort'] == 'subject asc, id asc'
+    assert 'start' not in solr.requests[0]
+
+
+def test_stream_compact_associations_groups_across_pages():
+    solr = PagedSolr(make_docs())
+    associations = list(stream_compact_associations('gene', 'phenotype', None, page_size=2, solr=solr))
+    assert [a['subject'] for a in associations] == ['NCBIGene:1', 'NCBIGene:2', 'NCBIGene:3']
+    for association in associations:
+        assert sorted(association['objects']) == ['HP:0000000', 'HP:0000001', 'HP:0000002']
+
+
+def test_ndjson_and_tsv_lines():
+    associations = [{'subject': 'NCBIGene:1', 'subject_label': None, 'relation': 'RO:0002200', 'objects': ['HP:1', 'HP:2']}]
+    lines = list(ndjson_lines(associations))
+    assert json.loads(lines[0]) == associations[0]
+    rows = list(tsv_lines(associations))
+    assert rows[0] == 'subject\tsubject_label\trelation\tobject\n'
+    assert rows[1:] == ['NCBIGene:1\t\tRO:0002200\tHP:1\n', 'NCBIGene:1\t\tRO:0002200\tHP:2\n']
+
+
+def test_gzip_chunks_round_trip():
+    lines = ['row {}\n'.format(i) for i in range(10000)]
+    chunks = list(gzip_chunks(iter(lines), flush_size=1024))
+    assert len(chunks) > 1
+    assert gzip.decompress(b''.join(chunks)).decode('utf-8') == ''.join(lines)
@@ -0,0 +1,93 @@
+from biolink.identifier_converter import SciGraphIdentifierConverter, MyGeneInfoIdentifierConverter
+from biolink.xref_store import XrefStore
+
+PROTEINS = {
+    'HGNC:11603': ['UniProtKB:Q99081'],
+    'NCBIGene:6938': ['UniProtKB:Q99081'],
+    'NCBIGene:84570': []
+}
+
+
+class FakeSciGraph(object):
+
+    def __init__(self):
+        self.lookups = []
+
+    def gene_to_uniprot_proteins(self, id):
+        self.lookups.append(id)
+        if id not in PROTEINS:
+            raise ValueError(id)
+        return PROTEINS[id]
+
+    def uniprot_protein_to_genes(self, id):
+        return [gene for gene, proteins in sorted(PROTEINS.items()) if id in proteins]
+
+
+class FakeMyGene(object):
+    """
+    Answers querymany like MyGeneInfo, recording each call
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def querymany(self, queries, scopes=None, fields=None, **kwargs):
+        self.calls.append((list(queries), scopes))
+        hits = []
+        for query in queries:
+            if scopes == 'entrezgene' and query == '6938':
+                hits.append({'query': query, 'uniprot': {'Swiss-Prot': 'Q99081', 'TrEMBL': ['H0YKE6']}})
+            elif scopes == 'HGNC' and query == '11603':
+                hits.append({'query': query, 'uniprot': {'TrEMBL': ['H0YKE6', 'H3BN93']}})
+            elif scopes == 'uniprot' and query == 'Q99081':
+                hits.append({'query': query, 'HGNC': '11603'})
+                hits.append({'query': query, 'HGNC': '99999'})
+            else:
+                hits.append({'query': query, 'notfound': True})
+        return hits
+
+
+def test_scigraph_batch_conversion():
+    converter = SciGraphIdentifierConverter()
+    converter.xref_store = None
+    converter.scigraph = FakeSciGraph()
+    proteins = converter.convert_genes_to_proteins(['NCBIGene:6938', 'HGNC:11603', 'NCBIGene:6938', 'FOO:1'])
+    assert list(proteins.items()) == [
+        ('NCBIGene:6938', ['UniProtKB:Q99081']),
+        ('HGNC:11603', ['UniProtKB:Q99081']),
+        # failed lookups map to no protein
+        ('FOO:1', [])
+    ]
+    genes = converter.convert_proteins_to_genes(['UniProtKB:Q99081'])
+    assert genes == {'UniProtKB:Q99081': ['HGNC:11603', 'NCBIGene:6938']}
+
+
+def test_mygene_batch_conversion():
+    converter = MyGeneInfoIdentifierConverter()
+    converter.xref_store = None
+    converter.mygene_client = FakeMyGene()
+    proteins = converter.convert_genes_to_proteins(['NCBIGene:6938', 'HGNC:11603', 'NCBIGene:84570'])
+    assert proteins == {
+        'NCBIGene:6938': ['UniProtKB:Q99081'],
+        'HGNC:11603': ['UniProtKB:H0YKE6', 'UniProtKB:H3BN93'],
+        'NCBIGene:84570': []
+    }
+    # one request per scope
+    assert sorted(converter.mygene_client.calls) == [(['11603'], 'HGNC'), (['6938', '84570'], 'entrezgene')]
+
+    genes = converter.convert_proteins_to_genes(['UniProtKB:Q99081', 'UniProtKB:P00000'])
+    assert genes == {'UniProtKB:Q99081': ['HGNC:11603'], 'UniProtKB:P00000': []}
+
+
+def test_conversions_are_stored(tmpdir):
+    converter = SciGraphIdentifierConverter()
+    converter.xref_store = XrefStore(path=str(tmpdir.join('xrefs.sqlite')))
+    converter.scigraph = FakeSciGraph()
+    converter.convert_genes_to_proteins(['NCBIGene:6938', 'FOO:1'])
+    assert converter.convert_gene_to_protein('NCBIGene:6938') == ['UniProtKB:Q99081']
+    # failed lookups are not stored
+    converter.convert_genes_to_proteins(['NCBIGene:6938', 'FOO:1', 'NCBIGene:84570'])
+    assert converter.scigraph.lookups == ['NCBIGene:6938', 'FOO:1', 'FOO:1', 'NCBIGene:84570']
+    stats = converter.xref_store.get_stats()['gene_to_protein']
+    assert (stats['hits'], stats['misses']) == (2, 4)
+    assert stats['sources']['scigraph']['entries'] == 2
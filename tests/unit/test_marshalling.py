@@ -0,0 +1,100 @@
+import json
+
+from flask import Flask
+from flask_restplus import fields, marshal as restplus_marshal
+
+from biolink.datamodel.serializers import association_results, bio_object, disease_object, association
+from biolink import marshalling
+
+
+class Taxon(object):
+
+    def __init__(self, id, label=None):
+        self.id = id
+        self.label = label
+
+
+def make_association(i):
+    return {
+        'id': 'association-{}'.format(i),
+        'type': None,
+        'subject': {
+            'id': 'NCBIGene:84570',
+            'label': 'COL25A1',
+            'category': ('gene',),
+            'taxon': Taxon('NCBITaxon:9606', 'Homo sapiens'),
+        },
+        'object': {'id': 'HP:{:07d}'.format(i), 'iri': None, 'category': {'phenotype'}, 'taxon': None},
+        'relation': {'id': 'RO:0002200', 'label': 'has phenotype', 'category': None},
+        'negated': i % 2 == 0,
+        'evidence_graph': {'nodes': [{'id': 'HP:0000007', 'lbl': None}], 'edges': []},
+        'evidence_types': [{'id': 'ECO:0000304', 'label': 'author statement'}, None],
+        'provided_by': ['hpoa', 1, None],
+        'publications': None,
+        'qualifiers': [],
+        'slim': ['HP:0000118'],
+        'frequency': {'id': 'HP:0040283'},
+        'object_extensions': [{'filler': {'id': 'UBERON:0002107'}, 'relation_chain': [{'id': 'BFO:0000050'}]}],
+    }
+
+
+RESULTS = {
+    'numFound': 3,
+    'docs': [{'id': 'doc'}],
+    'facet_counts': {'object_closure': {'HP:0000118': 3}},
+    'associations': [make_association(i) for i in range(3)],
+    'compact_associations': None,
+    'objects': ['HP:0000001', 'HP:0000002'],
+}
+
+
+def test_same_output_as_restplus():
+    assert marshalling.marshal(RESULTS, association_results) == restplus_marshal(RESULTS, association_results)
+    assert marshalling.marshal(RESULTS['associations'], association) == \
+        restplus_marshal(RESULTS['associations'], association)
+    assert marshalling.marshal({}, association_results) == restplus_marshal({}, association_results)
+
+
+def test_objects_and_envelope():
+    entity = Taxon('MONDO:0007947', 'Marfan syndrome')
+    entity.taxon = None
+    entity.xrefs = {'OMIM:154700'}
+    for model in [bio_object, disease_object]:
+        assert marshalling.marshal(entity, model, envelope='data') == \
+            restplus_marshal(entity, model, envelope='data')
+
+
+def test_skip_none_and_defaults():
+    model = {
+        'id': fields.String(default=0),
+        'label': fields.String(default='unknown'),
+        'score': fields.Float(default=0.5),
+        'counts': fields.Raw(attribute=lambda obj: obj.get('n')),
+        'taxon': fields.Nested({'id': fields.String}, allow_null=True),
+        'synonyms': fields.List(fields.String, default=[]),
+        'meta': {'source': fields.String(attribute='provided_by.name')},
+    }
+    for data in [{}, {'id': 1, 'n': 2, 'synonyms': ('a', None), 'provided_by': {'name': 'hpoa'}}]:
+        for skip_none in [False, True]:
+            assert marshalling.marshal(data, model, skip_none=skip_none) == \
+                restplus_marshal(data, model, skip_none=skip_none)
+
+
+def test_masks():
+    app = Flask(__name__)
+    app.config['RESTPLUS_MASK_HEADER'] = 'X-Fields'
+    decorated = marshalling.marshal_with(association_results)(lambda: (RESULTS, 200, {}))
+    mask = 'numFound,associations{id,subject{id,taxon},evidence_types}'
+    with app.test_request_context('/', headers={'X-Fields': mask}):
+        data, code, headers = decorated()
+    assert data == restplus_marshal(RESULTS, association_results, mask=mask)
+    assert list(data) == ['numFound', 'associations']
+
+
+def test_iter_json():
+    chunks = list(marshalling.iter_json(RESULTS, association_results))
+    assert ''.join(chunks) == json.dumps(restplus_marshal(RESULTS, association_results))
+    # associations are encoded one at a time, and can be generated
+    assert len(chunks) > len(RESULTS['associations'])
+    generated = dict(RESULTS, associations=(a for a in RESULTS['associations']))
+    assert ''.join(marshalling.iter_json(generated, association_results)) == ''.join(chunks)
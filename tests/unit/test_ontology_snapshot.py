@@ -0,0 +1,134 @@
+import networkx as nx
+import pytest
+from ontobio.io.ontol_renderers import OboJsonGraphRenderer
+from ontobio.ontol import Ontology
+
+from biolink.ontology import ontology_manager
+from biolink.ontology.snapshot import OntologySnapshot, build_snapshot, compute_closures, read_header
+
+SUBCLASS_OF = 'subClassOf'
+PART_OF = 'BFO:0000050'
+
+
+@pytest.fixture
+def ontology():
+    """
+    A small slice of GO:
+
+    nucleus -subClassOf-> organelle -subClassOf-> cellular_component
+    nucleolus -part_of-> nucleus
+    """
+    graph = nx.MultiDiGraph()
+    graph.add_node('GO:0005575', label='cellular_component')
+    graph.add_node('GO:0043226', label='organelle')
+    graph.add_node('GO:0005634', label='nucleus', meta={'definition': {'val': 'A membrane-bounded organelle'}})
+    graph.add_node('GO:0005730', label='nucleolus')
+    graph.add_node('GO:0000001')
+    graph.add_edge('GO:0005575', 'GO:0043226', pred=SUBCLASS_OF)
+    graph.add_edge('GO:0043226', 'GO:0005634', pred=SUBCLASS_OF)
+    graph.add_edge('GO:0005634', 'GO:0005730', pred=PART_OF)
+    xref_graph = nx.MultiGraph()
+    xref_graph.add_edge('GO:0005634', 'Wikipedia:Cell_nucleus', source='GO:0005634')
+    return Ontology(handle='go', id='go', graph=graph, xref_graph=xref_graph)
+
+
+@pytest.fixture
+def snapshot(ontology, tmpdir):
+    path = str(tmpdir.join('go.snapshot'))
+    build_snapshot(ontology, path)
+    return OntologySnapshot(path)
+
+
+def test_nodes_and_labels(snapshot):
+    assert len(snapshot) == 5
+    assert 'GO:0005634' in snapshot
+    assert 'GO:9999999' not in snapshot
+    assert snapshot.label('GO:0005634') == 'nucleus'
+    assert snapshot.label('GO:0000001') is None
+
+
+def test_parents_by_relation(snapshot):
+    assert snapshot.parents('GO:0005730') == ['GO:0005634']
+    assert snapshot.parents('GO:0005730', relations=[SUBCLASS_OF]) == []
+    assert snapshot.parents('GO:0005634', relations=[SUBCLASS_OF]) == ['GO:0043226']
+
+
+def test_closures(snapshot):
+    assert snapshot.ancestors('GO:0005730', [SUBCLASS_OF]) == []
+    assert set(snapshot.ancestors('GO:0005730', [PART_OF, SUBCLASS_OF])) == \
+        {'GO:0005634', 'GO:0043226', 'GO:0005575'}
+    assert set(snapshot.descendants('GO:0005575', [SUBCLASS_OF])) == {'GO:0043226', 'GO:0005634'}
+    with pytest.raises(KeyError):
+        snapshot.ancestors('GO:0005730', [PART_OF])
+
+
+def test_meta(snapshot):
+    assert snapshot.meta('GO:0005634') == {
+        'definition': {'val': 'A membrane-bounded organelle'},
+        'xrefs': [{'val': 'Wikipedia:Cell_nucleus'}]
+    }
+    assert snapshot.meta('GO:0005730') is None
+
+
+@pytest.mark.parametrize('relations', [None, [SUBCLASS_OF], [PART_OF]])
+def test_traverse_matches_ontobio(ontology, snapshot, relations):
+    for up, down in [(True, False), (False, True), (True, True)]:
+        for nodes in [['GO:0005634'], ['GO:0005730', 'GO:0043226']]:
+            assert snapshot.traverse(nodes, relations, up=up, down=down) == \
+                ontology.traverse_nodes(nodes, up=up, down=down, relations=relations)
+
+
+def sorted_graph(ont):
+    graph = OboJsonGraphRenderer().to_json(ont, include_meta=True)['graphs'][0]
+    return (sorted(graph['nodes'], key=lambda node: node['id']),
+            sorted(graph['edges'], key=lambda edge: (edge['sub'], edge['obj'], edge['pred'])))
+
+
+@pytest.mark.parametrize('relations', [None, [SUBCLASS_OF], [SUBCLASS_OF, PART_OF]])
+def test_subontology_matches_ontobio(ontology, snapshot, relations):
+    nodes = ['GO:0005730', 'GO:0005634', 'GO:0043226', 'GO:9999999']
+    expected = sorted_graph(ontology.subontology(nodes, relations=relations))
+    assert sorted_graph(snapshot.subontology(nodes, relations)) == expected
+
+
+def test_routes_do_not_load_ontologies_with_a_snapshot(snapshot, monkeypatch):
+    def create_ontology(handle):
+        raise AssertionError('{} loaded from source'.format(handle))
+
+    monkeypatch.setattr(ontology_manager, 'omap', {})
+    monkeypatch.setattr(ontology_manager, 'get_snapshot', lambda id: snapshot)
+    monkeypatch.setattr(ontology_manager, 'create_ontology', create_ontology)
+    nodes = ontology_manager.traverse_nodes('go', ['GO:0005730'], [PART_OF, SUBCLASS_OF])
+    assert nodes == {'GO:0005730', 'GO:0005634', 'GO:0043226', 'GO:0005575'}
+    assert len(ontology_manager.traverse_nodes('go', ['GO:0005730'], [PART_OF])) == 2
+    assert len(ontology_manager.get_subontology('go', nodes).nodes()) == 4
+    ontology_manager.preload_ontology('go')
+
+
+def test_get_ontology_loads_the_full_ontology(ontology, monkeypatch):
+    monkeypatch.setattr(ontology_manager, 'omap', {})
+    monkeypatch.setattr(ontology_manager, 'create_ontology', lambda handle: ontology)
+    assert ontology_manager.get_ontology('go') is ontology
+
+
+def test_snapshots_are_in_the_data_dir(tmpdir, monkeypatch):
+    monkeypatch.setenv('BIOLINK_DATA_DIR', str(tmpdir))
+    monkeypatch.setattr(ontology_manager, 'get_snapshot_config', lambda: {})
+    assert ontology_manager.get_snapshot_path('go') == str(tmpdir.join('snapshots', 'go.snapshot'))
+
+
+def test_checksum_is_stable(ontology, tmpdir):
+    first = build_snapshot(ontology, str(tmpdir.join('a.snapshot')))
+    second = build_snapshot(ontology, str(tmpdir.join('b.snapshot')))
+    assert first['checksum'] == second['checksum']
+    assert read_header(str(tmpdir.join('a.snapshot')))['nodes'] == 5
+
+
+def test_compute_closures_with_cycle():
+    # 0 <- 1 <- 2, and 2 <-> 3
+    parents = [[], [0], [1, 3], [2]]
+    closures = compute_closures(parents)
+    assert closures[0] == set()
+    assert closures[1] == {0}
+    assert closures[2] == {0, 1, 3}
+    assert closures[3] == {0, 1, 2}
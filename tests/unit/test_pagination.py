@@ -0,0 +1,65 @@
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from biolink.api import pagination
+
+
+class FakeResults(object):
+
+    def __init__(self, docs, next_cursor):
+        self.docs = docs
+        self.hits = 3
+        self.facets = {}
+        self.raw_response = {}
+        self.nextCursorMark = next_cursor
+
+
+class FakeSolr(object):
+    """
+    Three associations, two per page
+    """
+
+    def __init__(self):
+        self.params = []
+
+    def search(self, **params):
+        self.params.append(params)
+        docs = [{'id': str(i), 'subject': 'NCBIGene:{}'.format(i), 'object': 'HP:0000007', 'relation': 'RO:0002200'}
+                for i in range(3)]
+        marks = {'*': ('AoE1', docs[:2]), 'AoE1': ('AoE2', docs[2:]), 'AoE2': ('AoE2', [])}
+        next_cursor, page = marks[params['cursorMark']]
+        return FakeResults(page, next_cursor)
+
+
+def test_sort_with_tie_breaker():
+    assert pagination.sort_with_tie_breaker(None) == 'id asc'
+    assert pagination.sort_with_tie_breaker('source_count desc') == 'source_count desc,id asc'
+    assert pagination.sort_with_tie_breaker('id desc') == 'id desc'
+
+
+def query(cursor, solr):
+    query = pagination.CursorAssociationQuery(cursor=cursor, solr=solr, rows=2, object='HP:0000007')
+    # the docs are kept as is, translating them needs SciGraph curie maps
+    query.translate_docs = lambda docs, **kwargs: docs
+    return query
+
+
+def test_cursor_pages():
+    solr = FakeSolr()
+    results = query('*', solr).exec()
+    params = solr.params[0]
+    assert params['cursorMark'] == '*'
+    assert params['sort'] == 'source_count desc,id asc'
+    assert 'start' not in params
+    assert results['next_cursor'] == 'AoE1'
+    assert 'raw' not in results
+    assert [a['id'] for a in results['associations']] == ['0', '1']
+
+    results = query('AoE1', solr).exec()
+    assert [a['id'] for a in results['associations']] == ['2']
+    assert results['next_cursor'] is None
+
+
+def test_cursor_with_start():
+    with pytest.raises(BadRequest):
+        pagination.search_associations(cursor='*', start=100, rows=2, solr=FakeSolr())
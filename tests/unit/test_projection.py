@@ -0,0 +1,45 @@
+import pytest
+
+from ontobio.golr.golr_query import M
+
+from biolink.api import projection
+from biolink.datamodel.serializers import association_results
+from biolink import marshalling
+
+
+def test_select_fields():
+    selected = projection.select_fields('subject.label, object.id,evidence_types')
+    assert selected[:4] == projection.ALWAYS_SELECTED
+    assert M.SUBJECT_LABEL in selected
+    assert M.EVIDENCE_CLOSURE_MAP in selected
+    assert M.EVIDENCE_GRAPH not in selected
+    assert M.OBJECT_LABEL not in selected
+    assert len(selected) == len(set(selected))
+
+
+@pytest.mark.parametrize('value', ['subject.name', '', 'evidence_graph,foo'])
+def test_unknown_fields(value):
+    with pytest.raises(ValueError):
+        projection.select_fields(value)
+
+
+def test_association_mask():
+    model_fields = association_results.resolved
+    mask = projection.association_mask(['subject.id', 'object', 'object.label', 'subject.label'], model_fields)
+    assert mask.endswith(',associations{subject{id,label},object}')
+    results = {
+        'numFound': 1,
+        'associations': [{
+            'id': 'a',
+            'subject': {'id': 'NCBIGene:84570', 'label': 'COL25A1', 'iri': None},
+            'object': {'id': 'HP:0000007', 'label': 'AR'},
+            'evidence_graph': {'nodes': [], 'edges': []},
+        }]
+    }
+    data = marshalling.marshal(results, association_results, mask=mask)
+    assert data['numFound'] == 1
+    assert data['associations'] == [{
+        'subject': {'id': 'NCBIGene:84570', 'label': 'COL25A1'},
+        'object': marshalling.marshal(results['associations'][0]['object'],
+                                      association_results.resolved['associations'].container.nested['object'].nested)
+    }]
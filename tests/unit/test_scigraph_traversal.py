@@ -0,0 +1,77 @@
+import threading
+
+from scigraph.scigraph_util import SciGraph
+from scigraph.model.BBOPGraph import BBOPGraph
+
+# subject -> objects, for any relationship type
+EDGES = {
+    'HP:0000003': ['HP:0000107', '_:b1'],
+    'HP:0000107': ['HP:0000077'],
+    'HP:0000077': ['HP:0000118'],
+    'HP:0100957': ['HP:0000077'],
+    'HP:0000118': [],
+    '_:b1': ['_:b2', 'UBERON:0002113'],
+    '_:b2': ['PATO:0001999'],
+    'UBERON:0002113': [],
+    'PATO:0001999': []
+}
+
+
+class FakeSciGraph(SciGraph):
+    """
+    Serves neighbors from EDGES, recording the requested nodes
+    """
+
+    def __init__(self):
+        super(FakeSciGraph, self).__init__(url='http://scigraph.test/')
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def neighbors(self, id=None, **params):
+        with self.lock:
+            self.requests.append(id)
+        objects = EDGES[id]
+        return BBOPGraph({
+            'nodes': [{'id': x, 'lbl': x, 'meta': {'types': ['anatomical entity']}} for x in [id] + objects],
+            'edges': [{'sub': id, 'pred': 'subClassOf', 'obj': x, 'meta': {}} for x in objects]
+        })
+
+
+def node_ids(graph):
+    return sorted(node.id for node in graph.nodes)
+
+
+def test_extract_subgraph():
+    scigraph = FakeSciGraph()
+    graph = scigraph.extract_subgraph(['HP:0000107', 'HP:0100957'])
+    assert node_ids(graph) == ['HP:0000077', 'HP:0000107', 'HP:0000118', 'HP:0100957']
+    # every node is expanded once, even when reached from two seeds
+    assert sorted(scigraph.requests) == ['HP:0000077', 'HP:0000107', 'HP:0000118', 'HP:0100957']
+
+
+def test_extract_subgraph_limits():
+    scigraph = FakeSciGraph()
+    graph = scigraph.extract_subgraph(['HP:0000107'], max_depth=1)
+    assert node_ids(graph) == ['HP:0000077', 'HP:0000107']
+
+    scigraph = FakeSciGraph()
+    scigraph.extract_subgraph(['HP:0000107', 'HP:0100957'], max_nodes=3)
+    assert len(scigraph.requests) == 3
+
+
+def test_cbd_expands_blank_nodes():
+    scigraph = FakeSciGraph()
+    graph = scigraph.cbd('HP:0000003')
+    assert sorted(scigraph.requests) == ['HP:0000003', '_:b1', '_:b2']
+    assert 'PATO:0001999' in node_ids(graph)
+    assert node_ids(scigraph.cbd('HP:0000003', max_depth=2)) == \
+        ['HP:0000003', 'HP:0000107', 'UBERON:0002113', '_:b1', '_:b2']
+
+
+def test_traverse_chain():
+    scigraph = FakeSciGraph()
+    nodes = scigraph.traverse_chain('HP:0000003', ['subClassOf', 'subClassOf'], blank=False)
+    # blank nodes are not walked through
+    assert sorted(node.id for node in nodes) == ['HP:0000077']
+    nodes = scigraph.traverse_chain('HP:0000003', ['subClassOf', 'subClassOf'], blank=True)
+    assert sorted(node.id for node in nodes) == ['HP:0000077', 'UBERON:0002113', '_:b2']
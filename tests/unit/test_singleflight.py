@@ -0,0 +1,114 @@
+import threading
+import time
+
+from biolink.singleflight import SingleFlight, CoalescedRequestTimeout, CoalescedRequestInterrupted
+
+
+def run_concurrently(n, func):
+    results = [None] * n
+    errors = [None] * n
+
+    def target(i):
+        try:
+            results[i] = func()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_identical_calls_are_coalesced():
+    singleflight = SingleFlight()
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        time.sleep(0.2)
+        return {'numFound': 42}
+
+    results, errors = run_concurrently(5, lambda: singleflight.do('golr', 'DOID:678', fetch))
+    assert results == [{'numFound': 42}] * 5
+    assert len(fetches) == 1
+    stats = singleflight.get_stats()['backends']['golr']
+    assert (stats['issued'], stats['coalesced']) == (1, 4)
+
+    # once done, the same request is sent again
+    singleflight.do('golr', 'DOID:678', fetch)
+    assert len(fetches) == 2
+
+
+def test_errors_are_shared():
+    singleflight = SingleFlight()
+
+    def fetch():
+        time.sleep(0.2)
+        raise ValueError('Golr is down')
+
+    results, errors = run_concurrently(3, lambda: singleflight.do('golr', 'DOID:678', fetch))
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert singleflight.get_stats()['backends']['golr']['errors'] == 1
+
+
+class Killed(BaseException):
+    """
+    Like GreenletExit, not an Exception
+    """
+
+
+def test_interrupted_leader():
+    singleflight = SingleFlight()
+    errors = []
+
+    def fetch():
+        time.sleep(0.2)
+        raise Killed()
+
+    def leader():
+        try:
+            singleflight.do('golr', 'DOID:678', fetch)
+        except Killed as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    time.sleep(0.05)
+    results, waiter_errors = run_concurrently(2, lambda: singleflight.do('golr', 'DOID:678', fetch))
+    thread.join()
+    assert isinstance(errors[0], Killed)
+    # waiters get an error, not a None response
+    assert results == [None, None]
+    assert all(isinstance(e, CoalescedRequestInterrupted) for e in waiter_errors)
+    assert singleflight.get_stats()['backends']['golr']['errors'] == 1
+
+
+def test_waiters_time_out():
+    singleflight = SingleFlight(timeout=0.05)
+    results, errors = run_concurrently(2, lambda: singleflight.do('scigraph', 'HP:0000118', lambda: time.sleep(0.5)))
+    assert sum(isinstance(e, CoalescedRequestTimeout) for e in errors) == 1
+    assert singleflight.get_stats()['backends']['scigraph']['timeouts'] == 1
+
+
+def test_different_keys_are_not_coalesced():
+    singleflight = SingleFlight()
+    keys = iter(range(3))
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            key = next(keys)
+        return singleflight.do('golr', key, lambda: time.sleep(0.1) or key)
+
+    results, errors = run_concurrently(3, call)
+    assert sorted(results) == [0, 1, 2]
+    assert singleflight.get_stats()['backends']['golr']['coalesced'] == 0
+
+
+def test_disabled():
+    singleflight = SingleFlight(enabled=False)
+    assert singleflight.do('golr', 'x', lambda: 1) == 1
+    assert singleflight.get_stats()['backends'] == {}
@@ -0,0 +1,84 @@
+import pytest
+from flask import Flask
+
+from biolink import tracing
+from biolink.concurrency import concurrent_map
+from biolink.tracing import Trace, Span, TimingStats, traced, span, percentile, payload_size
+
+
+@traced('scigraph')
+def fetch_neighbors(id):
+    return [id + '-a', id + '-b']
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    tracing.init_app(app)
+
+    @app.route('/bioentity/<id>')
+    def bioentity(id):
+        with span('ontology', 'go'):
+            pass
+        neighbors = [value for value, error in concurrent_map(fetch_neighbors, [id, id + '1', id + '2'])]
+        return str(len(neighbors))
+    return app
+
+
+def test_server_timing_header(app):
+    response = app.test_client().get('/bioentity/NCBIGene:84570')
+    header = response.headers['Server-Timing']
+    assert header.startswith('ontology;dur=')
+    # spans from the worker threads belong to the request
+    assert 'scigraph;dur=' in header
+    assert 'desc="3 calls"' in header
+    assert ', total;dur=' in header
+
+
+def test_timing_stats_are_collected(app):
+    app.test_client().get('/bioentity/NCBIGene:84570')
+    stats = tracing.get_timing_stats().get_stats()
+    assert stats['routes']['bioentity']['count'] >= 1
+    assert stats['backends']['scigraph']['count'] >= 3
+
+
+def test_no_span_outside_of_a_request():
+    assert fetch_neighbors('NCBIGene:84570') == ['NCBIGene:84570-a', 'NCBIGene:84570-b']
+    assert tracing.current_trace() is None
+
+
+def test_trace_totals():
+    trace = Trace('bioentity')
+    trace.add(Span('golr', 'search', 0.25, 10))
+    trace.add(Span('golr', 'search', 0.5, 20))
+    trace.add(Span('marshal', 'get', 0.125))
+    assert trace.server_timing(1) == \
+        'golr;dur=750.0;desc="2 calls", marshal;dur=125.0;desc="1 call", total;dur=1000.0'
+
+
+def test_samples_are_bounded():
+    stats = TimingStats(samples=10)
+    for i in range(100):
+        trace = Trace('bioentity')
+        trace.add(Span('golr', 'search', i / 1000.0))
+        stats.add(trace, i / 1000.0)
+    summary = stats.get_stats()['backends']['golr']
+    assert summary['count'] == 10
+    assert summary['p50_ms'] == 94
+    assert summary['p99_ms'] == 99
+
+
+def test_percentile():
+    ordered = list(range(1, 101))
+    assert percentile(ordered, 50) == 50
+    assert percentile(ordered, 95) == 95
+    assert percentile(ordered, 99) == 99
+    assert percentile([], 50) == 0.0
+
+
+def test_payload_size():
+    assert payload_size({'associations': [1, 2], 'numFound': 2}) == 2
+    assert payload_size({'associations': None, 'compact_associations': [1, 2, 3]}) == 3
+    assert payload_size({'docs': []}) == 0
+    assert payload_size({'numFound': 2}) is None
+    assert payload_size(b'abc') == 3
@@ -0,0 +1,43 @@
+import time
+
+from biolink.xref_store import XrefStore, GENE_TO_PROTEIN, PROTEIN_TO_GENE
+
+MAPPINGS = """# gene\tprotein
+HGNC:11603\tUniProtKB:Q99081
+HGNC:11603\tUniProtKB:H0YKE6
+HGNC:4851\tUniProtKB:Q99081
+
+"""
+
+
+def test_import_mappings(tmpdir):
+    store = XrefStore(path=str(tmpdir.join('xrefs.sqlite')))
+    assert store.import_mappings(MAPPINGS.splitlines(), 'hgnc') == (2, 2)
+    assert store.get_many(GENE_TO_PROTEIN, ['HGNC:11603', 'HGNC:1']) == \
+        {'HGNC:11603': ['UniProtKB:Q99081', 'UniProtKB:H0YKE6']}
+    assert store.get_many(PROTEIN_TO_GENE, ['UniProtKB:Q99081']) == \
+        {'UniProtKB:Q99081': ['HGNC:11603', 'HGNC:4851']}
+    stats = store.get_stats()
+    assert (stats[GENE_TO_PROTEIN]['hits'], stats[GENE_TO_PROTEIN]['misses']) == (1, 1)
+    assert stats[PROTEIN_TO_GENE]['sources']['hgnc']['entries'] == 2
+
+
+def test_store_is_persistent(tmpdir):
+    path = str(tmpdir.join('xrefs.sqlite'))
+    XrefStore(path=path).put_many(GENE_TO_PROTEIN, {'NCBIGene:84570': []}, 'scigraph')
+    assert XrefStore(path=path).get_many(GENE_TO_PROTEIN, ['NCBIGene:84570']) == {'NCBIGene:84570': []}
+
+
+def test_old_mappings_expire_unless_imported(tmpdir):
+    store = XrefStore(path=str(tmpdir.join('xrefs.sqlite')), max_age=60)
+    store.import_mappings(MAPPINGS.splitlines(), 'hgnc')
+    store.put_many(GENE_TO_PROTEIN, {'NCBIGene:6938': ['UniProtKB:Q99081']}, 'scigraph')
+    store.connection.execute('UPDATE xrefs SET updated = ?', (time.time() - 120,))
+    assert list(store.get_many(GENE_TO_PROTEIN, ['HGNC:11603', 'NCBIGene:6938'])) == ['HGNC:11603']
+
+
+def test_relative_paths_are_in_the_data_dir(tmpdir, monkeypatch):
+    monkeypatch.setenv('BIOLINK_DATA_DIR', str(tmpdir))
+    store = XrefStore(path='xrefs.sqlite')
+    assert store.path == str(tmpdir.join('xrefs.sqlite'))
+    assert tmpdir.join('xrefs.sqlite').check()
@@ -1,4 +1,8 @@
-from biolink.app import app
+from biolink.app import app, preload_ontologies
+
+# gunicorn imports this module in each worker, map the snapshots of the
+# configured ontologies (or load those without one) before serving
+preload_ontologies()
 
 if __name__ == "__main__":
     app.run()